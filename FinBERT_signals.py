@@ -1,65 +1,56 @@
 import os
 import json
-import torch
 from tqdm import tqdm
-from transformers import BertTokenizer, BertForSequenceClassification, pipeline
+import run_metrics as metrics
+from resources import load_finbert
+from nlp_processing import ticker_sentences
+import record_io
 
 # Paths
 INPUT_DIR = "enriched_data"
 OUTPUT_FILE = "data_output/finbert_signals_combined.json"  # Single final file
 
-# Load FinBERT model
-print("Loading FinBERT...")
-model_name = "yiyanghkust/finbert-tone"
-tokenizer = BertTokenizer.from_pretrained(model_name)
-model = BertForSequenceClassification.from_pretrained(model_name)
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model.to(device)
+# Score one enriched article; one signal row per ticker (empty when there are no tickers)
+def score_article(finbert, article, source_file=""):
+    tickers = article.get("tickers", [])
+    text = article.get("article_text", "") or article.get("cleaned_article_text", "")
+    title = article.get("original_title", article.get("title", ""))
 
-finbert = pipeline(
-    "sentiment-analysis",
-    model=model,
-    tokenizer=tokenizer,
-    device=0 if torch.cuda.is_available() else -1
-)
-print(f"Using device: {device}")
+    if not tickers or not text:
+        return []
+
+    # Each ticker is scored on the sentences that mention it; tickers sharing those sentences share one pass
+    contexts = {ticker: ticker_sentences(article, ticker) for ticker in tickers}  # FinBERT handles max 512 tokens
+    unique = list(dict.fromkeys(contexts.values()))
+    with metrics.timer("finbert", items=len(unique)):
+        results = dict(zip(unique, finbert(unique)))
+
+    signals = []
+    for ticker, context in contexts.items():
+        sentiment = results[context]["label"].lower()
+        signals.append({
+            "title": title,
+            "published": article.get("published", ""),
+            "ticker": ticker,
+            "sentiment": sentiment,
+            "confidence": round(float(results[context]["score"]), 4),
+            "justification": f'FinBERT classified: "{context[:200]}..." as {sentiment}',
+            "source_file": source_file
+        })
+    return signals
 
 # Main execution
 def generate_signals():
+    # FinBERT is loaded on first use, not at import
+    print("Loading FinBERT...")
+    finbert = load_finbert()
     all_signals = []
 
-    for filename in os.listdir(INPUT_DIR):
-        if not filename.endswith(".json"):
-            continue
-
-        with open(os.path.join(INPUT_DIR, filename), "r", encoding="utf-8") as f:
-            articles = json.load(f)
-
-        for article in tqdm(articles, desc=f"Processing {filename}"):
-            tickers = article.get("tickers", [])
-            text = article.get("article_text", "") or article.get("cleaned_article_text", "")
-            title = article.get("original_title", article.get("title", ""))
-
-            if not tickers or not text:
-                continue
-
+    store = record_io.TextStore()
+    for stem in record_io.list_stems(INPUT_DIR):
+        for article in tqdm(record_io.iter_records(os.path.join(INPUT_DIR, stem)), desc=f"Processing {stem}"):
             try:
-                result = finbert(text[:512])[0]  # FinBERT handles max 512 tokens
-                sentiment = result["label"].lower()
-                confidence = round(float(result["score"]), 4)
-
-                # One sentiment per ticker for consistency with GPT-4 output
-                for ticker in tickers:
-                    all_signals.append({
-                        "title": title,
-                        "published": article.get("published", ""),
-                        "ticker": ticker,
-                        "sentiment": sentiment,
-                        "confidence": confidence,
-                        "justification": f'FinBERT classified: "{text[:200]}..." as {sentiment}',
-                        "source_file": filename
-                    })
-
+                all_signals.extend(score_article(finbert, store.hydrate(article), stem))
             except Exception as e:
                 print(f"⚠️ Skipping due to error: {e}")
                 continue
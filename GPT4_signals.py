@@ -5,22 +5,35 @@
 import os, json, re, time, hashlib
 from typing import Any, Dict, List
 
+import run_metrics as metrics
+import gpt_budget
+import record_io
+from nlp_processing import ticker_sentences
+
 # ── Config ─────────────────────────────────────────────────────────────
 ENRICHED_DIR = "enriched_data"
-CLUSTERED_FILE = "data_output/clustered_triplets.json"
+CLUSTERED_FILE = "data_output/clustered_triplets"  # record_io stem
 DATA_DIR = "data_output"
 OUTPUT_FILE = os.path.join(DATA_DIR, "gpt_signals_combined.json")
 MODEL_NAME = "gpt-4o-mini"  # Change to your preferred GPT model
 RATE_LIMIT_SLEEP = 0.8
+MAX_MENTION_CHARS = 300  # per ticker: only the sentences that mention it go into the prompt
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
 # ── OpenAI client ───────────────────────────────────────────────────────
-try:
-    from openai import OpenAI
-    client = OpenAI()  # Uses OPENAI_API_KEY from environment
-except Exception as e:
-    raise SystemExit("OpenAI client not available. Install `openai` and set OPENAI_API_KEY.") from e
+_client = None
+
+def get_client():
+    """Created on first call, so importing this module never needs the API key."""
+    global _client
+    if _client is None:
+        try:
+            from openai import OpenAI
+            _client = OpenAI()  # Uses OPENAI_API_KEY from environment
+        except Exception as e:
+            raise SystemExit("OpenAI client not available. Install `openai` and set OPENAI_API_KEY.") from e
+    return _client
 
 # ── Utilities ───────────────────────────────────────────────────────────
 def load_enriched_lookup() -> Dict[str, Dict[str, Any]]:
@@ -28,20 +41,17 @@ def load_enriched_lookup() -> Dict[str, Dict[str, Any]]:
     lookup = {}
     if not os.path.isdir(ENRICHED_DIR):
         return lookup
-    for fn in os.listdir(ENRICHED_DIR):
-        if not fn.endswith(".json"):
+    for stem in record_io.list_stems(ENRICHED_DIR):
+        try:
+            articles = record_io.read_records(os.path.join(ENRICHED_DIR, stem))
+        except Exception:
             continue
-        with open(os.path.join(ENRICHED_DIR, fn), "r", encoding="utf-8") as f:
-            try:
-                articles = json.load(f)
-            except Exception:
-                continue
-            for art in articles:
-                title = (art.get("title") or "").strip()
-                pub = (art.get("published") or "").strip()
-                key = f"{title}|{pub}" if title else hashlib.md5(json.dumps(art, sort_keys=True).encode()).hexdigest()
-                if key not in lookup or len(json.dumps(art)) > len(json.dumps(lookup[key])):
-                    lookup[key] = art
+        for art in articles:
+            title = (art.get("title") or art.get("original_title") or "").strip()
+            pub = (art.get("published") or "").strip()
+            key = f"{title}|{pub}" if title else hashlib.md5(json.dumps(art, sort_keys=True).encode()).hexdigest()
+            if key not in lookup or len(json.dumps(art)) > len(json.dumps(lookup[key])):
+                lookup[key] = art
     return lookup
 
 def safe_json_extract(text: str) -> Any:
@@ -62,11 +72,14 @@ def normalise_ticker(t: str) -> str:
 
 def build_prompt(item: Dict[str, Any], article_ctx: Dict[str, Any]) -> str:
     """Creates the GPT prompt."""
-    title = article_ctx.get("title", "")
+    title = article_ctx.get("title") or article_ctx.get("original_title", "")
     pub = article_ctx.get("published", "")
     source = article_ctx.get("source", "")
-    tickers = item.get("tickers") or article_ctx.get("tickers") or []
-    tickers = [normalise_ticker(t) for t in tickers if t]
+    raw_tickers = item.get("tickers") or article_ctx.get("tickers") or []
+    tickers = [normalise_ticker(t) for t in raw_tickers if t]
+    known_mentions = article_ctx.get("ticker_mentions") or {}
+    mentions = {normalise_ticker(t): ticker_sentences(article_ctx, t, MAX_MENTION_CHARS)
+                for t in raw_tickers if t in known_mentions}
 
     triplet = item.get("triplet") or {
         "subject": item.get("subject"),
@@ -89,7 +102,9 @@ def build_prompt(item: Dict[str, Any], article_ctx: Dict[str, Any]) -> str:
         f"Triplet: {triplet}\n"
         f"SentenceContext: {sentence}\n"
         f"ClusterLabel: {cluster_label}\n"
-        f"TextBlobPolarity: {textblob_polarity}\n\n"
+        f"TextBlobPolarity: {textblob_polarity}\n"
+        + "".join(f"Mentions[{t}]: {text}\n" for t, text in mentions.items() if text)
+        + "\n"
         "JSON output spec:\n"
         "[\n"
         '  {"ticker":"AAPL","sentiment":"positive","confidence":0.83,"justification":"<why in <=30 words>"},\n'
@@ -97,12 +112,16 @@ def build_prompt(item: Dict[str, Any], article_ctx: Dict[str, Any]) -> str:
         "]"
     )
 
-def call_model(prompt: str) -> List[Dict[str, Any]]:
-    resp = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.0,
-    )
+def call_model(prompt: str, budget: "gpt_budget.Budget" = None) -> List[Dict[str, Any]]:
+    with metrics.timer("gpt_call"):
+        resp = get_client().chat.completions.create(
+            model=MODEL_NAME,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.0,
+        )
+    metrics.record_tokens(getattr(resp, "usage", None))
+    if budget is not None:
+        budget.charge(getattr(resp, "usage", None))
     text = resp.choices[0].message.content
     data = safe_json_extract(text)
 
@@ -142,67 +161,101 @@ def stable_key(title: str, published: str) -> str:
     return f"{title}|{published}"
 
 # ── Load data ───────────────────────────────────────────────────────────
-enriched_lookup = load_enriched_lookup()
-
-cluster_items: List[Dict[str, Any]] = []
-if os.path.exists(CLUSTERED_FILE):
-    with open(CLUSTERED_FILE, "r", encoding="utf-8") as f:
-        cluster_items = json.load(f)
-else:
-    for art in enriched_lookup.values():
-        cluster_items.append({
-            "title": art.get("title"),
-            "published": art.get("published"),
-            "tickers": art.get("tickers") or [],
-            "sentence": art.get("sentence"),
-            "triplet": art.get("triplet"),
-            "polarity": art.get("polarity"),
-        })
-
-existing = load_existing()
-existing_by_key = {stable_key(e.get("title",""), e.get("published","")): e for e in existing}
-
-output_by_key = dict(existing_by_key)
-processed = 0
-created_now = 0
-
-for item in cluster_items:
-    title = (item.get("title") or "").strip()
-    published = (item.get("published") or "").strip()
-    key = stable_key(title, published)
-
-    article_ctx = enriched_lookup.get(key, {"title": title, "published": published})
-
-    if key in output_by_key and output_by_key[key].get("gpt_signals"):
-        continue
+def load_cluster_items(enriched_lookup: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    cluster_items: List[Dict[str, Any]] = []
+    if record_io.exists(CLUSTERED_FILE):
+        cluster_items = list(record_io.iter_joined(CLUSTERED_FILE))
+    else:
+        for art in enriched_lookup.values():
+            cluster_items.append({
+                "title": art.get("title"),
+                "published": art.get("published"),
+                "tickers": art.get("tickers") or [],
+                "sentence": art.get("sentence"),
+                "triplet": art.get("triplet"),
+                "polarity": art.get("polarity"),
+            })
+    return cluster_items
 
+# ── Score one item ──────────────────────────────────────────────────────
+def score_item(item: Dict[str, Any], article_ctx: Dict[str, Any], budget: "gpt_budget.Budget" = None) -> Dict[str, Any]:
     prompt = build_prompt(item, article_ctx)
     try:
-        signals = call_model(prompt)
+        signals = call_model(prompt, budget)
     except Exception as e:
         signals = []
         article_ctx["error"] = str(e)
 
-    record = {
-        "title": article_ctx.get("title",""),
+    return {
+        "title": article_ctx.get("title") or article_ctx.get("original_title", ""),
         "published": article_ctx.get("published",""),
         "source": article_ctx.get("source",""),
         "url": article_ctx.get("url",""),
         "gpt_signals": signals
     }
-    output_by_key[key] = record
-    created_now += 1
-    processed += 1
 
-    if processed % 5 == 0:
-        write_outputs(list(output_by_key.values()))
+# ── Main ────────────────────────────────────────────────────────────────
+def run_gpt_signals(budget: "gpt_budget.Budget" = None, keys=None):
+    """Scores pending articles; `keys` (title|published) restricts the run to those articles."""
+    budget = budget or gpt_budget.Budget(model=MODEL_NAME)
+    enriched_lookup = load_enriched_lookup()
+    # Items deferred by the previous run's budget come first, then this run's clusters
+    cluster_items = gpt_budget.load_backlog() + load_cluster_items(enriched_lookup)
+
+    existing = load_existing()
+    existing_by_key = {stable_key(e.get("title",""), e.get("published","")): e for e in existing}
+
+    store = record_io.TextStore()
+    output_by_key = dict(existing_by_key)
+    processed = 0
+    created_now = 0
+
+    # One item per article still to score (the first one seen), most important first
+    pending = {}
+    for item in cluster_items:
+        key = stable_key((item.get("title") or "").strip(), (item.get("published") or "").strip())
+        if key in pending or (key in output_by_key and output_by_key[key].get("gpt_signals")):
+            continue
+        if keys is not None and key not in keys:
+            continue
+        relevance = enriched_lookup.get(key, {}).get("relevance")
+        pending[key] = {**item, "relevance": relevance} if relevance is not None else item
+    ranked = sorted(zip(gpt_budget.priorities(list(pending.values())), pending), key=lambda p: -p[0])
+
+    deferred = []
+    for _, key in ranked:
+        item = pending[key]
+        if deferred:
+            deferred.append(item)
+            continue
+        title = (item.get("title") or "").strip()
+        published = (item.get("published") or "").strip()
+
+        # Texts are only needed to cut out the sentences that mention each ticker
+        article_ctx = store.hydrate(enriched_lookup.get(key, {"title": title, "published": published}))
+        if not budget.affordable(gpt_budget.estimate_tokens(build_prompt(item, article_ctx), MODEL_NAME)):
+            print(f"💰 Budget reached ({budget.summary()}); deferring the rest to the next run")
+            deferred.append(item)
+            continue
+
+        output_by_key[key] = score_item(item, article_ctx, budget)
+        created_now += 1
+        processed += 1
+
+        if processed % 5 == 0:
+            write_outputs(list(output_by_key.values()))
+
+        time.sleep(RATE_LIMIT_SLEEP)
 
-    time.sleep(RATE_LIMIT_SLEEP)
+    # Final write
+    final_records = list(output_by_key.values())
+    write_outputs(final_records)
+    gpt_budget.save_backlog(deferred)
 
-# Final write
-final_records = list(output_by_key.values())
-write_outputs(final_records)
+    print(f"✅ GPT signals written: {len(final_records)} total "
+          f"(new: {created_now}, resumed: {len(existing)}, deferred: {len(deferred)})")
+    print(f"💰 Spent {budget.spent_tokens} tokens (${budget.spent_dollars:.4f})")
+    print(f"📄 {OUTPUT_FILE}")
 
-print(f"✅ GPT signals written: {len(final_records)} total "
-      f"(new: {created_now}, resumed: {len(existing)})")
-print(f"📄 {OUTPUT_FILE}")
+if __name__ == "__main__":
+    run_gpt_signals()
@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from synthetic_corpus import SyntheticCorpus, serve_corpus, feed_urls
+
+# Offline benchmark: synthetic corpus + local HTTP stand-in, each stage timed in its own process
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = "benchmark_results"
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+# GPT4_signals needs the OpenAI API, so it is opt-in; its output is synthesised otherwise
+DEFAULT_STAGES = [
+    "data_collection",
+    "preprocessing",
+    "nlp_processing",
+    "triplet_extraction",
+    "embedding_and_clustering",
+    "FinBERT_signals",
+    "convert_finbert_to_grouped",
+    "compare_saved",
+]
+ALL_STAGES = DEFAULT_STAGES[:6] + ["GPT4_signals"] + DEFAULT_STAGES[6:]
+
+# run_metrics entry that counts the items a stage actually processed (substage name, or "counters.<name>")
+STAGE_ITEMS = {
+    "data_collection": "counters.rss_entries",
+    "preprocessing": "fetch_article",
+    "nlp_processing": "spacy",
+    "triplet_extraction": "spacy_sentences",
+    "embedding_and_clustering": "embedding",
+    "FinBERT_signals": "finbert",
+    "GPT4_signals": "gpt_call",
+}
+
+
+def stage_command(stage, base_url):
+    if stage == "data_collection":
+        # Only the RSS fetch: the Yahoo price download has no local stand-in
+        driver = (
+            "import data_collection as d\n"
+            f"for name, url, filename in {feed_urls(base_url)!r}:\n"
+            "    d.fetch_rss(name, url, filename, max_articles=None)\n"
+        )
+        return [sys.executable, "-c", driver]
+    return [sys.executable, os.path.join(REPO_DIR, f"{stage}.py")]
+
+
+def seed_workdir(corpus, workdir, stages):
+    """Write the inputs a stage would normally get from an earlier stage that is not being run."""
+    corpus.write_ticker_mapping(os.path.join(workdir, "sp500_ticker_mapping.json"))
+    os.makedirs(os.path.join(workdir, "data_output"), exist_ok=True)
+    if "data_collection" not in stages:
+        corpus.write_feeds(os.path.join(workdir, "data_output"))
+    if "preprocessing" not in stages:
+        corpus.write_processed(os.path.join(workdir, "processed_data"))
+    if "nlp_processing" not in stages:
+        corpus.write_enriched(os.path.join(workdir, "enriched_data"))
+    if "GPT4_signals" not in stages:
+        corpus.write_signals(os.path.join(workdir, "data_output", "gpt_signals_combined.json"), "gpt_signals")
+    if "FinBERT_signals" not in stages:
+        corpus.write_signals(os.path.join(workdir, "data_output", "finbert_signals_combined.json"), "finbert_signals")
+
+
+def run_stage(stage, base_url, workdir, metrics_file, timeout):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPO_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["RUN_METRICS_FILE"] = metrics_file
+    env["MPLBACKEND"] = "Agg"
+
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(stage_command(stage, base_url), cwd=workdir, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=timeout)
+        ok, tail = proc.returncode == 0, proc.stdout[-2000:]
+    except subprocess.TimeoutExpired:
+        ok, tail = False, f"timeout after {timeout}s"
+    return ok, time.perf_counter() - start, tail
+
+
+def stage_metrics(metrics_file, stage):
+    try:
+        with open(metrics_file, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+    except Exception:
+        return {}
+    name = "-c" if stage == "data_collection" else f"{stage}.py"
+    return doc.get("processes", {}).get(name, {})
+
+
+def stage_items(m, stage):
+    """Items the stage recorded in run_metrics; None when it has no item count."""
+    key = STAGE_ITEMS.get(stage)
+    if key is None:
+        return None
+    if key.startswith("counters."):
+        return m.get("counters", {}).get(key.split(".", 1)[1])
+    return m.get("stages", {}).get(key, {}).get("items")
+
+
+def run_benchmark(n_articles, stages=DEFAULT_STAGES, seed=42, keep=False, timeout=None):
+    corpus = SyntheticCorpus(n_articles, seed=seed)
+    server, base_url = serve_corpus(corpus)
+    workdir = tempfile.mkdtemp(prefix=f"bench_{n_articles}_")
+    metrics_file = os.path.join(workdir, "data_output", "run_metrics.json")
+    print(f"🧪 Benchmark: {n_articles} synthetic articles, {len(corpus.companies)} companies, server {base_url}")
+    print(f"📁 Work dir: {workdir}")
+
+    seed_workdir(corpus, workdir, stages)
+    run_id = f"bench-{n_articles}-{int(time.time())}"
+    os.environ["PIPELINE_RUN_ID"] = run_id
+    with open(metrics_file, "w", encoding="utf-8") as f:
+        json.dump({"run_id": run_id, "processes": {}, "scripts": {}}, f)
+
+    results = []
+    try:
+        for stage in stages:
+            print(f"🚀 {stage} ...", flush=True)
+            ok, wall_s, tail = run_stage(stage, base_url, workdir, metrics_file, timeout)
+            m = stage_metrics(metrics_file, stage)
+            items = stage_items(m, stage)
+            results.append({
+                "stage": stage,
+                "ok": ok,
+                "wall_s": round(wall_s, 3),
+                "items": items,
+                "items_per_sec": round(items / wall_s, 2) if ok and items and wall_s > 0 else None,
+                "peak_rss_mb": m.get("peak_rss_mb"),
+                "model_load_s": m.get("model_load_s", {}),
+                "substages": {k: {"total_s": v["total_s"], "items_per_sec": v["items_per_sec"]}
+                              for k, v in m.get("stages", {}).items()},
+                "error": None if ok else tail,
+            })
+            if not ok:
+                print(f"❌ {stage} failed:\n{tail}")
+    finally:
+        server.shutdown()
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_results(n_articles, results):
+    print(f"\n{'Stage':<28} {'OK':<4} {'Wall s':>10} {'Items':>8} {'Items/s':>10} {'Peak MB':>9}")
+    print("-" * 74)
+    for r in results:
+        items = r["items"] if r["items"] is not None else "-"
+        rate = f"{r['items_per_sec']:.1f}" if r["items_per_sec"] else "-"
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] else "-"
+        print(f"{r['stage']:<28} {'✔' if r['ok'] else '✘':<4} {r['wall_s']:>10.2f} {items:>8} {rate:>10} {rss:>9}")
+    print(f"Total: {sum(r['wall_s'] for r in results):.2f}s for {n_articles} articles")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark on a synthetic news corpus")
+    parser.add_argument("--scale", default="1k", help="1k, 10k, 100k or an explicit article count")
+    parser.add_argument("--stages", nargs="+", default=DEFAULT_STAGES, choices=ALL_STAGES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=None, help="per-stage timeout in seconds")
+    parser.add_argument("--keep", action="store_true", help="keep the work directory for inspection")
+    args = parser.parse_args()
+
+    n_articles = SCALES.get(args.scale) or int(args.scale)
+    results = run_benchmark(n_articles, args.stages, args.seed, args.keep, args.timeout)
+    print_results(n_articles, results)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"benchmark_{n_articles}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"n_articles": n_articles, "seed": args.seed, "stages": results}, f, indent=2)
+    print(f"✅ Saved benchmark results → {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import json
+import argparse
+import pandas as pd
+
+import run_metrics as metrics
+from signal_frames import load_signal_frame, GPT_FILE, FINBERT_FILE
+
+# Cascade mode: FinBERT scores every article locally; only articles it is unsure about
+# (low confidence or several candidate tickers) are sent to GPT. Both end up in one file with a `model` field.
+
+OUTPUT_FILE = "data_output/cascade_signals_combined.json"
+THRESHOLD_FILE = "data_output/cascade_threshold.json"
+COMPARISON_FILE = "evaluation_results/comparison_full.csv"  # written by compare_saved.py
+DEFAULT_THRESHOLD = 0.85
+MAX_FINBERT_TICKERS = 1     # articles with more candidate tickers go to GPT for per-ticker attribution
+TARGET_AGREEMENT = 0.90     # tuning: lowest threshold whose accepted FinBERT signals agree with GPT this often
+MIN_ACCEPTED = 20           # tuning: ignore thresholds that would accept fewer matched signals than this
+
+
+def load_threshold(path=THRESHOLD_FILE):
+    if os.getenv("CASCADE_THRESHOLD"):
+        return float(os.getenv("CASCADE_THRESHOLD"))
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return float(json.load(f)["threshold"])
+    return DEFAULT_THRESHOLD
+
+
+# ------------------ Tuning ------------------
+
+def agreement_curve(df, thresholds=None):
+    """For each threshold: share of matched signals FinBERT would keep and how often those agree with GPT."""
+    thresholds = thresholds if thresholds is not None else [round(0.5 + 0.01 * i, 2) for i in range(50)]
+    conf = df["finbert_confidence"].to_numpy()
+    match = df["match"].astype(bool).to_numpy()
+    rows = []
+    for t in thresholds:
+        accepted = conf >= t
+        n = int(accepted.sum())
+        rows.append({
+            "threshold": t,
+            "accepted": n,
+            "accepted_share": round(n / len(df), 4) if len(df) else 0.0,
+            "agreement": round(float(match[accepted].mean()), 4) if n else None,
+        })
+    return rows
+
+
+def tune_threshold(comparison_file=COMPARISON_FILE, target=TARGET_AGREEMENT, path=THRESHOLD_FILE):
+    """Picks the lowest threshold (fewest GPT calls) that still meets `target` agreement and saves it."""
+    if os.path.exists(comparison_file):
+        df = pd.read_csv(comparison_file)
+    else:
+        from compare_saved import build_comparison, load_json
+        df = build_comparison(load_json(GPT_FILE), load_json(FINBERT_FILE))
+    if df.empty:
+        print("⚠️ No GPT/FinBERT overlap to tune on; keeping the current threshold.")
+        return load_threshold(path)
+
+    curve = agreement_curve(df)
+    eligible = [r for r in curve if r["accepted"] >= MIN_ACCEPTED and r["agreement"] is not None
+                and r["agreement"] >= target]
+    best = eligible[0] if eligible else curve[-1]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"threshold": best["threshold"], "target_agreement": target, "matched": len(df),
+                   "curve": curve}, f, indent=2)
+    print(f"🎯 Cascade threshold {best['threshold']}: FinBERT keeps {best['accepted_share']:.0%} "
+          f"of matched signals at {best['agreement']} agreement → {path}")
+    return best["threshold"]
+
+
+# ------------------ Routing ------------------
+
+def with_keys(df):
+    """Adds the title|published key GPT4_signals uses for articles."""
+    df = df.assign(title=df["title"].fillna("").astype(str).str.strip(),
+                   published=df["published"].fillna("").astype(str).str.strip())
+    return df.assign(key=df["title"] + "|" + df["published"])
+
+
+def route(finbert_df, threshold):
+    """Splits article keys (title|published) into those FinBERT settles and those sent to GPT."""
+    if finbert_df.empty:
+        return set(), set()
+    per_article = with_keys(finbert_df).groupby("key").agg(
+        min_confidence=("confidence", "min"), tickers=("ticker", "nunique"))
+    uncertain = (per_article["min_confidence"] < threshold) | (per_article["tickers"] > MAX_FINBERT_TICKERS)
+    return set(per_article.index[~uncertain]), set(per_article.index[uncertain])
+
+
+def merge_signals(finbert_df, gpt_df, gpt_keys):
+    """One record per article: GPT signals where GPT scored it, FinBERT's otherwise."""
+    frames = []
+    if not gpt_df.empty:
+        gpt_df = with_keys(gpt_df)
+        frames.append(gpt_df[gpt_df["key"].isin(gpt_keys)])
+    scored_by_gpt = set(frames[0]["key"]) if frames else set()
+    if not finbert_df.empty:
+        finbert_df = with_keys(finbert_df)
+        frames.append(finbert_df[~finbert_df["key"].isin(scored_by_gpt)])
+    if not frames:
+        return []
+
+    df = pd.concat(frames, ignore_index=True)
+    if "justification" not in df:
+        df["justification"] = ""
+    df["justification"] = df["justification"].fillna("")
+    records = []
+    for (title, published), group in df.groupby(["title", "published"], sort=False):
+        records.append({
+            "title": title,
+            "published": published,
+            "signals": group[["ticker", "sentiment", "confidence", "justification", "model"]].to_dict("records"),
+        })
+    return records
+
+
+def run_cascade(threshold=None, use_gpt=True):
+    threshold = load_threshold() if threshold is None else threshold
+    finbert_df = load_signal_frame(FINBERT_FILE, "finbert_signals", "finbert")
+    settled, uncertain = route(finbert_df, threshold)
+    print(f"🔀 Cascade @ {threshold}: {len(settled)} articles settled by FinBERT, {len(uncertain)} sent to GPT")
+    metrics.increment("cascade_finbert_only", len(settled))
+    metrics.increment("cascade_to_gpt", len(uncertain))
+
+    if use_gpt and uncertain:
+        import GPT4_signals
+        GPT4_signals.run_gpt_signals(keys=uncertain)
+    gpt_df = load_signal_frame(GPT_FILE, "gpt_signals", "gpt")
+
+    records = merge_signals(finbert_df, gpt_df, uncertain)
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    print(f"✅ Cascade signals: {len(records)} articles → {OUTPUT_FILE}")
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FinBERT-first cascade into GPT")
+    parser.add_argument("--tune", action="store_true", help="pick the threshold from compare_saved agreement data")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--no-gpt", action="store_true", help="only route and merge existing outputs")
+    args = parser.parse_args()
+    if args.tune:
+        tune_threshold()
+    else:
+        run_cascade(args.threshold, use_gpt=not args.no_gpt)
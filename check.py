@@ -1,6 +1,7 @@
-import torch, transformers, spacy, umap, hdbscan
-from sentence_transformers import SentenceTransformer
+import time
+from importlib import import_module
 from importlib.metadata import version, PackageNotFoundError
+import resources
 
 def pkg_ver(name, fallback="(unknown)"):
     try:
@@ -8,12 +9,20 @@ def pkg_ver(name, fallback="(unknown)"):
     except PackageNotFoundError:
         return fallback
 
-print("✓ torch", torch.__version__)
-print("✓ transformers", transformers.__version__)
-print("✓ spaCy", spacy.__version__)
-print("✓ umap", getattr(umap, "__version__", "(unknown)"))
-print("✓ hdbscan", pkg_ver("hdbscan"))
+# Import each heavy library on its own so a slow or broken one is easy to spot
+for module, dist in [("torch", "torch"), ("transformers", "transformers"), ("spacy", "spacy"),
+                     ("umap", "umap-learn"), ("hdbscan", "hdbscan"), ("sentence_transformers", "sentence-transformers")]:
+    start = time.perf_counter()
+    try:
+        import_module(module)
+        print(f"✓ {module} {pkg_ver(dist)} ({time.perf_counter() - start:.2f}s import)")
+    except Exception as e:
+        print(f"✘ {module}: {e}")
+
+# Cached models and corpora, checked without network access
+manifest = resources.verify()
 
 # Test loading a sentence transformer model
-m = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-print("✓ SBERT model loaded")
+if manifest["resources"].get("sentence_transformer"):
+    resources.load_sentence_transformer()
+    print("✓ SBERT model loaded")
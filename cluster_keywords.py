@@ -1,9 +1,8 @@
-import json
 import re
-import collections
 import itertools
 import csv
-from pathlib import Path
+import record_io
+from cluster_terms import cluster_keywords
 
 STOPWORDS = {
     "the", "a", "an", "to", "of", "in", "on", "for", "and", "or", "by", "with", "at", "from",
@@ -26,16 +25,14 @@ def get_field(d, *names, default=""):
     return default
 
 def summarize_clusters(path, topk=10, out_csv="cluster_keywords_summary.csv"):
-    data = json.loads(Path(path).read_text())
-    verb_counts = collections.defaultdict(collections.Counter)
-    noun_counts = collections.defaultdict(collections.Counter)
+    labels = []
+    verb_tokens = []
+    noun_tokens_all = []
 
-    for row in data:
-        c = row.get("cluster", row.get("cluster_id", -1))
-        v = get_field(row, "verb", "relation", "pred", default="")
-        v = norm_token(v)
-        if v:
-            verb_counts[c][v] += 1
+    for row in record_io.iter_joined(path):
+        labels.append(int(get_field(row, "cluster_label", "cluster", "cluster_id", default=-1)))
+        v = norm_token(get_field(row, "verb", "relation", "pred", default=""))
+        verb_tokens.append([v] if v else [])
 
         subj = get_field(row, "subject", "head", "subj", default="")
         obj = get_field(row, "object", "tail", "obj", default="")
@@ -43,21 +40,23 @@ def summarize_clusters(path, topk=10, out_csv="cluster_keywords_summary.csv"):
         tickers = row.get("tickers") or []
         noun_tokens = split_nouns(subj) + split_nouns(obj)
         noun_tokens += [norm_token(x) for x in itertools.chain(companies, tickers)]
-        noun_tokens = [t for t in noun_tokens if t]
-        noun_counts[c].update(noun_tokens)
+        noun_tokens_all.append([t for t in noun_tokens if t])
 
-    clusters = sorted(set(verb_counts.keys()) | set(noun_counts.keys()))
+    # Ranked by class-based TF-IDF, shown with the raw count in the cluster
+    top_verbs_by_cluster = cluster_keywords(verb_tokens, labels, topk)
+    top_nouns_by_cluster = cluster_keywords(noun_tokens_all, labels, topk)
+    clusters = sorted(set(labels))
 
     # Write to CSV
     with open(out_csv, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(["Cluster ID", "Top Verbs", "Top Nouns"])
         for c in clusters:
-            top_verbs = ", ".join([f"{w} ({n})" for w, n in verb_counts[c].most_common(topk)])
-            top_nouns = ", ".join([f"{w} ({n})" for w, n in noun_counts[c].most_common(topk)])
+            top_verbs = ", ".join([f"{w} ({n})" for w, _, n in top_verbs_by_cluster.get(c, [])])
+            top_nouns = ", ".join([f"{w} ({n})" for w, _, n in top_nouns_by_cluster.get(c, [])])
             writer.writerow([c, top_verbs, top_nouns])
 
     print(f"✅ Saved cluster keyword summary to {out_csv}")
 
 if __name__ == "__main__":
-    summarize_clusters("data_output/clustered_triplets.json", topk=10)
+    summarize_clusters("data_output/clustered_triplets", topk=10)
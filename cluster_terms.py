@@ -0,0 +1,75 @@
+import numpy as np
+
+# Class-based TF-IDF over triplet tokens, shared by cluster labelling (embedding_and_clustering)
+# and the keyword summary (cluster_keywords).
+# All triplets go into one sparse term matrix; rows are summed per cluster with a sparse indicator product,
+# so the cost grows with the number of non-zero terms, not with clusters x vocabulary.
+
+
+def term_matrix(token_lists):
+    """Sparse (triplets x vocabulary) count matrix and the vocabulary array."""
+    from scipy import sparse
+    vocab = {}
+    indices = []
+    indptr = [0]
+    for tokens in token_lists:
+        indices.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    X = sparse.csr_matrix((data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+                          shape=(len(token_lists), len(vocab)))
+    X.sum_duplicates()
+    terms = np.empty(len(vocab), dtype=object)
+    for term, col in vocab.items():
+        terms[col] = term
+    return X, terms
+
+
+def class_counts(X, labels):
+    """(clusters x vocabulary) term counts and the cluster id of each row."""
+    from scipy import sparse
+    ids, rows = np.unique(np.asarray(labels), return_inverse=True)
+    indicator = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, np.arange(len(rows)))),
+                                  shape=(len(ids), len(rows)))
+    counts = (indicator @ X).tocsr()
+    counts.sort_indices()
+    return counts, ids
+
+
+def class_tfidf(counts):
+    """c-TF-IDF: term frequency within the cluster x log(1 + average cluster size / term frequency overall).
+    Returned with the same sparsity pattern (and entry order) as `counts`."""
+    totals = np.asarray(counts.sum(axis=1)).ravel()
+    term_totals = np.asarray(counts.sum(axis=0)).ravel()
+    idf = np.log1p(totals.mean() / np.maximum(term_totals, 1))
+    row_of = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+    scores = counts.copy()
+    scores.data = counts.data / np.maximum(totals, 1)[row_of] * idf[counts.indices]
+    return scores
+
+
+def top_terms(scores, counts, terms, topk=10):
+    """Per cluster row: [(term, score, count), ...] best first, from the row's non-zero entries only."""
+    out = []
+    for row in range(scores.shape[0]):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        cols, vals, row_counts = scores.indices[start:end], scores.data[start:end], counts.data[start:end]
+        best = np.argsort(-vals, kind="stable")[:topk]
+        out.append([(terms[cols[i]], float(vals[i]), int(row_counts[i])) for i in best])
+    return out
+
+
+def cluster_keywords(token_lists, labels, topk=10):
+    """{cluster id: [(term, score, count), ...]} ranked by class-based TF-IDF."""
+    labels = np.asarray(labels)
+    if len(labels) == 0:
+        return {}
+    X, terms = term_matrix(token_lists)
+    counts, ids = class_counts(X, labels)
+    scores = class_tfidf(counts)
+    return {int(cid): keywords for cid, keywords in zip(ids, top_terms(scores, counts, terms, topk))}
+
+
+def cluster_sizes(labels):
+    ids, sizes = np.unique(np.asarray(labels), return_counts=True)
+    return {int(c): int(n) for c, n in zip(ids, sizes)}
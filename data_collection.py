@@ -1,10 +1,12 @@
 import os
 import json
 import time
+import argparse
 import feedparser
-import pandas as pd
 from datetime import datetime
-import yfinance as yf
+import run_metrics as metrics
+from price_store import PriceStore
+from feed_scheduler import FeedScheduler, load_registry, SEEN_MAX_AGE_DAYS
 
 OUTPUT_DIR = "data_output"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -14,60 +16,139 @@ def clean_entry(entry):
     return {
         "title": entry.get("title", ""),
         "link": entry.get("link", ""),
-        "published": entry.get("published", "")
+        "published": entry.get("published", ""),
+        "guid": entry.get("id", "")
     }
 
+# Parse one feed into cleaned entries; etag/modified make it a conditional request (nothing is sent back if unchanged)
+def fetch_feed(url, max_articles=None, etag=None, modified=None):
+    with metrics.timer("fetch_rss"):
+        feed = feedparser.parse(url, etag=etag, modified=modified)
+    entries = [clean_entry(entry) for entry in feed.entries[:max_articles]]
+    metrics.increment("rss_entries", len(entries))
+    return entries, feed.get("etag"), feed.get("modified")
+
+def fetch_feed_entries(url, max_articles=None):
+    return fetch_feed(url, max_articles)[0]
+
 # Generic fetcher
-def fetch_rss(name, url, filename, max_articles=40):
+def fetch_rss(name, url, filename, max_articles=None):
     print(f"\n📰 Fetching {name} RSS")
-    feed = feedparser.parse(url)
+    articles = fetch_feed_entries(url, max_articles)
 
-    if not feed.entries:
+    if not articles:
         print(f"⚠️ {name}: 0 articles (empty feed or error)")
         return
 
-    articles = [clean_entry(entry) for entry in feed.entries[:max_articles]]
     print(f"✅ {name}: {len(articles)} articles → {filename}")
 
     with open(os.path.join(OUTPUT_DIR, filename), "w", encoding="utf-8") as f:
         json.dump(articles, f, indent=2)
 
-# Specific news fetchers
-def fetch_yahoo_finance_news():     fetch_rss("Yahoo Finance", "https://feeds.finance.yahoo.com/rss/2.0/headline?s=AAPL&region=US&lang=en-US", "yahoo_finance_news.json")
-def fetch_cnbc_news():              fetch_rss("CNBC", "https://www.cnbc.com/id/100003114/device/rss/rss.html", "cnbc_news.json")
-def fetch_marketwatch_news():      fetch_rss("MarketWatch", "https://feeds.marketwatch.com/marketwatch/topstories/", "marketwatch_news.json")
-def fetch_investopedia_news():     fetch_rss("Investopedia", "https://www.investopedia.com/feedbuilder/feed/getfeed/?feedName=rss_headline", "investopedia_news.json")
-def fetch_motley_fool_news():      fetch_rss("Motley Fool", "https://www.fool.com/feeds/index.aspx?type=headline", "motley_fool_news.json")
+# Feed output files are pending queues: entries stay in them until preprocessing has consumed them.
+# Entries older than the seen-GUID window, or beyond PENDING_MAX_ENTRIES per file, are dropped (oldest first).
+PENDING_MAX_AGE_DAYS = SEEN_MAX_AGE_DAYS
+PENDING_MAX_ENTRIES = int(os.getenv("PENDING_MAX_ENTRIES", "5000"))
 
-# Yahoo finance for tickers
-def fetch_yahoo_finance(ticker):
+def read_pending(filename):
+    path = os.path.join(OUTPUT_DIR, filename)
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return []
+
+def write_pending(filename, articles):
+    path = os.path.join(OUTPUT_DIR, filename)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(articles, f, indent=2)
+    os.replace(tmp, path)
+
+# Poll the feeds that are due and append entries not seen before to their output file.
+# Feeds are (name, url, output file) from feeds.json, with per-ticker Yahoo feeds expanded over the S&P 500.
+def poll_feeds(feeds=None, scheduler=None):
+    feeds = feeds or load_registry()
+    scheduler = scheduler or FeedScheduler()
+    due = scheduler.due(feeds)
+    print(f"\n📰 Polling {len(due)} of {len(feeds)} feeds")
+
+    new_by_output = {}
+    for name, url, filename in due:
+        state = scheduler.state(url)
+        try:
+            entries, etag, modified = fetch_feed(url, etag=state["etag"], modified=state["modified"])
+        except Exception as e:
+            print(f"⚠️ {name}: {e}")
+            entries, etag, modified = [], None, None
+        new = scheduler.new_entries(entries)
+        scheduler.record_poll(url, len(new), etag, modified)
+        new_by_output.setdefault(filename, []).extend(new)
+        metrics.increment("feed_polls")
+
+    # Written before the seen GUIDs are saved, so a crash in between re-delivers rather than loses entries
+    for filename, articles in new_by_output.items():
+        if articles:
+            now = time.time()
+            for article in articles:
+                article["collected_at"] = now
+            cutoff = now - PENDING_MAX_AGE_DAYS * 86400
+            # Entries written before collected_at was recorded count as collected now
+            pending = [a for a in read_pending(filename) if a.get("collected_at", now) >= cutoff]
+            kept = (pending + articles)[-PENDING_MAX_ENTRIES:]
+            write_pending(filename, kept)
+            dropped = len(pending) + len(articles) - len(kept)
+            print(f"✅ {filename}: {len(articles)} new articles ({len(pending)} still pending"
+                  f"{f', {dropped} oldest dropped' if dropped else ''})")
+    scheduler.save()
+    return sum(len(a) for a in new_by_output.values())
+
+# Clear the pending entries once preprocessing has consumed them (run_pipeline.py does this right after it succeeds)
+def acknowledge_feeds(feeds=None):
+    outputs = sorted({filename for _, _, filename in (feeds or load_registry())})
+    delivered = 0
+    for filename in outputs:
+        pending = read_pending(filename)
+        if pending:
+            write_pending(filename, [])
+            delivered += len(pending)
+    print(f"✅ {delivered} delivered feed entries cleared from {len(outputs)} feed files")
+    return delivered
+
+# Price history: the first fetch of a ticker backfills INITIAL_PERIOD, later runs only add recent bars
+INITIAL_PERIOD = os.getenv("PRICE_INITIAL_PERIOD", "1y")
+UPDATE_PERIOD = "5d"
+PRICE_SAVE_EVERY = 50  # tickers between store writes
+
+# Yahoo finance for tickers, upserted into the shared price store
+def fetch_yahoo_finance(ticker, store):
+    import yfinance as yf
     print(f"\n📈 Fetching data for: {ticker}")
     stock = yf.Ticker(ticker)
     try:
-        info = stock.info
-        hist = stock.history(period="5d")
+        period = UPDATE_PERIOD if store.last_date(ticker) is not None else INITIAL_PERIOD
+        with metrics.timer("fetch_prices"):
+            info = stock.info
+            hist = stock.history(period=period)
 
         data = {
-            "ticker": ticker,
             "name": info.get("shortName", ""),
             "price": info.get("currentPrice", ""),
             "previousClose": info.get("previousClose", ""),
             "sector": info.get("sector", ""),
-            "history": {
-                str(date): row.to_dict() for date, row in hist.iterrows()
-            }
         }
+        bars = store.upsert(ticker, hist, data)
 
-        with open(os.path.join(OUTPUT_DIR, f"{ticker}_finance.json"), "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-
-        print(f"✔️ {ticker}: {data['price']} ({data['name']})")
+        print(f"✔️ {ticker}: {data['price']} ({data['name']}), {bars} bars")
 
     except Exception as e:
         print(f"❌ {ticker}: Failed to fetch — {e}")
 
 # Scrape S&P 500 tickers from Wikipedia
 def get_sp500_tickers():
+    import pandas as pd
     url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
     tables = pd.read_html(url)
     return tables[0]['Symbol'].tolist()
@@ -77,24 +158,31 @@ def run_data_collection(skip_tickers=False):
     print(f"\n🕒 Running on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     # News
-    fetch_yahoo_finance_news()
-    fetch_cnbc_news()
-    fetch_marketwatch_news()
-    fetch_investopedia_news()
-    fetch_motley_fool_news()
+    poll_feeds()
 
     # Ticker data
     if not skip_tickers:
         tickers = get_sp500_tickers()
         print(f"\n✅ Found {len(tickers)} tickers")
+        store = PriceStore()
         for idx, ticker in enumerate(tickers):
-            fetch_yahoo_finance(ticker)
+            fetch_yahoo_finance(ticker, store)
+            if (idx + 1) % PRICE_SAVE_EVERY == 0:
+                store.save()
             time.sleep(1.5)
+        store.save()
+        print(f"📈 Price store: {len(store.tickers)} tickers, {len(store.keys):,} daily bars → {store.directory}")
 
     print("\n✅ Done! All data saved in:", OUTPUT_DIR)
 
 # Entrypoint
 if __name__ == "__main__":
-    SKIP_TICKERS = os.getenv("SKIP_TICKERS", "false").lower() == "true"
-    run_data_collection(skip_tickers=SKIP_TICKERS)
+    parser = argparse.ArgumentParser(description="Collect RSS news and price history")
+    parser.add_argument("--ack", action="store_true", help="clear the pending feed entries once preprocessing has consumed them")
+    args = parser.parse_args()
+    if args.ack:
+        acknowledge_feeds()
+    else:
+        SKIP_TICKERS = os.getenv("SKIP_TICKERS", "false").lower() == "true"
+        run_data_collection(skip_tickers=SKIP_TICKERS)
 
@@ -1,112 +1,252 @@
 import os
+import re
 import json
-from sentence_transformers import SentenceTransformer
-import umap
-import hdbscan
-from collections import defaultdict, Counter
-import nltk
-from nltk.corpus import stopwords
-
-# Ensure NLTK stopwords are available
-nltk.download("punkt")
-nltk.download("stopwords")
-stop_words = set(stopwords.words("english"))
+import run_metrics as metrics
+import record_io
+import embedding_engine
+from resources import stopwords, SENTENCE_MODEL
+from cluster_terms import cluster_keywords, cluster_sizes
 
 # ---------------------- Configuration ----------------------
 INPUT_DIR = "enriched_data"
-OUTPUT_CLUSTERED_FILE = "data_output/clustered_triplets.json"
+OUTPUT_CLUSTERED_FILE = "data_output/clustered_triplets"  # record_io stem
 OUTPUT_LABELS_FILE = "data_output/cluster_labels.json"
-MODEL_NAME = "all-MiniLM-L6-v2"
+OUTPUT_CENTROIDS_FILE = "data_output/cluster_centroids.npz"
+OUTPUT_POINTS_FILE = "data_output/cluster_points.npz"  # 2D coordinates + labels as arrays for the cluster map
+OUTPUT_UNIQUE_FILE = "data_output/unique_triplets"  # record_io stem: one row per distinct triplet text
+OUTPUT_EMBEDDINGS_FILE = "data_output/triplet_embeddings.npy"  # full-dimensional vectors, row = unique_id
+MODEL_NAME = SENTENCE_MODEL
 MIN_CLUSTER_SIZE = 3
+# Also merge distinct texts whose embeddings are at least this cosine-similar (0 = exact duplicates only)
+NEAR_DUPLICATE_SIMILARITY = float(os.getenv("TRIPLET_NEAR_DUP_SIMILARITY", "0"))
 
 # ---------------------- Step 1: Load and Prepare Triplets ----------------------
-triplet_texts = []
-triplet_data = []
-
-for filename in os.listdir(INPUT_DIR):
-    if not filename.endswith(".json"):
-        continue
-
-    with open(os.path.join(INPUT_DIR, filename), "r", encoding="utf-8") as f:
-        articles = json.load(f)
-
-    for article in articles:
-        subj = article.get("subject", "").strip()
-        verb = article.get("verb", "").strip()
-        obj = article.get("object", "").strip()
-
-        if not subj or not verb or not obj:
-            continue
-
-        triplet_text = f"{subj} {verb} {obj}"
-        triplet_texts.append(triplet_text)
-        triplet_data.append({
-            "triplet": triplet_text,
-            "subject": subj,
-            "verb": verb,
-            "object": obj,
-            "title": article.get("original_title", ""),
-            "published": article.get("published", ""),
-            "tickers": article.get("tickers", []),
-            "source_file": filename
-        })
-
-print(f"🔢 Loaded {len(triplet_texts)} valid triplets.")
+def load_triplets(input_dir=INPUT_DIR):
+    triplet_texts = []
+    triplet_data = []
+
+    for stem in record_io.list_stems(input_dir):
+        for article in record_io.iter_records(os.path.join(input_dir, stem)):
+            # Every triplet of the article; older enriched files only carry the first one as top-level fields
+            for triplet in article.get("triplets") or [article]:
+                subj = triplet.get("subject", "").strip()
+                verb = triplet.get("verb", "").strip()
+                obj = triplet.get("object", "").strip()
+
+                if not subj or not verb or not obj:
+                    continue
+
+                triplet_text = f"{subj} {verb} {obj}"
+                triplet_texts.append(triplet_text)
+                triplet_data.append({
+                    "triplet": triplet_text,
+                    "subject": subj,
+                    "verb": verb,
+                    "object": obj,
+                    "title": article.get("original_title", ""),
+                    "published": article.get("published", ""),
+                    "tickers": article.get("tickers", []),
+                    "source_file": stem,
+                    "article_id": record_io.article_id(article)
+                })
+
+    print(f"🔢 Loaded {len(triplet_texts)} valid triplets.")
+    return triplet_texts, triplet_data
+
+# ---------------------- Step 1b: Deduplicate ----------------------
+# Identical triplet texts ("shares rose percent") are embedded, reduced and clustered once;
+# labels and coordinates are broadcast back to every row afterwards.
+def normalize_triplet(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+def dedupe_triplets(triplet_texts):
+    """(unique texts, unique index per row, multiplicity per unique text) over normalised text."""
+    import numpy as np
+    index = {}
+    unique = []
+    inverse = np.empty(len(triplet_texts), dtype=np.int64)
+    for i, text in enumerate(triplet_texts):
+        j = index.setdefault(normalize_triplet(text), len(unique))
+        if j == len(unique):
+            unique.append(text)
+        inverse[i] = j
+    return unique, inverse, np.bincount(inverse, minlength=len(unique))
+
+def merge_near_duplicates(embeddings, counts, threshold, chunk_size=1024):
+    """(representative item per group, group per item): an item joins the most similar more frequent item
+    when their cosine similarity is at least `threshold`."""
+    import numpy as np
+    unit = np.asarray(embeddings, dtype=np.float32)
+    unit = unit / np.maximum(np.linalg.norm(unit, axis=1, keepdims=True), 1e-12)
+    rank = np.empty(len(unit), dtype=np.int64)
+    rank[np.argsort(-counts, kind="stable")] = np.arange(len(unit))
+
+    parent = np.arange(len(unit))
+    for start in range(0, len(unit), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(unit)))
+        sims = unit[rows] @ unit.T
+        sims[rank[None, :] >= rank[rows][:, None]] = -1.0  # only more frequent items can absorb
+        best = sims.argmax(axis=1)
+        merge = sims[np.arange(len(rows)), best] >= threshold
+        parent[rows[merge]] = best[merge]
+    # Parents always rank higher, so following them ends at a group representative
+    while True:
+        grand = parent[parent]
+        if (grand == parent).all():
+            break
+        parent = grand
+    return np.unique(parent, return_inverse=True)
 
 # ---------------------- Step 2: Embedding ----------------------
-model = SentenceTransformer(MODEL_NAME)
-embeddings = model.encode(triplet_texts, show_progress_bar=True)
+# Length-sorted batches, a process pool for large inputs and an optional quantized/ONNX backend (embedding_engine)
+def embed(triplet_texts):
+    with metrics.timer("embedding", items=len(triplet_texts)):
+        return embedding_engine.encode(triplet_texts, MODEL_NAME, show_progress_bar=True)
 
 # ---------------------- Step 3: UMAP Reduction ----------------------
-umap_model = umap.UMAP(n_neighbors=15, min_dist=0.1, random_state=42)
-embeddings_2d = umap_model.fit_transform(embeddings)
+def reduce_2d(embeddings):
+    import umap
+    umap_model = umap.UMAP(n_neighbors=15, min_dist=0.1, random_state=42)
+    with metrics.timer("umap", items=len(embeddings)):
+        return umap_model.fit_transform(embeddings)
 
 # ---------------------- Step 4: HDBSCAN Clustering ----------------------
-clusterer = hdbscan.HDBSCAN(min_cluster_size=MIN_CLUSTER_SIZE)
-cluster_labels = clusterer.fit_predict(embeddings_2d)
-
-num_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
-print(f"🧭 Found {num_clusters} clusters.")
+# HDBSCAN has no sample weights: an item with multiplicity k is entered min(k, MIN_CLUSTER_SIZE) times,
+# so a text repeated often enough can still form a cluster on its own
+def cluster(embeddings_2d, counts=None):
+    import hdbscan
+    import numpy as np
+    copies = np.ones(len(embeddings_2d), dtype=np.int64) if counts is None else np.minimum(counts, MIN_CLUSTER_SIZE)
+    points = np.repeat(np.asarray(embeddings_2d), copies, axis=0)
+    clusterer = hdbscan.HDBSCAN(min_cluster_size=MIN_CLUSTER_SIZE)
+    with metrics.timer("hdbscan", items=len(points)):
+        cluster_labels = clusterer.fit_predict(points)[np.cumsum(copies) - copies]
+
+    num_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
+    print(f"🧭 Found {num_clusters} clusters.")
+    return cluster_labels
 
 # ---------------------- Step 5: Assign Cluster Metadata ----------------------
-clustered = []
-cluster_to_terms = defaultdict(list)
-
-for i, label in enumerate(cluster_labels):
-    enriched = {
-        **triplet_data[i],
-        "embedding_2d": embeddings_2d[i].tolist(),
-        "cluster_label": int(label)
-    }
-    clustered.append(enriched)
-
-    if label != -1:
-        cluster_to_terms[label].extend([
-            triplet_data[i]["verb"].lower(),
-            triplet_data[i]["object"].lower()
-        ])
+def assign_clusters(triplet_data, embeddings_2d, cluster_labels, unique_ids=None):
+    clustered = []
+    for i, label in enumerate(cluster_labels):
+        enriched = {
+            **triplet_data[i],
+            "embedding_2d": embeddings_2d[i].tolist(),
+            "cluster_label": int(label)
+        }
+        if unique_ids is not None:
+            enriched["unique_id"] = int(unique_ids[i])
+        clustered.append(enriched)
+    return clustered
 
 # ---------------------- Step 6: Label Clusters ----------------------
-cluster_labels_dict = {}
-
-for label, terms in cluster_to_terms.items():
-    filtered = [t for t in terms if t.lower() not in stop_words]
-    most_common = [word for word, _ in Counter(filtered).most_common(2)]
-    label_text = ", ".join(most_common) if most_common else "Unlabelled"
-    cluster_labels_dict[str(label)] = {  # Ensure key is string
-        "label": label_text,
-        "top_terms": most_common,
-        "size": len(terms) // 2  # two terms per triplet
-    }
+# Class-based TF-IDF over verb/object terms: terms frequent in one cluster but rare elsewhere
+def label_clusters(triplet_data, cluster_labels, top_n=2):
+    stop_words = stopwords()
+    tokens = [[t for t in (d["verb"].lower(), d["object"].lower()) if t not in stop_words] for d in triplet_data]
+    keywords = cluster_keywords(tokens, cluster_labels, topk=top_n)
+    sizes = cluster_sizes(cluster_labels)
+
+    cluster_labels_dict = {}
+    for label, terms in keywords.items():
+        if label == -1:
+            continue
+        top_terms = [term for term, _, _ in terms]
+        cluster_labels_dict[str(label)] = {  # Ensure key is string
+            "label": ", ".join(top_terms) if top_terms else "Unlabelled",
+            "top_terms": top_terms,
+            "size": sizes[label]
+        }
+    return cluster_labels_dict
+
+# ---------------------- Step 6b: Cluster Centroids ----------------------
+# Unit-normalised mean embedding per cluster, so new triplets can be assigned without re-running UMAP/HDBSCAN.
+# `weights` (multiplicity of deduplicated texts) gives the same centroids as embedding every row.
+def compute_cluster_centroids(embeddings, cluster_labels, weights=None):
+    import numpy as np
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    cluster_labels = np.asarray(cluster_labels)
+    weights = np.ones(len(embeddings), dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+    labels = np.array(sorted(set(cluster_labels.tolist()) - {-1}), dtype=np.int32)
+    centroids = np.zeros((len(labels), embeddings.shape[1]), dtype=np.float32)
+    for row, label in enumerate(labels):
+        members = cluster_labels == label
+        centroids[row] = np.average(embeddings[members], axis=0, weights=weights[members])
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    return labels, centroids / np.maximum(norms, 1e-12)
+
+def save_centroids(labels, centroids, path=OUTPUT_CENTROIDS_FILE):
+    import numpy as np
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, labels=labels, centroids=centroids)
+    print(f"✅ Saved cluster centroids → {path}")
 
 # ---------------------- Step 7: Save Output ----------------------
-os.makedirs(os.path.dirname(OUTPUT_CLUSTERED_FILE), exist_ok=True)
-
-with open(OUTPUT_CLUSTERED_FILE, "w", encoding="utf-8") as f:
-    json.dump(clustered, f, indent=2)
-
-with open(OUTPUT_LABELS_FILE, "w", encoding="utf-8") as f:
-    json.dump(cluster_labels_dict, f, indent=2)
-
-print(f"✅ Saved clustered triplets → {OUTPUT_CLUSTERED_FILE}")
-print(f"✅ Saved cluster labels → {OUTPUT_LABELS_FILE}")
+def save_outputs(clustered, cluster_labels_dict):
+    os.makedirs(os.path.dirname(OUTPUT_CLUSTERED_FILE), exist_ok=True)
+
+    # Title, date and tickers are stored once per article rather than on every triplet
+    record_io.write_normalized(OUTPUT_CLUSTERED_FILE, clustered,
+                               fields=["title", "published", "tickers", "source_file"])
+
+    with open(OUTPUT_LABELS_FILE, "w", encoding="utf-8") as f:
+        json.dump(cluster_labels_dict, f, indent=2)
+
+    print(f"✅ Saved clustered triplets → {OUTPUT_CLUSTERED_FILE}")
+    print(f"✅ Saved cluster labels → {OUTPUT_LABELS_FILE}")
+
+def save_unique(unique_texts, counts, inverse, triplet_data, embeddings_2d, unique_labels, path=OUTPUT_UNIQUE_FILE):
+    """One row per distinct triplet text with its multiplicity and the articles it came from."""
+    article_ids = [[] for _ in unique_texts]
+    for i, j in enumerate(inverse.tolist()):
+        aid = triplet_data[i]["article_id"]
+        if aid not in article_ids[j]:
+            article_ids[j].append(aid)
+    record_io.write_records(path, ({"unique_id": j, "triplet": text, "count": int(counts[j]),
+                                    "article_ids": article_ids[j], "cluster_label": int(unique_labels[j]),
+                                    "embedding_2d": embeddings_2d[j].tolist()}
+                                   for j, text in enumerate(unique_texts)))
+    print(f"✅ Saved unique triplets → {path}")
+
+def save_embeddings(embeddings, path=OUTPUT_EMBEDDINGS_FILE):
+    """Unit-normalised float32 vectors aligned with unique_triplets, for similar-event search."""
+    import numpy as np
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    tmp = path + ".tmp.npy"
+    np.save(tmp, vectors)
+    os.replace(tmp, path)
+    print(f"✅ Saved triplet embeddings {vectors.shape} → {path}")
+
+def save_points(embeddings_2d, cluster_labels, path=OUTPUT_POINTS_FILE):
+    import numpy as np
+    np.savez(path, xy=np.asarray(embeddings_2d, dtype=np.float32), labels=np.asarray(cluster_labels, dtype=np.int32))
+
+def run_embedding_and_clustering():
+    import numpy as np
+    triplet_texts, triplet_data = load_triplets()
+    unique_texts, inverse, counts = dedupe_triplets(triplet_texts)
+    embeddings = embed(unique_texts)
+    if NEAR_DUPLICATE_SIMILARITY > 0 and len(unique_texts):
+        representatives, group = merge_near_duplicates(embeddings, counts, NEAR_DUPLICATE_SIMILARITY)
+        unique_texts = [unique_texts[r] for r in representatives]
+        embeddings, inverse = embeddings[representatives], group[inverse]
+        counts = np.bincount(inverse, minlength=len(unique_texts))
+    print(f"🧮 {len(triplet_texts)} triplets → {len(unique_texts)} unique items to embed and cluster.")
+    metrics.increment("duplicate_triplets", len(triplet_texts) - len(unique_texts))
+
+    embeddings_2d = reduce_2d(embeddings)
+    unique_labels = cluster(embeddings_2d, counts)
+
+    # Broadcast coordinates and labels back to every row
+    row_points, cluster_labels = embeddings_2d[inverse], unique_labels[inverse]
+    clustered = assign_clusters(triplet_data, row_points, cluster_labels, inverse)
+    save_outputs(clustered, label_clusters(triplet_data, cluster_labels))
+    save_unique(unique_texts, counts, inverse, triplet_data, embeddings_2d, unique_labels)
+    save_embeddings(embeddings)
+    save_points(row_points, cluster_labels)
+    save_centroids(*compute_cluster_centroids(embeddings, unique_labels, weights=counts))
+
+if __name__ == "__main__":
+    run_embedding_and_clustering()
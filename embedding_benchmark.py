@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import argparse
+
+import embedding_engine
+from resources import load_sentence_transformer, SENTENCE_MODEL
+from synthetic_corpus import SyntheticCorpus
+
+# Embedding benchmark: sentences/sec per encoding configuration, and cosine drift against the fp32 embeddings
+# of the current path (one process, default batch size, input order).
+# Texts are the triplets in enriched_data when there are any, otherwise synthetic corpus sentences.
+
+RESULTS_DIR = "benchmark_results"
+BATCH_SIZES = [32, 64, 128, 256]
+
+
+def benchmark_texts(n):
+    from embedding_and_clustering import load_triplets
+    texts, _ = load_triplets()
+    if texts:
+        return (texts * (n // len(texts) + 1))[:n], "enriched_data"
+    corpus = SyntheticCorpus(n // 8 + 1)
+    sentences = [s for i in range(corpus.n_articles) for s in corpus.article(i)["paragraphs"]]
+    return sentences[:n], "synthetic"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(texts, processes, backends):
+    model = load_sentence_transformer(SENTENCE_MODEL, "torch")
+    model.encode(texts[:64])  # warm-up
+
+    reference, seconds = timed(lambda: model.encode(texts))
+    results = [{"config": "current (batch 32, 1 process)", "seconds": round(seconds, 2),
+                "sentences_per_sec": round(len(texts) / seconds, 1), "cosine_mean": 1.0, "cosine_min": 1.0}]
+
+    configs = [(f"torch sorted batch {b}", "torch", b, 1) for b in BATCH_SIZES]
+    if processes > 1:
+        configs.append((f"torch {processes} processes", "torch", embedding_engine.BATCH_SIZE, processes))
+    for backend in backends:
+        configs.append((f"{backend} sorted batch {embedding_engine.BATCH_SIZE}", backend, embedding_engine.BATCH_SIZE, 1))
+
+    for name, backend, batch_size, n_proc in configs:
+        try:
+            load_sentence_transformer(SENTENCE_MODEL, backend).encode(texts[:64])  # load + warm-up outside the timing
+        except Exception as e:
+            print(f"⚠️ {name}: unavailable ({e})")
+            results.append({"config": name, "available": False})
+            continue
+        min_items = embedding_engine.MULTI_PROCESS_MIN_ITEMS
+        embedding_engine.MULTI_PROCESS_MIN_ITEMS = 0  # the pool is what is being measured
+        try:
+            vectors, seconds = timed(lambda: embedding_engine.encode(texts, backend=backend, batch_size=batch_size,
+                                                                     processes=n_proc))
+        finally:
+            embedding_engine.MULTI_PROCESS_MIN_ITEMS = min_items
+        mean, low = embedding_engine.cosine_drift(reference, vectors)
+        results.append({"config": name, "seconds": round(seconds, 2),
+                        "sentences_per_sec": round(len(texts) / seconds, 1),
+                        "cosine_mean": round(mean, 6), "cosine_min": round(low, 6)})
+    return results
+
+
+def print_table(results):
+    print(f"{'config':<32} {'sent/s':>9} {'speedup':>8} {'cos mean':>9} {'cos min':>9}")
+    base = results[0]["sentences_per_sec"]
+    for r in results:
+        if r.get("available") is False:
+            print(f"{r['config']:<32} {'unavailable':>9}")
+            continue
+        print(f"{r['config']:<32} {r['sentences_per_sec']:>9} {r['sentences_per_sec'] / base:>7.2f}x "
+              f"{r['cosine_mean']:>9.5f} {r['cosine_min']:>9.5f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sentence embedding throughput and drift on CPU")
+    parser.add_argument("--texts", type=int, default=20_000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="pool size to compare")
+    parser.add_argument("--backends", default="quantized,onnx", help="extra backends to compare (comma-separated)")
+    args = parser.parse_args()
+
+    texts, source = benchmark_texts(args.texts)
+    results = run_benchmark(texts, args.processes, [b for b in args.backends.split(",") if b])
+    print_table(results)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"embedding_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"texts": len(texts), "source": source, "processes": args.processes, "results": results}, f, indent=2)
+    print(f"📄 {out_path}")
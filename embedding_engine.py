@@ -0,0 +1,74 @@
+import os
+import numpy as np
+
+import run_metrics as metrics
+from resources import load_sentence_transformer, SENTENCE_MODEL
+
+# Sentence embedding on CPU nodes.
+# Texts are sorted by length before batching, so a batch pads to similar lengths; with EMBED_PROCESSES > 1 large
+# inputs are split across a pool of encoder processes. The backend can be the fp32 model, a dynamically
+# int8-quantised copy or ONNX Runtime.
+# Embeddings are returned in input order.
+
+BACKEND = os.getenv("EMBED_BACKEND", "torch")             # torch | quantized | onnx
+BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "128"))
+PROCESSES = int(os.getenv("EMBED_PROCESSES", "1"))          # torch already uses every core in one process
+MULTI_PROCESS_MIN_ITEMS = 20_000   # below this, starting worker processes costs more than it saves
+POOL_CHUNK_SIZE = 5_000            # texts per task handed to a worker
+THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def length_order(texts):
+    """Indices that sort texts longest first (word count, then characters)."""
+    return np.array(sorted(range(len(texts)), key=lambda i: (-len(texts[i].split()), -len(texts[i]))), dtype=np.int64)
+
+
+def start_pool(model, processes):
+    """Encoder worker pool; each worker's torch gets cores / processes threads instead of every core."""
+    threads = str(max(1, (os.cpu_count() or 1) // processes))
+    saved = {var: os.environ.get(var) for var in THREAD_VARS}
+    os.environ.update(dict.fromkeys(THREAD_VARS, threads))  # read by the workers when they start
+    try:
+        return model.start_multi_process_pool(target_devices=["cpu"] * processes)
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def encode(texts, name=SENTENCE_MODEL, backend=BACKEND, batch_size=BATCH_SIZE, processes=PROCESSES,
+           show_progress_bar=False):
+    """(len(texts), dim) float32 embeddings in input order."""
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    model = load_sentence_transformer(name, backend)
+    order = length_order(texts)
+    ordered = [texts[i] for i in order]
+
+    # ONNX Runtime already uses every core within one process, so it is not run in a pool
+    use_pool = processes > 1 and backend != "onnx" and len(texts) >= MULTI_PROCESS_MIN_ITEMS
+    with metrics.timer(f"encode_{backend}", items=len(texts)):
+        if use_pool:
+            pool = start_pool(model, processes)
+            try:
+                vectors = model.encode_multi_process(ordered, pool, batch_size=batch_size, chunk_size=POOL_CHUNK_SIZE)
+            finally:
+                model.stop_multi_process_pool(pool)
+        else:
+            vectors = model.encode(ordered, batch_size=batch_size, show_progress_bar=show_progress_bar,
+                                   convert_to_numpy=True)
+
+    embeddings = np.empty_like(np.asarray(vectors, dtype=np.float32))
+    embeddings[order] = vectors
+    return embeddings
+
+
+def cosine_drift(reference, candidate):
+    """(mean, min) row-wise cosine similarity between two embedding matrices of the same texts."""
+    a = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    b = candidate / np.maximum(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12)
+    cos = (a * b).sum(axis=1)
+    return float(cos.mean()), float(cos.min())
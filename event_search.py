@@ -0,0 +1,188 @@
+import os
+import time
+import argparse
+import numpy as np
+
+import record_io
+import run_metrics as metrics
+from resources import load_sentence_transformer
+from embedding_and_clustering import (MODEL_NAME, OUTPUT_CLUSTERED_FILE, OUTPUT_EMBEDDINGS_FILE,
+                                      OUTPUT_UNIQUE_FILE)
+
+# Similar-event search: "when did something like this happen before?"
+# Queries are matched against the full-dimensional triplet embeddings saved by embedding_and_clustering.
+# Small corpora are searched exactly in chunks; above EXACT_MAX_ITEMS an IVF index (k-means lists, only the
+# lists nearest to the query are scanned) keeps answers in milliseconds.
+
+INDEX_FILE = "data_output/event_index.npz"
+EXACT_MAX_ITEMS = 100_000
+CHUNK_SIZE = 65_536
+IVF_PROBE = 8             # lists scanned per query
+IVF_TRAIN_SAMPLE = 50_000
+IVF_ITERATIONS = 10
+MAX_ARTICLES_PER_EVENT = 5
+
+
+# ------------------ Exact search ------------------
+
+def exact_search(vectors, queries, k, chunk_size=CHUNK_SIZE, ids=None):
+    """(scores, ids) of the k highest inner products per query, best first; vectors scanned in chunks."""
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    best_ids = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        sims = queries @ np.asarray(vectors[start:start + chunk_size]).T
+        top = np.argpartition(-sims, min(k, sims.shape[1]) - 1, axis=1)[:, :k]
+        best_scores = np.hstack([best_scores, np.take_along_axis(sims, top, axis=1)])
+        best_ids = np.hstack([best_ids, top + start])
+        if best_scores.shape[1] > k:
+            keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+            best_ids = np.take_along_axis(best_ids, keep, axis=1)
+    order = np.argsort(-best_scores, axis=1)
+    best_ids = np.take_along_axis(best_ids, order, axis=1)
+    return np.take_along_axis(best_scores, order, axis=1), (best_ids if ids is None else ids[best_ids])
+
+
+# ------------------ IVF index ------------------
+
+def nearest_centroid(vectors, centroids, chunk_size=CHUNK_SIZE):
+    return np.concatenate([np.argmax(np.asarray(vectors[s:s + chunk_size]) @ centroids.T, axis=1)
+                           for s in range(0, len(vectors), chunk_size)]) if len(vectors) else np.zeros(0, np.int64)
+
+
+def build_ivf(vectors, n_lists=None, seed=42):
+    """Spherical k-means centroids on a sample, then every vector filed under its nearest centroid.
+    Returns (centroids, order, offsets): list c holds order[offsets[c]:offsets[c + 1]]."""
+    rng = np.random.default_rng(seed)
+    n_lists = n_lists or max(1, int(4 * np.sqrt(len(vectors))))
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), min(IVF_TRAIN_SAMPLE, len(vectors)), replace=False))])
+    centroids = sample[rng.choice(len(sample), min(n_lists, len(sample)), replace=False)].copy()
+    for _ in range(IVF_ITERATIONS):
+        assign = nearest_centroid(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        filled = np.bincount(assign, minlength=len(centroids)) > 0
+        centroids[filled] = sums[filled] / np.linalg.norm(sums[filled], axis=1, keepdims=True)
+
+    assign = nearest_centroid(vectors, centroids)
+    order = np.argsort(assign, kind="stable")
+    offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+    return centroids, order, offsets
+
+
+def load_ivf(vectors, embeddings_file=OUTPUT_EMBEDDINGS_FILE, path=INDEX_FILE):
+    """IVF index for the current embeddings, rebuilt when the embeddings are newer than the saved index."""
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(embeddings_file):
+        data = np.load(path)
+        if int(data["n"]) == len(vectors):
+            return data["centroids"], data["order"], data["offsets"]
+    with metrics.timer("event_index_build", items=len(vectors)):
+        centroids, order, offsets = build_ivf(vectors)
+    np.savez(path, centroids=centroids, order=order, offsets=offsets, n=len(vectors))
+    print(f"✅ Built IVF index ({len(centroids)} lists) → {path}")
+    return centroids, order, offsets
+
+
+def ivf_search(vectors, ivf, queries, k, probe=IVF_PROBE):
+    centroids, order, offsets = ivf
+    nearest = np.argsort(-(queries @ centroids.T), axis=1)[:, :probe]
+    scores, ids = [], []
+    for query, lists in zip(queries, nearest):
+        candidates = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in lists])
+        if len(candidates) == 0:
+            scores.append(np.zeros(0, dtype=np.float32))
+            ids.append(np.zeros(0, dtype=np.int64))
+            continue
+        candidates.sort()  # sequential reads from the memory-mapped vectors
+        s, i = exact_search(vectors[candidates], query[None, :], min(k, len(candidates)), ids=candidates)
+        scores.append(s[0])
+        ids.append(i[0])
+    return scores, ids
+
+
+# ------------------ Query API ------------------
+
+def query_text(query):
+    """Search text for a free-text query, a triplet dict or a (subject, verb, object) tuple."""
+    if isinstance(query, dict):
+        return " ".join(str(query.get(k, "")).strip() for k in ("subject", "verb", "object")).strip()
+    if isinstance(query, (list, tuple)):
+        return " ".join(str(part).strip() for part in query)
+    return str(query).strip()
+
+
+class EventIndex:
+    def __init__(self, embeddings_file=OUTPUT_EMBEDDINGS_FILE, unique_file=OUTPUT_UNIQUE_FILE,
+                 clustered_file=OUTPUT_CLUSTERED_FILE, approximate=None):
+        self.vectors = np.load(embeddings_file, mmap_mode="r")
+        self.items = sorted(record_io.iter_records(unique_file), key=lambda r: r["unique_id"])
+        if len(self.items) != len(self.vectors):
+            raise ValueError(f"{embeddings_file} and {unique_file} are out of step; re-run embedding_and_clustering.py")
+        if approximate is None:
+            approximate = len(self.vectors) > EXACT_MAX_ITEMS
+        self.ivf = load_ivf(self.vectors, embeddings_file) if approximate else None
+        self.articles = {r["article_id"]: r for r in
+                         record_io.iter_records(clustered_file + record_io.ARTICLE_TABLE_SUFFIX)}
+        self.signals = self._load_signals()
+        self.encoder = load_sentence_transformer(MODEL_NAME)
+
+    def _load_signals(self):
+        """{(title, published): [signal, ...]} from both signal files."""
+        from signal_frames import GPT_FILE, FINBERT_FILE, load_signal_frame
+        signals = {}
+        for path, field, model in ((GPT_FILE, "gpt_signals", "gpt"), (FINBERT_FILE, "finbert_signals", "finbert")):
+            df = load_signal_frame(path, field, model)
+            for title, published, ticker, sentiment, confidence in zip(
+                    df["title"], df["published"], df["ticker"], df["sentiment"], df["confidence"]):
+                signals.setdefault((title, published), []).append(
+                    {"model": model, "ticker": ticker, "sentiment": sentiment, "confidence": float(confidence)})
+        return signals
+
+    def _article(self, aid):
+        meta = self.articles.get(aid, {})
+        return {"article_id": aid, "title": meta.get("title", ""), "published": meta.get("published", ""),
+                "tickers": meta.get("tickers", []),
+                "signals": self.signals.get((meta.get("title", ""), meta.get("published", "")), [])}
+
+    def search_vectors(self, queries, k=10):
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        if self.ivf is not None:
+            return ivf_search(self.vectors, self.ivf, queries, k)
+        return exact_search(self.vectors, queries, min(k, len(self.vectors)))
+
+    def search(self, query, k=10):
+        """The k most similar past events to a text or triplet, with their articles, tickers and signals."""
+        with metrics.timer("event_search"):
+            vector = self.encoder.encode([query_text(query)])
+            scores, ids = self.search_vectors(vector, k)
+        results = []
+        for score, idx in zip(scores[0], ids[0]):
+            item = self.items[int(idx)]
+            results.append({
+                "triplet": item["triplet"],
+                "similarity": round(float(score), 4),
+                "count": item["count"],
+                "cluster_label": item["cluster_label"],
+                "articles": [self._article(aid) for aid in item["article_ids"][:MAX_ARTICLES_PER_EVENT]],
+            })
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find past events similar to a text or triplet")
+    parser.add_argument("query", help='free text, or "subject | verb | object"')
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--approximate", action="store_true", help="force the IVF index for small corpora")
+    args = parser.parse_args()
+
+    index = EventIndex(approximate=True if args.approximate else None)
+    query = tuple(p.strip() for p in args.query.split("|")) if "|" in args.query else args.query
+    start = time.perf_counter()
+    results = index.search(query, args.k)
+    print(f"🔎 {len(results)} similar events in {1000 * (time.perf_counter() - start):.1f} ms")
+    for r in results:
+        print(f"\n{r['similarity']:.3f}  {r['triplet']}  (x{r['count']}, cluster {r['cluster_label']})")
+        for a in r["articles"]:
+            signals = ", ".join(f"{s['model']}:{s['ticker']}={s['sentiment']}" for s in a["signals"]) or "-"
+            print(f"   {a['published']}  {a['title']}  [{', '.join(a['tickers'] or [])}]  {signals}")
@@ -0,0 +1,155 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+import run_metrics as metrics
+from price_store import PriceStore
+from signal_frames import GPT_FILE, FINBERT_FILE, load_signal_frame
+
+# Event study: do signals predict price moves?
+# Every signal is joined to the price store at once: its reference close is the last session close at or before
+# publication (New York time), and forward/abnormal returns are gathered for all horizons with array indexing.
+# Hit rate and information coefficient (IC) are reported per model, confidence bucket and horizon.
+
+RESULTS_DIR = "evaluation_results"
+OUTPUT_FILE = os.path.join(RESULTS_DIR, "event_study.json")
+HORIZONS = [1, 3, 5, 10]                     # trading days after the reference close
+CONFIDENCE_BUCKETS = [0.0, 0.5, 0.7, 0.9, 1.0]
+MARKET_TICKER = os.getenv("EVENT_MARKET_TICKER", "SPY")  # equal-weighted store average when not stored
+MARKET_TZ = "America/New_York"
+MARKET_CLOSE_HOUR = 16
+DIRECTION = {"positive": 1, "neutral": 0, "mixed": 0, "negative": -1}
+
+
+def load_signals():
+    frames = [load_signal_frame(GPT_FILE, "gpt_signals", "gpt"),
+              load_signal_frame(FINBERT_FILE, "finbert_signals", "finbert")]
+    df = pd.concat(frames, ignore_index=True)
+    df = df.dropna(subset=["published_at"])
+    return df[(df["ticker"] != "") & df["sentiment"].isin(list(DIRECTION))].reset_index(drop=True)
+
+
+def reference_days(published_at):
+    """Day number of the last session close at or before each publication time."""
+    local = published_at.dt.tz_convert(MARKET_TZ)
+    day = local.dt.tz_localize(None).dt.normalize()
+    before_close = local.dt.hour < MARKET_CLOSE_HOUR
+    day = day - pd.to_timedelta(before_close.astype(int), unit="D")
+    return day.to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def market_index(closes, market_ticker=MARKET_TICKER):
+    """Cumulative market level per session: the benchmark ticker, or an equal-weighted average of daily returns."""
+    if market_ticker in closes:
+        return closes[market_ticker].ffill().to_numpy()
+    daily = closes.pct_change(fill_method=None).mean(axis=1, skipna=True).fillna(0.0)
+    return (1 + daily).cumprod().to_numpy()
+
+
+def forward_returns(signals, closes, horizons=HORIZONS, market_ticker=MARKET_TICKER):
+    """Adds ret_<h> and abn_<h> columns (simple and market-adjusted returns) for every signal and horizon."""
+    sessions = closes.index.to_numpy().astype("datetime64[D]").astype(np.int64)
+    prices = closes.to_numpy(dtype=float)
+    market = market_index(closes, market_ticker)
+
+    col = pd.Categorical(signals["ticker"], categories=closes.columns).codes.astype(np.int64)
+    t0 = np.searchsorted(sessions, reference_days(signals["published_at"]), side="right") - 1
+    valid = (col >= 0) & (t0 >= 0)
+    t0c, colc = np.clip(t0, 0, None), np.clip(col, 0, None)
+    base = np.where(valid, prices[t0c, colc], np.nan)
+    market_base = np.where(valid, market[t0c], np.nan)
+
+    out = signals.copy()
+    for h in horizons:
+        ok = valid & (t0 + h < len(sessions))
+        th = np.clip(t0 + h, 0, len(sessions) - 1)
+        ret = np.where(ok, prices[th, colc] / base - 1, np.nan)
+        market_ret = np.where(ok, market[th] / market_base - 1, np.nan)
+        out[f"ret_{h}"] = ret
+        out[f"abn_{h}"] = ret - market_ret
+    return out
+
+
+def _rank_ic(score, ret):
+    """Spearman correlation via ranks (no scipy needed)."""
+    if len(score) < 3:
+        return None
+    a, b = score.rank().to_numpy(), ret.rank().to_numpy()
+    if a.std() == 0 or b.std() == 0:
+        return None
+    return round(float(np.corrcoef(a, b)[0, 1]), 4)
+
+
+def summarise(events, horizons=HORIZONS, buckets=CONFIDENCE_BUCKETS):
+    """Rows of n, mean return, mean abnormal return, hit rate and IC per model x confidence bucket x horizon."""
+    events = events.copy()
+    events["direction"] = events["sentiment"].map(DIRECTION)
+    events["score"] = events["direction"] * events["confidence"]
+    events["bucket"] = pd.cut(events["confidence"], buckets, include_lowest=True).astype(str)
+
+    rows = []
+    for h in horizons:
+        ret, abn = f"ret_{h}", f"abn_{h}"
+        sample = events.dropna(subset=[abn])
+        # Hit: a directional signal whose abnormal return has the same sign
+        directional = sample["direction"] != 0
+        sample = sample.assign(hit=np.where(directional, np.sign(sample[abn]) == sample["direction"], np.nan))
+        for bucket_field in ("all", "bucket"):
+            keys = ["model"] if bucket_field == "all" else ["model", "bucket"]
+            for key, group in sample.groupby(keys, observed=True):
+                key = key if isinstance(key, tuple) else (key,)
+                rows.append({
+                    "model": key[0],
+                    "confidence": key[1] if len(key) > 1 else "all",
+                    "horizon": h,
+                    "n": int(len(group)),
+                    "mean_return": round(float(group[ret].mean()), 5),
+                    "mean_abnormal": round(float(group[abn].mean()), 5),
+                    "hit_rate": round(float(group["hit"].mean()), 4) if group["hit"].notna().any() else None,
+                    "ic": _rank_ic(group["score"], group[abn]),
+                })
+    return rows
+
+
+def run_event_study(horizons=HORIZONS, output_file=OUTPUT_FILE):
+    signals = load_signals()
+    if signals.empty:
+        print("⚠️ No dated signals to evaluate.")
+        return []
+    store = PriceStore()
+    if not store.tickers:
+        print(f"⚠️ Price store {store.directory} is empty. Run data_collection.py first.")
+        return []
+
+    with metrics.timer("event_study", items=len(signals)):
+        tickers = sorted(set(signals["ticker"]) | {MARKET_TICKER})
+        start = signals["published_at"].min().tz_convert(MARKET_TZ).date() - pd.Timedelta(days=7)
+        closes = store.frame(tickers, start=start)
+        if closes.empty:
+            print("⚠️ No stored prices for the signalled tickers.")
+            return []
+        events = forward_returns(signals, closes, horizons)
+        rows = summarise(events, horizons)
+
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({"horizons": horizons, "signals": int(len(signals)),
+                   "priced": int(events[f"abn_{horizons[0]}"].notna().sum()), "results": rows}, f, indent=2)
+
+    print(f"{'model':<8} {'confidence':<12} {'h':>3} {'n':>7} {'abn':>8} {'hit':>6} {'ic':>7}")
+    for r in rows:
+        ic = f"{r['ic']:.3f}" if r["ic"] is not None else "-"
+        hit = f"{r['hit_rate']:.3f}" if r["hit_rate"] is not None else "-"
+        print(f"{r['model']:<8} {r['confidence']:<12} {r['horizon']:>3} {r['n']:>7} {r['mean_abnormal']:>8.4f} "
+              f"{hit:>6} {ic:>7}")
+    print(f"✅ Event study over {len(signals):,} signals → {output_file}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event study of GPT/FinBERT signals against forward returns")
+    parser.add_argument("--horizons", default=",".join(map(str, HORIZONS)), help="trading-day horizons, e.g. 1,5,10")
+    args = parser.parse_args()
+    run_event_study([int(h) for h in args.horizons.split(",") if h])
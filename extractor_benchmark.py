@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import argparse
+from collections import Counter
+
+import article_extractors
+from synthetic_corpus import SyntheticCorpus
+
+# Extractor benchmark over local HTML: pages/sec and text quality (token F1 against the known text) per extractor.
+# Fixtures are synthetic corpus pages by default, or a directory of <name>.html files with <name>.txt gold text.
+
+RESULTS_DIR = "benchmark_results"
+
+
+def synthetic_fixtures(n_pages, seed=42):
+    corpus = SyntheticCorpus(n_pages, seed)
+    return [(f"synthetic_{i}", corpus.article_html(i), " ".join(corpus.article(i)["paragraphs"]))
+            for i in range(n_pages)]
+
+
+def directory_fixtures(path):
+    fixtures = []
+    for name in sorted(os.listdir(path)):
+        if not name.endswith(".html"):
+            continue
+        stem = name[:-len(".html")]
+        with open(os.path.join(path, name), "r", encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        gold_path = os.path.join(path, stem + ".txt")
+        gold = None
+        if os.path.exists(gold_path):
+            with open(gold_path, "r", encoding="utf-8") as f:
+                gold = f.read()
+        fixtures.append((stem, html, gold))
+    return fixtures
+
+
+def token_scores(text, gold):
+    """Bag-of-words precision/recall/F1 of extracted text against the gold text."""
+    got = Counter(text.lower().split())
+    want = Counter(gold.lower().split())
+    overlap = sum((got & want).values())
+    precision = overlap / max(sum(got.values()), 1)
+    recall = overlap / max(sum(want.values()), 1)
+    f1 = 2 * precision * recall / (precision + recall) if overlap else 0.0
+    return precision, recall, f1
+
+
+def bench(name, extract, fixtures):
+    scores = []
+    extracted = 0
+    start = time.process_time()
+    wall = time.perf_counter()
+    for _, html, gold in fixtures:
+        try:
+            text = extract(html)
+        except ImportError:
+            return {"extractor": name, "available": False}
+        except Exception:
+            text = ""
+        if len(text.split()) >= article_extractors.MIN_WORDS:
+            extracted += 1
+        if gold:
+            scores.append(token_scores(text, gold))
+    cpu = time.process_time() - start
+    wall = time.perf_counter() - wall
+
+    result = {
+        "extractor": name,
+        "available": True,
+        "pages": len(fixtures),
+        "pages_per_sec": round(len(fixtures) / wall, 1) if wall else None,
+        "cpu_ms_per_page": round(1000 * cpu / max(len(fixtures), 1), 2),
+        "extracted_share": round(extracted / max(len(fixtures), 1), 3),
+    }
+    if scores:
+        for i, field in enumerate(("precision", "recall", "f1")):
+            result[field] = round(sum(s[i] for s in scores) / len(scores), 3)
+    return result
+
+
+def run_benchmark(fixtures):
+    results = []
+    for name in article_extractors.DEFAULT_ORDER:
+        fn = article_extractors.EXTRACTORS[name]
+        results.append(bench(name, lambda html, fn=fn: fn(html, "http://localhost/"), fixtures))
+    results.append(bench("chain", lambda html: article_extractors.extract_text(html, "http://localhost/"), fixtures))
+    return results
+
+
+def print_table(results):
+    print(f"{'extractor':<12} {'pages/s':>9} {'cpu ms':>8} {'ok':>6} {'prec':>6} {'recall':>7} {'f1':>6}")
+    for r in results:
+        if not r["available"]:
+            print(f"{r['extractor']:<12} {'not installed':>9}")
+            continue
+        print(f"{r['extractor']:<12} {r['pages_per_sec']:>9} {r['cpu_ms_per_page']:>8} {r['extracted_share']:>6} "
+              f"{r.get('precision', '-'):>6} {r.get('recall', '-'):>7} {r.get('f1', '-'):>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark article text extractors on local HTML")
+    parser.add_argument("--fixtures", default=None, help="directory of .html (+ optional .txt gold) files")
+    parser.add_argument("--pages", type=int, default=500, help="synthetic pages when no fixture dir is given")
+    args = parser.parse_args()
+
+    fixtures = directory_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures(args.pages)
+    results = run_benchmark(fixtures)
+    print_table(results)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"extractors_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"fixtures": args.fixtures or f"synthetic:{args.pages}", "results": results}, f, indent=2)
+    print(f"📄 {out_path}")
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+
+# Config-driven feed registry and adaptive polling.
+# feeds.json lists plain feeds and ticker feed templates; a template expands to one feed per group of
+# `tickers_per_feed` S&P 500 symbols, so the whole index is covered with a few dozen requests.
+# Each feed's polling interval follows its observed publish rate (busy feeds are polled more often, quiet ones
+# back off), and GUIDs already seen are remembered so only new entries go downstream.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_FILE = os.path.join(REPO_DIR, "feeds.json")
+TICKER_FILE = "sp500_ticker_mapping.json"  # generated by save_sp500_ticker_mapping.py in the working directory
+STATE_FILE = "data_output/feed_state.json"
+
+MIN_INTERVAL = 5 * 60          # seconds
+MAX_INTERVAL = 6 * 60 * 60
+DEFAULT_INTERVAL = 30 * 60
+TARGET_NEW_PER_POLL = 10       # aim to pick up about this many new entries per poll
+BACKOFF = 1.5                  # interval growth after a poll with nothing new
+RATE_SMOOTHING = 0.3           # weight of the latest poll in the publish-rate estimate
+SEEN_MAX_AGE_DAYS = 14
+
+
+# ------------------ Registry ------------------
+
+def load_tickers(path=TICKER_FILE):
+    """S&P 500 symbols from the ticker mapping in the working directory (or next to this file); [] if there is none."""
+    if not os.path.exists(path) and not os.path.isabs(path):
+        path = os.path.join(REPO_DIR, path)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    return sorted({(t["ticker"] if isinstance(t, dict) else t).upper() for t in mapping.values()})
+
+
+def load_registry(path=REGISTRY_FILE, tickers=None):
+    """[(name, url, output file)] for every plain feed and every expanded ticker feed."""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    feeds = [(f["name"], f["url"], f["output"]) for f in config.get("feeds", [])]
+
+    tickers = load_tickers() if tickers is None else tickers
+    for template in config.get("ticker_feeds", []):
+        symbols = tickers
+        if not symbols:
+            symbols = template.get("default_tickers", [])
+            print(f"⚠️ No {TICKER_FILE} (run save_sp500_ticker_mapping.py); "
+                  f"{template['name'].format(tickers='')}feeds only cover {', '.join(symbols) or 'nothing'}")
+        size = max(1, int(template.get("tickers_per_feed", 1)))
+        for start in range(0, len(symbols), size):
+            group = ",".join(symbols[start:start + size])
+            feeds.append((template["name"].format(tickers=group), template["url"].format(tickers=group),
+                          template["output"]))
+    return feeds
+
+
+# ------------------ Scheduler ------------------
+
+class FeedScheduler:
+    """Per-feed polling state and seen GUIDs; path=None keeps everything in memory."""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.feeds = {}   # url -> {interval, next_poll, last_poll, rate, etag, modified}
+        self.seen = {}    # guid -> first seen (epoch seconds)
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.feeds = state.get("feeds", {})
+            self.seen = state.get("seen", {})
+
+    def save(self):
+        cutoff = time.time() - SEEN_MAX_AGE_DAYS * 86400
+        self.seen = {guid: t for guid, t in self.seen.items() if t >= cutoff}
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"feeds": self.feeds, "seen": self.seen}, f)
+        os.replace(tmp, self.path)
+
+    def state(self, url):
+        return self.feeds.setdefault(url, {"interval": DEFAULT_INTERVAL, "next_poll": 0, "last_poll": None,
+                                           "rate": None, "etag": None, "modified": None})
+
+    def due(self, feeds, now=None):
+        """Feeds whose next poll time has passed, most overdue first."""
+        now = time.time() if now is None else now
+        due = [feed for feed in feeds if self.state(feed[1])["next_poll"] <= now]
+        return sorted(due, key=lambda feed: self.state(feed[1])["next_poll"])
+
+    def new_entries(self, entries, now=None):
+        """Entries whose GUID has not been seen (in any feed); marks them as seen."""
+        now = time.time() if now is None else now
+        fresh = []
+        for entry in entries:
+            guid = entry.get("guid") or entry.get("link") or f"{entry.get('title')}|{entry.get('published')}"
+            if guid in self.seen:
+                continue
+            self.seen[guid] = now
+            fresh.append(entry)
+        return fresh
+
+    def record_poll(self, url, new_count, etag=None, modified=None, now=None):
+        """Updates the feed's publish-rate estimate and schedules its next poll."""
+        now = time.time() if now is None else now
+        s = self.state(url)
+        if s["last_poll"] is not None:
+            elapsed = max(now - s["last_poll"], 1.0)
+            observed = new_count / elapsed
+            s["rate"] = observed if s["rate"] is None else (1 - RATE_SMOOTHING) * s["rate"] + RATE_SMOOTHING * observed
+        if new_count == 0:
+            s["interval"] = s["interval"] * BACKOFF
+        elif s["rate"]:
+            s["interval"] = TARGET_NEW_PER_POLL / s["rate"]
+        s["interval"] = min(max(s["interval"], MIN_INTERVAL), MAX_INTERVAL)
+        s["last_poll"] = now
+        s["next_poll"] = now + s["interval"]
+        s["etag"], s["modified"] = etag or s["etag"], modified or s["modified"]
+
+    def next_poll(self, feeds):
+        return min((self.state(url)["next_poll"] for _, url, _ in feeds), default=None)
+
+
+if __name__ == "__main__":
+    feeds = load_registry()
+    scheduler = FeedScheduler()
+    now = time.time()
+    print(f"📡 {len(feeds)} feeds, {len(scheduler.due(feeds, now))} due now, {len(scheduler.seen)} GUIDs remembered")
+    for name, url, _ in sorted(feeds, key=lambda f: scheduler.state(f[1])["interval"])[:15]:
+        s = scheduler.state(url)
+        rate = f"{3600 * s['rate']:.1f}/h" if s["rate"] else "-"
+        print(f"   {name[:50]:<50} every {s['interval'] / 60:6.1f} min   rate {rate}")
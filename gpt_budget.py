@@ -0,0 +1,145 @@
+import os
+import json
+import math
+import time
+from functools import lru_cache
+
+import run_metrics as metrics
+
+# Token/dollar budget and priority order for GPT scoring.
+# Items are ranked by recency, candidate tickers and index weight; whatever does not fit this run's
+# budget is written to a backlog and offered again on the next run.
+
+TOKEN_BUDGET = int(os.getenv("GPT_TOKEN_BUDGET", "200000"))           # per run, prompt + completion
+DOLLAR_BUDGET = float(os.getenv("GPT_DOLLAR_BUDGET", "0")) or None    # optional, per run
+EXPECTED_COMPLETION_TOKENS = 150
+BACKLOG_FILE = "data_output/gpt_backlog.json"
+INDEX_WEIGHTS_FILE = "index_weights.json"  # optional {ticker: weight in the index}
+
+# USD per 1M tokens (prompt, completion)
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+# Priority = weighted sum of three scores in [0, 1]
+RECENCY_HALF_LIFE_HOURS = 24
+W_RECENCY = 0.5
+W_TICKERS = 0.3
+W_INDEX = 0.2
+MAX_TICKERS = 5           # more candidate tickers than this no longer raise priority
+FULL_INDEX_WEIGHT = 0.05  # combined index weight that counts as fully important
+
+
+# ------------------ Estimates ------------------
+
+@lru_cache(maxsize=None)
+def _encoder(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(text, model="gpt-4o-mini"):
+    """Exact with tiktoken when installed, otherwise ~4 characters per token."""
+    enc = _encoder(model)
+    return len(enc.encode(text)) if enc else math.ceil(len(text) / 4)
+
+
+def cost(prompt_tokens, completion_tokens, model="gpt-4o-mini"):
+    prompt_price, completion_price = PRICES.get(model, PRICES["gpt-4o-mini"])
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+# ------------------ Priority ------------------
+
+@lru_cache(maxsize=None)
+def load_index_weights(path=INDEX_WEIGHTS_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {k.upper(): float(v) for k, v in json.load(f).items()}
+
+
+def priorities(items, now=None):
+    """Priority per item (higher first) from its published date, ticker count and index weight."""
+    from signal_frames import parse_published_dates
+    now = now or time.time()
+    weights = load_index_weights()
+
+    published = parse_published_dates([item.get("published") or "" for item in items])
+    out = []
+    for item, ts in zip(items, published):
+        age_hours = max(0.0, (now - ts.timestamp()) / 3600) if not _missing(ts) else None
+        recency = 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS) if age_hours is not None else 0.0
+        tickers = [t.upper() for t in item.get("tickers") or [] if t]
+        ticker_score = min(len(tickers), MAX_TICKERS) / MAX_TICKERS
+        index_score = min(sum(weights.get(t, 0.0) for t in tickers) / FULL_INDEX_WEIGHT, 1.0)
+        score = W_RECENCY * recency + W_TICKERS * ticker_score + W_INDEX * index_score
+        # Articles kept by relevance_filter in flag mode carry their classifier score
+        relevance = item.get("relevance")
+        out.append(score * relevance if relevance is not None else score)
+    return out
+
+
+def _missing(ts):
+    return ts is None or ts != ts  # NaT compares unequal to itself
+
+
+# ------------------ Budget ------------------
+
+class Budget:
+    """Spend for one run, charged from the actual `resp.usage` of each call."""
+
+    def __init__(self, tokens=TOKEN_BUDGET, dollars=DOLLAR_BUDGET, model="gpt-4o-mini"):
+        self.tokens = tokens
+        self.dollars = dollars
+        self.model = model
+        self.spent_tokens = 0
+        self.spent_dollars = 0.0
+
+    def affordable(self, prompt_tokens):
+        tokens = prompt_tokens + EXPECTED_COMPLETION_TOKENS
+        if self.tokens and self.spent_tokens + tokens > self.tokens:
+            return False
+        if self.dollars and self.spent_dollars + cost(prompt_tokens, EXPECTED_COMPLETION_TOKENS, self.model) > self.dollars:
+            return False
+        return True
+
+    def charge(self, usage):
+        if usage is None:
+            return
+        get = (lambda k: usage.get(k)) if isinstance(usage, dict) else (lambda k: getattr(usage, k, None))
+        prompt_tokens = int(get("prompt_tokens") or 0)
+        completion_tokens = int(get("completion_tokens") or 0)
+        self.spent_tokens += prompt_tokens + completion_tokens
+        self.spent_dollars += cost(prompt_tokens, completion_tokens, self.model)
+
+    def summary(self):
+        return {"spent_tokens": self.spent_tokens, "token_budget": self.tokens,
+                "spent_usd": round(self.spent_dollars, 4), "usd_budget": self.dollars}
+
+
+# ------------------ Backlog ------------------
+
+def load_backlog(path=BACKLOG_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_backlog(items, path=BACKLOG_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(items, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    metrics.increment("gpt_items_deferred", len(items))
@@ -1,136 +1,104 @@
-import json
-from collections import Counter, defaultdict
-from datetime import datetime
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+import pandas as pd
 
-# ─── Helper: Robust date parsing ───────────────────────────────────────────────
-def parse_published_date(published):
-    for fmt in ["%a, %d %b %Y %H:%M:%S %z", "%a, %d %b %Y %H:%M:%S %Z"]:
-        try:
-            return datetime.strptime(published, fmt).date()
-        except ValueError:
-            continue
-    print(f"⚠️ Date parse failed: {published}")
-    return None
+from signal_frames import GPT_FILE, load_signal_frame
 
-# ─── Load Data ─────────────────────────────────────────────────────────────────
-with open("data_output/gpt_signals_combined.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# ─── Containers ────────────────────────────────────────────────────────────────
-ticker_counter = Counter()
-sentiment_counter = Counter()
-sentiment_by_date = defaultdict(Counter)
-
-# ─── Parse and Aggregate ───────────────────────────────────────────────────────
-for entry in data:
-    date = parse_published_date(entry.get("published", ""))
-    if not date:
-        continue
-
-    for signal in entry.get("gpt_signals", []):
-        ticker = signal.get("ticker", "").strip().upper()
-        sentiment = signal.get("sentiment", "").strip().capitalize()
-
-        if ticker:
-            ticker_counter[ticker] += 1
-        if sentiment:
-            sentiment_counter[sentiment] += 1
-            sentiment_by_date[date][sentiment] += 1
+SENTIMENT_TYPES = ["Positive", "Negative", "Neutral", "Mixed"]
 
 # ─── Plot 1: Top 10 Most Mentioned Tickers ─────────────────────────────────────
-top_tickers = ticker_counter.most_common(10)
-if top_tickers:
-    tickers, counts = zip(*top_tickers)
-    plt.figure(figsize=(12, 6))
-    plt.bar(tickers, counts, color='skyblue')
-    plt.title("Top 10 Most Mentioned Tickers (GPT Signals)")
-    plt.xlabel("Ticker")
-    plt.ylabel("Mention Count")
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
-else:
-    print("No tickers found.")
+def plot_top_tickers(signals):
+    top_tickers = signals.loc[signals["ticker"] != "", "ticker"].value_counts().head(10)
+    if top_tickers.empty:
+        print("No tickers found.")
+        return None
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.bar(top_tickers.index, top_tickers.values, color='skyblue')
+    ax.set_title("Top 10 Most Mentioned Tickers (GPT Signals)")
+    ax.set_xlabel("Ticker")
+    ax.set_ylabel("Mention Count")
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+    fig.tight_layout()
+    return fig
 
 # ─── Plot 2: Sentiment Distribution (Pie Chart) ────────────────────────────────
-if sentiment_counter:
-    labels = list(sentiment_counter.keys())
-    sizes = list(sentiment_counter.values())
-    plt.figure(figsize=(6, 6))
-    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-    plt.title("Sentiment Distribution (GPT Signals)")
-    plt.tight_layout()
-    plt.show()
-else:
-    print("No sentiment data.")
+def plot_sentiment_distribution(signals):
+    counts = signals.loc[signals["sentiment"] != "", "sentiment"].str.capitalize().value_counts(sort=False)
+    if counts.empty:
+        print("No sentiment data.")
+        return None
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.pie(counts.values, labels=counts.index, autopct='%1.1f%%', startangle=140)
+    ax.set_title("Sentiment Distribution (GPT Signals)")
+    fig.tight_layout()
+    return fig
 
 # ─── Plot 3: Sentiment Over Time (Dynamic Line/Bar) ────────────────────────────
-if sentiment_by_date:
-    all_dates = sorted(sentiment_by_date)
-    sentiment_types = ["Positive", "Negative", "Neutral", "Mixed"]
+def plot_sentiment_over_time(signals):
+    dated = signals.dropna(subset=["published_at"])
+    dated = dated[dated["sentiment"] != ""]
+    if dated.empty:
+        print("No sentiment-by-date data.")
+        return None
 
-    if len(all_dates) == 1:
-        # Bar chart for single-day data
-        date = all_dates[0]
-        counts = [sentiment_by_date[date].get(s, 0) for s in sentiment_types]
+    by_date = pd.crosstab(dated["published_at"].dt.date, dated["sentiment"].str.capitalize())
+    by_date = by_date.reindex(columns=SENTIMENT_TYPES, fill_value=0)
 
-        plt.figure(figsize=(8, 5))
-        plt.bar(sentiment_types, counts, color=["blue", "orange", "green", "red"][:len(counts)])
-        plt.title(f"Sentiment Breakdown on {date}")
-        plt.xlabel("Sentiment")
-        plt.ylabel("Signal Count")
-        plt.tight_layout()
-        plt.show()
+    if len(by_date) == 1:
+        # Bar chart for single-day data
+        date = by_date.index[0]
+        fig, ax = plt.subplots(figsize=(8, 5))
+        ax.bar(SENTIMENT_TYPES, by_date.iloc[0].values, color=["blue", "orange", "green", "red"])
+        ax.set_title(f"Sentiment Breakdown on {date}")
+        ax.set_xlabel("Sentiment")
+        ax.set_ylabel("Signal Count")
     else:
         # Line chart for multi-day data
-        plt.figure(figsize=(12, 6))
-        for s in sentiment_types:
-            y = [sentiment_by_date[d].get(s, 0) for d in all_dates]
-            if any(y):
-                plt.plot(all_dates, y, label=s, marker="o")
-
-        plt.title("Sentiment Trend Over Time (GPT Signals)")
-        plt.xlabel("Date")
-        plt.ylabel("Signal Count")
-        plt.xticks(rotation=45)
-        plt.xlim(min(all_dates), max(all_dates))
-        plt.ylim(bottom=0)
-        plt.legend()
-        plt.tight_layout()
-        plt.show()
-else:
-    print("No sentiment-by-date data.")
+        fig, ax = plt.subplots(figsize=(12, 6))
+        for s in SENTIMENT_TYPES:
+            if by_date[s].any():
+                ax.plot(by_date.index, by_date[s].values, label=s, marker="o")
+
+        ax.set_title("Sentiment Trend Over Time (GPT Signals)")
+        ax.set_xlabel("Date")
+        ax.set_ylabel("Signal Count")
+        plt.setp(ax.get_xticklabels(), rotation=45)
+        ax.set_xlim(by_date.index.min(), by_date.index.max())
+        ax.set_ylim(bottom=0)
+        ax.legend()
+    fig.tight_layout()
+    return fig
 
 # ─── Plot 4: Signal Volume Over Time (Hourly) ──────────────────────────────────
-timestamps = []
-for entry in data:
-    pub_date = entry.get("published", "").strip()
-    try:
-        dt = datetime.strptime(pub_date, "%a, %d %b %Y %H:%M:%S GMT")
-        hour_key = dt.replace(minute=0, second=0, microsecond=0)
-        for _ in entry.get("gpt_signals", []):
-            timestamps.append(hour_key)
-    except Exception:
-        continue
-
-counts = Counter(timestamps)
-sorted_items = sorted(counts.items())
-
-x = [dt for dt, _ in sorted_items]
-y = [count for _, count in sorted_items]
-
-if x:
-    plt.figure(figsize=(10, 5))
-    plt.plot(x, y, marker='o')
-    plt.title("Signal Volume Over Time")
-    plt.xlabel("Date/Hour")
-    plt.ylabel("Number of Signals")
-    plt.grid(True)
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H'))
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.show()
-else:
-    print("No valid timestamps found for volume plot.")
+def plot_signal_volume(signals):
+    hourly = signals["published_at"].dropna().dt.floor("h").value_counts().sort_index()
+    if hourly.empty:
+        print("No valid timestamps found for volume plot.")
+        return None
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(hourly.index.tz_localize(None), hourly.values, marker='o')
+    ax.set_title("Signal Volume Over Time")
+    ax.set_xlabel("Date/Hour")
+    ax.set_ylabel("Number of Signals")
+    ax.grid(True)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H'))
+    plt.setp(ax.get_xticklabels(), rotation=45)
+    fig.tight_layout()
+    return fig
+
+def chart_jobs(signals):
+    return [
+        ("gpt_top_tickers", plot_top_tickers, (signals,)),
+        ("gpt_sentiment_distribution", plot_sentiment_distribution, (signals,)),
+        ("gpt_sentiment_over_time", plot_sentiment_over_time, (signals,)),
+        ("gpt_signal_volume", plot_signal_volume, (signals,)),
+    ]
+
+if __name__ == "__main__":
+    from report_rendering import render_figures
+    render_figures(chart_jobs(load_signal_frame(GPT_FILE, "gpt_signals")))
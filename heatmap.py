@@ -1,52 +1,43 @@
-import yfinance as yf
-import json
-import pandas as pd
-from collections import defaultdict
-import seaborn as sns
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+import seaborn as sns
+
+from signal_frames import GPT_FILE, load_signal_frame
+from sentiment_series import sector_map
+
+VALID_SENTIMENTS = {"positive", "neutral", "negative"}
 
-# Load your GPT output file
-with open("data_output/gpt_signals_combined.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# Flatten signals and collect sectors
-rows = []
-for article in data:
-    date = article.get("published", "")[:10]  # Extract YYYY-MM-DD
-    for signal in article.get("gpt_signals", []):
-        ticker = signal.get("ticker")
-        sentiment = signal.get("sentiment")
-        confidence = signal.get("confidence", 0.0)
-        if not ticker or sentiment not in {"positive", "neutral", "negative"}:
-            continue
-        rows.append({"date": date, "ticker": ticker, "sentiment": sentiment, "confidence": confidence})
-
-df = pd.DataFrame(rows)
-
-# Get unique tickers
-unique_tickers = df["ticker"].unique().tolist()
-
-# Fetch sector info using yfinance
-sector_map = {}
-for ticker in unique_tickers:
-    try:
-        info = yf.Ticker(ticker).info
-        sector = info.get("sector", "Unknown")
-        sector_map[ticker] = sector
-    except Exception:
-        sector_map[ticker] = "Unknown"
-
-# Add sector column
-df["sector"] = df["ticker"].map(sector_map)
+# Sector info from yfinance, cached in data_output/sector_map.json
+def fetch_sector_map(tickers):
+    return sector_map(tickers)
 
 # Group by sector and sentiment
-heatmap_data = df.groupby(["sector", "sentiment"]).size().unstack(fill_value=0)
-
-# Plot heatmap
-plt.figure(figsize=(12, 8))
-sns.heatmap(heatmap_data, annot=True, fmt="d", cmap="coolwarm", linewidths=0.5, linecolor='gray')
-plt.title("Sentiment Distribution per Sector")
-plt.ylabel("Sector")
-plt.xlabel("Sentiment")
-plt.tight_layout()
-plt.show()
+def build_sector_counts(signals):
+    df = signals[(signals["ticker"] != "") & signals["sentiment"].isin(VALID_SENTIMENTS)].copy()
+    if df.empty:
+        return None
+    sector_map = fetch_sector_map(df["ticker"].unique().tolist())
+    df["sector"] = df["ticker"].map(sector_map)
+    return df.groupby(["sector", "sentiment"]).size().unstack(fill_value=0)
+
+def plot_sector_heatmap(heatmap_data):
+    if heatmap_data is None or heatmap_data.empty:
+        print("No sector sentiment data.")
+        return None
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+    sns.heatmap(heatmap_data, annot=True, fmt="d", cmap="coolwarm", linewidths=0.5, linecolor='gray', ax=ax)
+    ax.set_title("Sentiment Distribution per Sector")
+    ax.set_ylabel("Sector")
+    ax.set_xlabel("Sentiment")
+    fig.tight_layout()
+    return fig
+
+# Sector lookups happen here, in the parent, so workers only draw
+def chart_jobs(signals):
+    return [("sector_sentiment_heatmap", plot_sector_heatmap, (build_sector_counts(signals),))]
+
+if __name__ == "__main__":
+    from report_rendering import render_figures
+    render_figures(chart_jobs(load_signal_frame(GPT_FILE, "gpt_signals")))
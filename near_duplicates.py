@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+import run_metrics as metrics
+import record_io
+from record_io import article_id
+
+# SimHash near-duplicate index over cleaned_article_text, persisted across runs.
+# Wire stories syndicated to several feeds collapse into one canonical article with a `sources` list,
+# so only that one copy pays for spaCy, FinBERT and GPT.
+
+INPUT_DIR = "processed_data"
+INDEX_FILE = "data_output/near_duplicate_index.json"
+SHINGLE_SIZE = 3
+MAX_DISTANCE = 3      # max differing bits (of 64) to call two articles duplicates
+BANDS = 4             # 4 x 16-bit bands: any pair within MAX_DISTANCE shares at least one band
+MAX_AGE_DAYS = 30     # forget canonical articles older than this
+
+
+def simhash(text, shingle_size=SHINGLE_SIZE):
+    """64-bit SimHash of word shingles; similar texts differ in few bits."""
+    words = text.split()
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))]
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles))
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(-1, 64)
+    majority = (2 * bits.sum(axis=0, dtype=np.int64) > len(shingles)).astype(np.uint8)
+    return int(np.packbits(majority).view(np.uint64)[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _bands(fingerprint):
+    width = 64 // BANDS
+    mask = (1 << width) - 1
+    return [(i, (fingerprint >> (i * width)) & mask) for i in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    def __init__(self, path=INDEX_FILE, max_distance=MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.entries = {}   # canonical id -> {"simhash", "title", "added", "sources"}
+        self.buckets = {}   # (band, value) -> [canonical id]
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        cutoff = time.time() - MAX_AGE_DAYS * 86400
+        for cid, entry in entries.items():
+            if entry.get("added", 0) >= cutoff:
+                entry["simhash"] = int(entry["simhash"], 16)
+                self._insert(cid, entry)
+
+    def _insert(self, cid, entry):
+        self.entries[cid] = entry
+        for band in _bands(entry["simhash"]):
+            self.buckets.setdefault(band, []).append(cid)
+
+    def find(self, fingerprint):
+        candidates = {cid for band in _bands(fingerprint) for cid in self.buckets.get(band, [])}
+        best = min(candidates, key=lambda cid: hamming(fingerprint, self.entries[cid]["simhash"]), default=None)
+        if best is not None and hamming(fingerprint, self.entries[best]["simhash"]) <= self.max_distance:
+            return best
+        return None
+
+    def check(self, article, source=""):
+        """Returns the canonical id if `article` duplicates a known one (and records the new source), else None.
+        `article` must carry cleaned_article_text (hydrate it first when reading from the text store)."""
+        with metrics.timer("near_duplicate_check"):
+            fingerprint = simhash(article.get("cleaned_article_text", ""))
+        source_ref = {"source": source, "link": article.get("link", ""),
+                      "title": article.get("original_title", ""), "published": article.get("published", "")}
+        with self._lock:
+            canonical = self.find(fingerprint)
+            if canonical is not None and canonical != article_id(article):
+                sources = self.entries[canonical]["sources"]
+                if source_ref["link"] not in {s["link"] for s in sources}:
+                    sources.append(source_ref)
+                return canonical
+            if canonical is None:
+                self._insert(article_id(article), {"simhash": fingerprint, "title": source_ref["title"],
+                                                   "added": time.time(), "sources": [source_ref]})
+            return None
+
+    def sources(self, cid):
+        return list(self.entries.get(cid, {}).get("sources", []))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            out = {cid: {**e, "simhash": f"{e['simhash']:016x}"} for cid, e in self.entries.items()}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(out, f)
+        os.replace(tmp, self.path)
+
+
+def source_name(stem):
+    return stem.replace("processed_", "").replace("_news", "")
+
+
+def collapse_articles(articles_by_file, index, store):
+    """Drops near-duplicates across files; each kept article gets the full list of sources it appeared in."""
+    kept_by_file = {}
+    kept = {}
+    dropped = 0
+    for filename, articles in articles_by_file.items():
+        kept_by_file[filename] = []
+        for article in articles:
+            canonical = index.check(store.hydrate(article), source_name(filename))
+            if canonical is None:
+                kept[article_id(article)] = article
+                kept_by_file[filename].append(article)
+            else:
+                dropped += 1
+                print(f"🔁 Duplicate: {article.get('original_title', '')[:70]} (canonical: {canonical})")
+
+    for cid, article in kept.items():
+        article["sources"] = index.sources(cid)
+    return kept_by_file, dropped
+
+
+def run_dedup(input_dir=INPUT_DIR):
+    index = NearDuplicateIndex()
+    store = record_io.TextStore()
+    articles_by_file = {stem: record_io.read_records(os.path.join(input_dir, stem))
+                        for stem in record_io.list_stems(input_dir)}
+
+    total = sum(len(a) for a in articles_by_file.values())
+    kept_by_file, dropped = collapse_articles(articles_by_file, index, store)
+
+    for stem, articles in kept_by_file.items():
+        record_io.write_records(os.path.join(input_dir, stem), articles)
+    index.save()
+    metrics.increment("near_duplicates_dropped", dropped)
+    print(f"✅ Near-duplicate pass: {total} articles → {total - dropped} kept, {dropped} collapsed")
+
+
+if __name__ == "__main__":
+    run_dedup()
@@ -1,17 +1,12 @@
 import os
 import json
 import re
-import spacy
-from textblob import TextBlob
-from nltk.corpus import stopwords
-import nltk
-
-# Download NLTK data if not already
-nltk.download("stopwords")
-
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
-stop_words = set(stopwords.words("english"))
+from bisect import bisect_right
+from functools import lru_cache
+import run_metrics as metrics
+from resources import load_spacy
+from triplet_engine import triplets_from_doc
+import record_io
 
 # ------------------ Configuration ------------------
 INPUT_DIR = "processed_data"
@@ -19,87 +14,162 @@ OUTPUT_DIR = "enriched_data"
 TICKER_FILE = "sp500_ticker_mapping.json"
 
 # ------------------ Load Ticker Mapping ------------------
-with open(TICKER_FILE, "r", encoding="utf-8") as f:
-    raw_map = json.load(f)
-    ticker_map = {k.lower(): v.upper() for k, v in raw_map.items()}
+@lru_cache(maxsize=None)
+def load_ticker_map(path=TICKER_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        raw_map = json.load(f)
+    return {k.lower(): v.upper() for k, v in raw_map.items()}
+
+# Compiled once: the re module's own cache is far smaller than the alias list
+@lru_cache(maxsize=None)
+def load_ticker_patterns():
+    # Case-insensitive on the original text: lower() can change the length of a string ("İ"), which would shift
+    # the stored offsets against article_text
+    return [(re.compile(rf"\b{re.escape(company)}\b", re.IGNORECASE), ticker)
+            for company, ticker in load_ticker_map().items()]
 
 
 # ------------------ Helper Functions ------------------
 
-def extract_entities(text):
-    doc = nlp(text)
+def entities_from_doc(doc):
     return [{"text": ent.text, "label": ent.label_} for ent in doc.ents]
 
+@metrics.timed("spacy_ner")
+def extract_entities(text):
+    return entities_from_doc(load_spacy()(text))
+
+@metrics.timed("textblob")
 def get_sentiment(text):
+    from textblob import TextBlob
     blob = TextBlob(text)
     return {
         "polarity": round(blob.polarity, 3),
         "subjectivity": round(blob.subjectivity, 3)
     }
 
+# First triplet of the document (triplet_engine finds all of them)
+def triplet_from_doc(doc):
+    triplets = triplets_from_doc(doc)
+    if not triplets:
+        return "", "", "", ""
+    t = triplets[0]
+    return t["subject"], t["verb"], t["object"], t["sentence"]
+
+@metrics.timed("spacy_triplet")
 def extract_triplet(text):
-    doc = nlp(text)
-    for sent in doc.sents:
-        subj = verb = obj = ""
-        for token in sent:
-            if "subj" in token.dep_ and token.head.pos_ == "VERB":
-                subj = token.text
-                verb = token.head.text
-                for child in token.head.children:
-                    if "obj" in child.dep_:
-                        obj = child.text
-                        return subj, verb, obj, sent.text
-    return "", "", "", ""
+    return triplet_from_doc(load_spacy()(text))
 
-def match_tickers(text):
-    text_lower = text.lower()
-    matches = set()
+@metrics.timed("ticker_match")
+def match_ticker_spans(text):
+    """{ticker: [(start, end), ...]} character spans of every alias match in `text`."""
+    spans = {}
 
-    for company, ticker in ticker_map.items():
-        if re.search(rf"\b{re.escape(company)}\b", text_lower):
-            matches.add(ticker)
+    for pattern, ticker in load_ticker_patterns():
+        for m in pattern.finditer(text):
+            spans.setdefault(ticker, []).append((m.start(), m.end()))
 
-    return list(matches)
+    return spans
 
-# ------------------ File Processor ------------------
+def match_tickers(text):
+    return list(match_ticker_spans(text))
+
+# ------------------ Ticker Mentions ------------------
+# Stored with each enriched article as
+#   sentence_spans:  [[start, end], ...]                  character offsets of each sentence in article_text
+#   ticker_mentions: {ticker: [[sentence, start, end], ...]}
+
+def sentence_bounds(doc):
+    return [[sent.start_char, sent.end_char] for sent in doc.sents]
+
+def ticker_mentions(spans, bounds):
+    starts = [start for start, _ in bounds]
+    mentions = {}
+    for ticker, ticker_spans in spans.items():
+        mentions[ticker] = [[max(bisect_right(starts, start) - 1, 0), start, end]
+                            for start, end in sorted(set(ticker_spans))]
+    return mentions
+
+def ticker_sentences(article, ticker, max_chars=512):
+    """Text of the sentences that mention `ticker`, up to `max_chars`.
+    Falls back to the start of the article for records enriched before mentions were stored."""
+    text = article.get("article_text", "") or article.get("cleaned_article_text", "")
+    mentions = (article.get("ticker_mentions") or {}).get(ticker)
+    bounds = article.get("sentence_spans") or []
+    if not mentions or not bounds or not article.get("article_text"):
+        return text[:max_chars]
+
+    out = []
+    length = 0
+    for sent in sorted({m[0] for m in mentions}):
+        start, end = bounds[sent]
+        sentence = text[start:end].strip()
+        if out and length + len(sentence) + 1 > max_chars:
+            break
+        out.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(out)[:max_chars]
+
+def triplet_sentence(article, triplet):
+    """Sentence a stored triplet was extracted from (article hydrated from the text store)."""
+    bounds = article.get("sentence_spans") or []
+    index = triplet.get("sentence_index")
+    if index is None or index >= len(bounds):
+        return triplet.get("sentence", "")
+    start, end = bounds[index]
+    return article.get("article_text", "")[start:end].strip()
+
+# ------------------ Article Enrichment ------------------
+
+def enrich_article(article):
+    text = article.get("article_text", "")
+    sentiment = get_sentiment(text)
+    # One spaCy parse serves both NER and the triplet
+    with metrics.timer("spacy"):
+        doc = load_spacy()(text)
+    entities = entities_from_doc(doc)
+    spans = match_ticker_spans(text)
+    bounds = sentence_bounds(doc)
+    with metrics.timer("spacy_triplets"):
+        triplets = triplets_from_doc(doc)
+    first = triplets[0] if triplets else {}
 
-def process_file(filename):
-    with open(os.path.join(INPUT_DIR, filename), "r", encoding="utf-8") as f:
-        articles = json.load(f)
+    return {
+        **article,
+        "sentiment": sentiment,
+        "entities": entities,
+        "tickers": list(spans),
+        "sentence_spans": bounds,
+        "ticker_mentions": ticker_mentions(spans, bounds),
+        "subject": first.get("subject", ""),
+        "verb": first.get("verb", ""),
+        "object": first.get("object", ""),
+        "sentence": first.get("sentence", ""),
+        # The sentence text is not repeated per triplet: sentence_index points into sentence_spans
+        "triplets": [{k: v for k, v in t.items() if k != "sentence"} for t in triplets]
+    }
 
+# ------------------ File Processor ------------------
+
+def process_file(stem, store=None):
+    store = store or record_io.TextStore()
     enriched = []
-    for article in articles:
-        text = article.get("article_text", "")
-        sentiment = get_sentiment(text)
-        entities = extract_entities(text)
-        tickers = match_tickers(text)
-        subj, verb, obj, snt = extract_triplet(text)
-
-        enriched.append({
-            **article,
-            "sentiment": sentiment,
-            "entities": entities,
-            "tickers": tickers,
-            "subject": subj,
-            "verb": verb,
-            "object": obj,
-            "sentence": snt
-        })
-
-    out_path = os.path.join(OUTPUT_DIR, f"enriched_{filename}")
+    for article in record_io.iter_records(os.path.join(INPUT_DIR, stem)):
+        # Texts are read from the store and not copied into the enriched records
+        enriched.append(store.put(enrich_article(store.hydrate(article))))
+    store.flush()
+
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(enriched, f, indent=2)
+    record_io.write_records(os.path.join(OUTPUT_DIR, f"enriched_{stem}"), enriched)
 
-    print(f"✅ NLP enriched: {filename}")
+    print(f"✅ NLP enriched: {stem}")
 
 # ------------------ Main ------------------
 
 def run_nlp():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    for file in os.listdir(INPUT_DIR):
-        if file.endswith(".json"):
-            process_file(file)
+    store = record_io.TextStore()
+    for stem in record_io.list_stems(INPUT_DIR):
+        process_file(stem, store)
 
 if __name__ == "__main__":
     run_nlp()
@@ -0,0 +1,178 @@
+import os
+import json
+import argparse
+import numpy as np
+
+# Consolidated daily price store for all tickers.
+# Bars live in two NumPy files sorted by key (ticker index << 32 | day): keys.npy and values.npy (one column per
+# field). They are opened memory-mapped, so a ticker/date slice is two binary searches and a view, with no need
+# to open hundreds of small files. New bars are buffered and merged in one pass on save; a bar for an existing
+# (ticker, day) replaces the stored one.
+
+STORE_DIR = "data_output/prices"
+FIELDS = ["open", "high", "low", "close", "volume", "dividends", "splits"]
+# yfinance history() column per field
+HISTORY_COLUMNS = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume",
+                   "Dividends": "dividends", "Stock Splits": "splits"}
+
+
+def to_days(dates):
+    """Day numbers (days since 1970-01-01) for dates, timestamps or a DatetimeIndex; local exchange date is kept."""
+    import pandas as pd
+    index = pd.DatetimeIndex(dates)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def _day(value):
+    return None if value is None else int(to_days([value])[0])
+
+
+class PriceStore:
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+        self.tickers = []
+        self.ticker_index = {}
+        self.info = {}                                   # ticker -> name, sector, price, previousClose
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.values = np.zeros((0, len(FIELDS)))
+        self._pending = []                               # (keys, values) not yet merged
+        self._load()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        if not os.path.exists(self._path("tickers.json")):
+            return
+        with open(self._path("tickers.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.tickers = meta["tickers"]
+        self.info = meta.get("info", {})
+        self.ticker_index = {t: i for i, t in enumerate(self.tickers)}
+        self.keys = self._open("keys.npy")
+        self.values = self._open("values.npy")
+
+    def _open(self, name):
+        try:
+            return np.load(self._path(name), mmap_mode="r")
+        except ValueError:  # an empty array cannot be memory-mapped
+            return np.load(self._path(name))
+
+    def _ticker(self, ticker):
+        idx = self.ticker_index.get(ticker)
+        if idx is None:
+            idx = self.ticker_index[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        return idx
+
+    # ------------------ Writes ------------------
+
+    def upsert(self, ticker, history, info=None):
+        """Buffers daily bars for one ticker (a yfinance history() frame, or any frame with FIELDS columns)."""
+        if info:
+            self.info[ticker] = info
+        if history is None or len(history) == 0:
+            return 0
+        frame = history.rename(columns=HISTORY_COLUMNS)
+        values = np.column_stack([frame[f].to_numpy(dtype=float) if f in frame else np.zeros(len(frame))
+                                  for f in FIELDS])
+        keys = (np.int64(self._ticker(ticker)) << 32) | to_days(frame.index)
+        self._pending.append((keys, values))
+        return len(keys)
+
+    def save(self):
+        """Merges buffered bars into the store and writes it; later bars win for the same ticker and day.
+        The arrays are only rewritten when there are new bars: until then self.keys/values are memory-mapped views
+        of keys.npy/values.npy, which cannot be replaced while mapped on Windows."""
+        write_arrays = bool(self._pending) or not os.path.exists(self._path("keys.npy"))
+        if self._pending:
+            keys = np.concatenate([np.asarray(self.keys)] + [k for k, _ in self._pending])
+            values = np.vstack([np.asarray(self.values)] + [v for _, v in self._pending])
+            # Stable sort keeps arrival order within a key, so the last occurrence is the newest bar
+            order = np.argsort(keys, kind="stable")
+            keys, values = keys[order], values[order]
+            last = np.r_[keys[1:] != keys[:-1], True]
+            self.keys, self.values = keys[last], values[last]
+            self._pending = []
+
+        os.makedirs(self.directory, exist_ok=True)
+        for name, array in (("keys", self.keys), ("values", self.values)) if write_arrays else ():
+            tmp = self._path(f"{name}.tmp.npy")
+            np.save(tmp, array)
+            os.replace(tmp, self._path(f"{name}.npy"))
+        tmp = self._path("tickers.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fields": FIELDS, "tickers": self.tickers, "info": self.info}, f, indent=2)
+        os.replace(tmp, self._path("tickers.json"))
+        self._load()
+
+    # ------------------ Queries ------------------
+
+    def _slice(self, ticker, start=None, end=None):
+        idx = self.ticker_index.get(ticker)
+        if idx is None:
+            return 0, 0
+        start, end = _day(start), _day(end)
+        lo = np.int64(idx) << 32 | (0 if start is None else start)
+        hi = np.int64(idx) << 32 | (0xFFFFFFFF if end is None else end)
+        return int(np.searchsorted(self.keys, lo, "left")), int(np.searchsorted(self.keys, hi, "right"))
+
+    def last_date(self, ticker):
+        lo, hi = self._slice(ticker)
+        return np.datetime64(int(self.keys[hi - 1]) & 0xFFFFFFFF, "D") if hi > lo else None
+
+    def get(self, ticker, start=None, end=None, fields=None):
+        """Daily bars for one ticker between two dates (inclusive), as a DataFrame indexed by date."""
+        import pandas as pd
+        lo, hi = self._slice(ticker, start, end)
+        fields = fields or FIELDS
+        columns = [FIELDS.index(f) for f in fields]
+        dates = (np.asarray(self.keys[lo:hi]) & 0xFFFFFFFF).astype("datetime64[D]")
+        return pd.DataFrame(np.asarray(self.values[lo:hi])[:, columns], columns=fields,
+                            index=pd.DatetimeIndex(dates, name="date"))
+
+    def frame(self, tickers=None, start=None, end=None, field="close"):
+        """Wide (date x ticker) frame of one field, e.g. closes for joining signals to prices."""
+        import pandas as pd
+        tickers = self.tickers if tickers is None else [t for t in tickers if t in self.ticker_index]
+        columns = {t: self.get(t, start, end, [field])[field] for t in tickers}
+        return pd.DataFrame(columns).sort_index() if columns else pd.DataFrame()
+
+
+# ------------------ Legacy files ------------------
+
+def import_legacy(directory="data_output", store=None):
+    """Loads old per-ticker {TICKER}_finance.json files into the store."""
+    import pandas as pd
+    store = store or PriceStore()
+    imported = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith("_finance.json"):
+            continue
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        history = pd.DataFrame.from_dict(data.get("history", {}), orient="index")
+        history.index = pd.to_datetime(history.index, utc=True)
+        info = {k: data.get(k, "") for k in ("name", "price", "previousClose", "sector")}
+        store.upsert(data.get("ticker") or name[:-len("_finance.json")], history, info)
+        imported += 1
+    store.save()
+    print(f"✅ Imported {imported} legacy finance files → {store.directory}")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consolidated daily price store")
+    parser.add_argument("--import-legacy", action="store_true", help="load data_output/*_finance.json files")
+    parser.add_argument("--ticker", default=None, help="print the stored bars for a ticker")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    args = parser.parse_args()
+
+    store = import_legacy() if args.import_legacy else PriceStore()
+    if args.ticker:
+        print(store.get(args.ticker, args.start, args.end).to_string())
+    else:
+        print(f"📈 {len(store.tickers)} tickers, {len(store.keys):,} daily bars in {store.directory}")
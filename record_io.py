@@ -0,0 +1,370 @@
+import io
+import os
+import json
+import gzip
+import hashlib
+import importlib.util
+from collections import OrderedDict
+
+# Pluggable record I/O for intermediate data.
+# Records are written as compressed JSON lines (zstd, gzip fallback) or Parquet and read back as a stream.
+# Article texts live once in a TextStore keyed by article_id instead of being copied into every stage's output.
+
+ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Read preference when several formats of the same stem exist; legacy pretty-printed .json last
+EXTENSIONS = [".jsonl.zst", ".jsonl.gz", ".parquet", ".jsonl", ".json"]
+# Parquet only when asked for (RECORD_FORMAT=parquet): append-only files (text store, logs) need JSON lines anyway
+DEFAULT_FORMAT = os.getenv("RECORD_FORMAT") or ("jsonl.zst" if ZSTD_AVAILABLE else "jsonl.gz")
+if DEFAULT_FORMAT == "parquet" and not PARQUET_AVAILABLE:
+    print("⚠️ RECORD_FORMAT=parquet needs pyarrow; writing compressed JSON lines instead")
+    DEFAULT_FORMAT = "jsonl.zst" if ZSTD_AVAILABLE else "jsonl.gz"
+
+TEXT_STORE_DIR = "text_store"
+ARTICLE_TABLE_SUFFIX = ".articles"  # per-article fields factored out of row-per-triplet files
+TEXT_FIELDS = ("article_text", "cleaned_article_text")
+TEXT_BLOCK_ROWS = 64      # texts per compressed block; a lookup decodes one block
+TEXT_BLOCK_CACHE = 16     # decoded blocks kept in memory per store
+OFFSETS_SUFFIX = ".offsets"
+
+
+# ------------------ Paths ------------------
+
+def split_ext(path):
+    for ext in EXTENSIONS:
+        if path.endswith(ext):
+            return path[:-len(ext)], ext
+    return path, ""
+
+
+def resolve(path):
+    """Existing file for a stem (or full path); None if nothing is there."""
+    stem, ext = split_ext(path)
+    if ext and os.path.exists(path):
+        return path
+    for ext in EXTENSIONS:
+        if os.path.exists(stem + ext):
+            return stem + ext
+    return None
+
+
+def exists(path):
+    return resolve(path) is not None
+
+
+def list_stems(directory, prefix=""):
+    """Record stems in `directory` (any supported format), sorted; article side tables are not listed."""
+    if not os.path.isdir(directory):
+        return []
+    stems = set()
+    for name in os.listdir(directory):
+        stem, ext = split_ext(name)
+        if ext and stem.startswith(prefix) and not stem.endswith(ARTICLE_TABLE_SUFFIX):
+            stems.add(stem)
+    return sorted(stems)
+
+
+# ------------------ Reading ------------------
+
+def _open_text(path, mode, codec_path=None):
+    """Text stream over `path`, compressed according to the extension of `codec_path` (default: path)."""
+    codec_path = codec_path or path
+    if codec_path.endswith(".zst"):
+        import zstandard
+        raw = open(path, mode + "b")
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    if codec_path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+def iter_records(path):
+    """Yield records one at a time from a stem or file path; empty if it does not exist."""
+    path = resolve(path)
+    if path is None:
+        return
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    elif path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+    else:
+        with _open_text(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_records(path):
+    return list(iter_records(path))
+
+
+def iter_joined(stem, key="article_id"):
+    """Rows of a normalised file with their article fields joined back in (plain files pass through)."""
+    stem, _ = split_ext(stem)
+    table = {r[key]: r for r in iter_records(stem + ARTICLE_TABLE_SUFFIX)}
+    for row in iter_records(stem):
+        meta = table.get(row.get(key))
+        yield {**meta, **row} if meta else row
+
+
+# ------------------ Writing ------------------
+
+def write_records(stem, records, fmt=None):
+    """Write records to `stem.<fmt>` atomically and remove copies of the stem in other formats."""
+    stem, _ = split_ext(stem)
+    fmt = fmt or DEFAULT_FORMAT
+    path = f"{stem}.{fmt}"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.Table.from_pylist(list(records)), tmp, compression="zstd")
+    elif fmt == "json":
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(records), f, indent=2)
+    else:
+        with _open_text(tmp, "w", codec_path=path) as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+    os.replace(tmp, path)
+
+    for ext in EXTENSIONS:
+        other = stem + ext
+        if other != path and os.path.exists(other):
+            os.remove(other)
+    return path
+
+
+def write_normalized(stem, rows, fields, key="article_id", fmt=None):
+    """Write row-per-item data with `fields` stored once per article in a side table instead of on every row."""
+    stem, _ = split_ext(stem)
+    articles = {}
+    slim = []
+    for row in rows:
+        aid = row[key]
+        if aid not in articles:
+            articles[aid] = {key: aid, **{f: row.get(f) for f in fields}}
+        slim.append({k: v for k, v in row.items() if k not in fields})
+    write_records(stem + ARTICLE_TABLE_SUFFIX, articles.values(), fmt)
+    return write_records(stem, slim, fmt)
+
+
+def append_records(stem, records, fmt=None):
+    """Append to a JSON-lines stem (a new zstd frame / gzip member per call)."""
+    stem, _ = split_ext(stem)
+    existing = resolve(stem)
+    path = existing or f"{stem}.{fmt or DEFAULT_FORMAT}"
+    if path.endswith((".parquet", ".json")):
+        raise ValueError(f"cannot append to {path}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _open_text(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+    return path
+
+
+# ------------------ Article texts ------------------
+
+def article_id(record):
+    """Stable id from the article link (title|published when there is no link)."""
+    if record.get("article_id"):
+        return record["article_id"]
+    key = record.get("link") or f"{record.get('original_title', record.get('title', ''))}|{record.get('published', '')}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class TextStore:
+    """Article texts stored once, keyed by article_id, shared by every stage.
+    New texts are appended to `write_dir/name` (default: the store directory itself) in blocks of TEXT_BLOCK_ROWS,
+    with each text's (offset, length) block recorded in a `.offsets` file next to it. Only that id index is held in
+    memory; a lookup decodes the one block holding the text, and the last few blocks are cached."""
+
+    def __init__(self, directory=TEXT_STORE_DIR, name="texts", write_dir=None):
+        self.directory = directory
+        self.stem = os.path.join(write_dir or directory, name)
+        self._index = None            # id -> (path, offset, length)
+        self._blocks = OrderedDict()  # (path, offset) -> {id: row}
+        self._pending = {}
+
+    def _stems(self):
+        stems = [os.path.join(self.directory, stem) for stem in list_stems(self.directory, "texts")]
+        if self.stem not in stems and exists(self.stem):
+            stems.append(self.stem)
+        return stems
+
+    def _load(self):
+        if self._index is None:
+            self._index = {}
+            for stem in self._stems():
+                self._index.update(_index_text_file(stem))
+        return self._index
+
+    def _block(self, path, offset, length):
+        key = (path, offset)
+        block = self._blocks.get(key)
+        if block is None:
+            block = {row["id"]: row for row in _read_range(path, offset, length)}
+            self._blocks[key] = block
+            if len(self._blocks) > TEXT_BLOCK_CACHE:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(key)
+        return block
+
+    def put(self, record):
+        """Move the text fields of `record` into the store; returns the record with an article_id instead."""
+        aid = article_id(record)
+        texts = {k: record[k] for k in TEXT_FIELDS if k in record}
+        if texts:
+            stored = self.get(aid)
+            if any(stored.get(k) != v for k, v in texts.items()):
+                self._pending[aid] = {"id": aid, **texts}
+        slim = {k: v for k, v in record.items() if k not in TEXT_FIELDS}
+        slim["article_id"] = aid
+        return slim
+
+    def get(self, aid):
+        if aid in self._pending:
+            return self._pending[aid]
+        location = self._load().get(aid)
+        return self._block(*location).get(aid, {}) if location else {}
+
+    def hydrate(self, record):
+        """Record with its texts filled in (legacy records that still carry text are returned as-is)."""
+        if all(k in record for k in TEXT_FIELDS):
+            return record
+        row = self.get(article_id(record))
+        return {**record, **{k: row.get(k, "") for k in TEXT_FIELDS if k not in record}}
+
+    def merge(self, stem):
+        """Fold another texts file (a shard's) into this store."""
+        for row in iter_records(stem):
+            self._pending[row["id"]] = row
+            if len(self._pending) >= TEXT_BLOCK_ROWS * TEXT_BLOCK_CACHE:
+                self.flush()
+        self.flush()
+
+    def flush(self):
+        rows = list(self._pending.values())
+        for start in range(0, len(rows), TEXT_BLOCK_ROWS):
+            location = _append_text_block(self.stem, rows[start:start + TEXT_BLOCK_ROWS])
+            if self._index is not None:
+                self._index.update((row["id"], location) for row in rows[start:start + TEXT_BLOCK_ROWS])
+        self._pending = {}
+
+    def compact(self):
+        """Rewrite the store directory as one texts file with only the latest text of each id."""
+        self.flush()
+        old = [os.path.join(self.directory, stem) for stem in list_stems(self.directory, "texts")]
+        index = {}
+        for stem in old:
+            index.update(_index_text_file(stem))
+        blocks = {}
+        for aid, location in index.items():
+            blocks.setdefault(location, []).append(aid)
+
+        tmp = os.path.join(self.directory, "compacting")
+        _remove_text_file(tmp)
+        batch = []
+        for location, ids in sorted(blocks.items()):
+            block = {row["id"]: row for row in _read_range(*location)}
+            batch.extend(block[aid] for aid in ids)
+            while len(batch) >= TEXT_BLOCK_ROWS:
+                _append_text_block(tmp, batch[:TEXT_BLOCK_ROWS])
+                batch = batch[TEXT_BLOCK_ROWS:]
+        if batch:
+            _append_text_block(tmp, batch)
+
+        for stem in old:
+            _remove_text_file(stem)
+        written = resolve(tmp)
+        if written:
+            target = os.path.join(self.directory, "texts")
+            os.replace(written, target + split_ext(written)[1])
+            os.replace(tmp + OFFSETS_SUFFIX, target + OFFSETS_SUFFIX)
+        self._index = None
+        self._blocks.clear()
+        return len(index)
+
+
+def _read_range(path, offset, length):
+    """Rows of one block (or of a whole unindexed file) of a JSON-lines texts file."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    if path.endswith(".zst"):
+        import zstandard
+        data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True).read()
+    elif path.endswith(".gz"):
+        data = gzip.decompress(data)
+    return [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+
+
+def _index_text_file(stem):
+    """{id: (path, offset, length)} for one texts file from its offsets file. Ranges with no recorded block (rows
+    appended before offsets were kept) are indexed as one block each; compact() splits them up."""
+    path = resolve(stem)
+    if path is None:
+        return {}
+    size = os.path.getsize(path)
+    entries = []  # (offset, id, location), applied in file order so later texts win
+    if os.path.exists(stem + OFFSETS_SUFFIX):
+        with open(stem + OFFSETS_SUFFIX, "r", encoding="utf-8") as f:
+            for line in f:
+                aid, offset, length = line.rstrip("\n").split("\t")
+                offset, length = int(offset), int(length)
+                if offset + length <= size:
+                    entries.append((offset, aid, (path, offset, length)))
+
+    covered = sorted({(loc[1], loc[1] + loc[2]) for _, _, loc in entries})
+    gaps, pos = [], 0
+    for start, end in covered + [(size, size)]:
+        if start > pos:
+            gaps.append((pos, start - pos))
+        pos = max(pos, end)
+    for offset, length in gaps:
+        entries.extend((offset, row["id"], (path, offset, length)) for row in _read_range(path, offset, length))
+
+    entries.sort(key=lambda e: e[0])
+    return {aid: location for _, aid, location in entries}
+
+
+def _append_text_block(stem, rows):
+    """Appends rows as one compressed block and records its offsets; returns (path, offset, length)."""
+    existing = resolve(stem)
+    if existing is None and os.path.exists(stem + OFFSETS_SUFFIX):
+        os.remove(stem + OFFSETS_SUFFIX)  # left over from a removed texts file
+    offset = os.path.getsize(existing) if existing else 0
+    path = append_records(stem, rows)
+    length = os.path.getsize(path) - offset
+    with open(stem + OFFSETS_SUFFIX, "a", encoding="utf-8") as f:
+        f.writelines(f"{row['id']}\t{offset}\t{length}\n" for row in rows)
+    return path, offset, length
+
+
+def _remove_text_file(stem):
+    for path in [stem + ext for ext in EXTENSIONS] + [stem + OFFSETS_SUFFIX]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Record store maintenance")
+    parser.add_argument("--compact-texts", action="store_true", help="rewrite text_store/ with one text per article")
+    args = parser.parse_args()
+    if args.compact_texts:
+        count = TextStore().compact()
+        print(f"✅ Text store compacted: {count} texts → {TEXT_STORE_DIR}")
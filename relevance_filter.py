@@ -0,0 +1,210 @@
+import os
+import re
+import argparse
+from functools import lru_cache
+from itertools import islice
+import numpy as np
+
+import run_metrics as metrics
+import record_io
+from nlp_processing import load_ticker_map
+
+# Relevance prefilter between preprocessing and the heavy stages (spaCy, triplets, FinBERT, GPT).
+# 1. Alias hit: an article whose text names no S&P 500 company never gets a ticker, so it can never get a signal.
+#    Aliases are looked up as word n-grams, which finds every match the regex matcher in nlp_processing finds.
+# 2. Linear classifier on hashed word 1-2 grams, trained on past runs (did the article end up with a signal?).
+#    Articles scoring below DROP_BELOW are dropped, or only flagged with their score when RELEVANCE_MODE=flag.
+# Every rejected article is logged with the reason.
+
+INPUT_DIR = "processed_data"
+MODEL_FILE = "data_output/relevance_model.npz"
+REJECTS_FILE = "data_output/relevance_rejects"   # record_io stem, one row per rejected article
+REJECTS_MAX = int(os.getenv("RELEVANCE_REJECTS_MAX", "50000"))  # newest rejects kept when the log is rotated
+MODE = os.getenv("RELEVANCE_MODE", "drop")       # drop | flag
+DROP_BELOW = float(os.getenv("RELEVANCE_DROP_BELOW", "0.2"))
+N_FEATURES = 2 ** 18
+NGRAM_RANGE = (1, 2)
+TEXT_CHARS = 2000  # title + article opening is enough to judge relevance
+SIGNAL_SENTIMENTS = {"positive", "negative"}
+EXPLORE_PERCENT = int(os.getenv("RELEVANCE_EXPLORE_PERCENT", "5"))  # classifier rejects kept anyway, to keep labels coming
+
+
+# ------------------ Alias hits ------------------
+
+@lru_cache(maxsize=None)
+def alias_index():
+    """({alias words: ticker}, longest alias in words)."""
+    aliases = {" ".join(alias.split()): ticker for alias, ticker in load_ticker_map().items() if alias.split()}
+    return aliases, max((len(a.split()) for a in aliases), default=1)
+
+
+def alias_hits(text):
+    """Tickers whose company alias appears in `text`."""
+    aliases, longest = alias_index()
+    words = re.findall(r"\w+", text.lower())
+    hits = set()
+    for n in range(1, longest + 1):
+        for i in range(len(words) - n + 1):
+            ticker = aliases.get(" ".join(words[i:i + n]))
+            if ticker:
+                hits.add(ticker)
+    return hits
+
+
+# ------------------ Classifier ------------------
+
+def article_text(article):
+    title = article.get("original_title") or article.get("title") or ""
+    return f"{title}\n{(article.get('cleaned_article_text') or article.get('article_text') or '')[:TEXT_CHARS]}"
+
+
+@lru_cache(maxsize=None)
+def vectorizer():
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=N_FEATURES, ngram_range=NGRAM_RANGE, alternate_sign=False, norm="l2")
+
+
+@lru_cache(maxsize=None)
+def load_model(path=MODEL_FILE):
+    """(weights, bias), or None before the first training run."""
+    if not os.path.exists(path):
+        return None
+    data = np.load(path)
+    return data["coef"], float(data["intercept"])
+
+
+def relevance_scores(texts, model):
+    coef, intercept = model
+    logits = vectorizer().transform(texts) @ coef + intercept
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+def signalled_titles():
+    """Titles that received an actionable signal: a non-neutral GPT signal, or a non-neutral FinBERT signal confident
+    enough that the cascade would not escalate it. FinBERT labels every article with tickers, so "any signal" says
+    nothing about relevance."""
+    from signal_frames import GPT_FILE, FINBERT_FILE, load_signal_frame
+    from cascade_signals import load_threshold
+    gpt = load_signal_frame(GPT_FILE, "gpt_signals", "gpt")
+    finbert = load_signal_frame(FINBERT_FILE, "finbert_signals", "finbert")
+    actionable = [
+        gpt[(gpt["ticker"] != "") & gpt["sentiment"].isin(SIGNAL_SENTIMENTS)],
+        finbert[(finbert["ticker"] != "") & finbert["sentiment"].isin(SIGNAL_SENTIMENTS)
+                & (finbert["confidence"] >= load_threshold())],
+    ]
+    return {title for df in actionable for title in df["title"].str.strip()}
+
+
+def training_examples(enriched_dir="enriched_data", rejects_file=REJECTS_FILE):
+    """(texts, labels) over the population before filtering: label 1 when the article received an actionable signal.
+    Articles without a company alias are negatives. Classifier rejects are left out (their outcome was never
+    observed); the exploration sample kept below the threshold labels that region instead."""
+    signalled = signalled_titles()
+    store = record_io.TextStore()
+    # One example per article_id, so re-delivered articles do not count twice
+    examples = {}
+    for stem in record_io.list_stems(enriched_dir):
+        for article in record_io.iter_records(os.path.join(enriched_dir, stem)):
+            article = store.hydrate(article)
+            examples[record_io.article_id(article)] = (article_text(article),
+                                                       int((article.get("original_title") or "").strip() in signalled))
+    for reject in record_io.iter_records(rejects_file):
+        if reject.get("reason") == "no_alias" and reject.get("text"):
+            examples.setdefault(reject["article_id"], (reject["text"], 0))
+    texts = [text for text, _ in examples.values()]
+    return texts, np.array([label for _, label in examples.values()], dtype=np.int64)
+
+
+def log_rejects(rejects, path=REJECTS_FILE, max_rows=REJECTS_MAX):
+    """Appends rejects not logged before (by article_id); past `max_rows` the log is rewritten with the newest."""
+    logged = [r["article_id"] for r in record_io.iter_records(path)]
+    known = set(logged)
+    new = [r for r in rejects if r["article_id"] not in known]
+    if new:
+        record_io.append_records(path, new)
+    excess = len(logged) + len(new) - max_rows
+    if excess > 0:
+        # Streams the old file into a temporary one, same format, so the log can keep being appended to
+        fmt = record_io.split_ext(record_io.resolve(path))[1].lstrip(".")
+        record_io.write_records(path, islice(record_io.iter_records(path), excess, None), fmt=fmt)
+    return new
+
+
+def train(path=MODEL_FILE):
+    from sklearn.linear_model import SGDClassifier
+    texts, labels = training_examples()
+    if len(set(labels.tolist())) < 2:
+        print("⚠️ Need both articles with and without actionable signals to train the relevance model.")
+        return None
+    clf = SGDClassifier(loss="log_loss", alpha=1e-5, class_weight="balanced", max_iter=20, random_state=42)
+    with metrics.timer("relevance_train", items=len(texts)):
+        clf.fit(vectorizer().transform(texts), labels)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, coef=clf.coef_[0].astype(np.float32), intercept=clf.intercept_[0])
+    load_model.cache_clear()
+    print(f"✅ Relevance model trained on {len(texts)} articles ({int(labels.sum())} with actionable signals) → {path}")
+    return clf
+
+
+# ------------------ Filter ------------------
+
+def explore(article):
+    """Stable pseudo-random EXPLORE_PERCENT of articles, passed through whatever their score."""
+    return int(record_io.article_id(article)[:8], 16) % 100 < EXPLORE_PERCENT
+
+
+def filter_articles(articles, stem, store, model):
+    """(kept articles, rejects) for one processed file."""
+    hydrated = [store.hydrate(a) for a in articles]
+    texts = [article_text(a) for a in hydrated]
+    # Same text nlp_processing takes tickers from
+    hits = [alias_hits(a.get("article_text", "")) for a in hydrated]
+    scores = relevance_scores(texts, model) if model is not None and texts else [None] * len(texts)
+
+    kept, rejects = [], []
+    for article, text, tickers, score in zip(articles, texts, hits, scores):
+        reason = None
+        if not tickers:
+            reason = "no_alias"
+        elif score is not None and score < DROP_BELOW and not explore(article):
+            reason = "classifier"
+        if score is not None:
+            article["relevance"] = round(float(score), 4)
+        if reason and (reason == "no_alias" or MODE == "drop"):
+            rejects.append({"article_id": record_io.article_id(article), "title": article.get("original_title", ""),
+                            "link": article.get("link", ""), "file": stem, "reason": reason,
+                            "score": article.get("relevance"), "text": text})
+        else:
+            kept.append(article)
+    return kept, rejects
+
+
+def run_relevance_filter(input_dir=INPUT_DIR):
+    store = record_io.TextStore()
+    model = load_model()
+    if model is None:
+        print("ℹ️ No relevance model yet (python relevance_filter.py --train); filtering on alias hits only")
+
+    total = dropped = 0
+    with metrics.timer("relevance_filter"):
+        for stem in record_io.list_stems(input_dir):
+            articles = record_io.read_records(os.path.join(input_dir, stem))
+            kept, rejects = filter_articles(articles, stem, store, model)
+            record_io.write_records(os.path.join(input_dir, stem), kept)
+            if rejects:
+                for r in log_rejects(rejects):
+                    print(f"🚫 {r['reason']}: {r['title'][:70]}")
+            total += len(articles)
+            dropped += len(rejects)
+    metrics.increment("relevance_rejected", dropped)
+    print(f"✅ Relevance filter: {total} articles → {total - dropped} kept, {dropped} rejected (log: {REJECTS_FILE})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drop articles that cannot produce company-specific signals")
+    parser.add_argument("--train", action="store_true", help="train the classifier on the last run's articles and signals")
+    args = parser.parse_args()
+    if args.train:
+        train()
+    else:
+        run_relevance_filter()
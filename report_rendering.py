@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+matplotlib.use("Agg")  # headless: never wait for a window
+import matplotlib.pyplot as plt
+
+import run_metrics as metrics
+from signal_frames import GPT_FILE, load_signal_frame
+
+# Config
+REPORT_DIR = "reports"
+FORMATS = tuple(f.strip() for f in os.getenv("REPORT_FORMATS", "png,svg").split(",") if f.strip())
+MAX_WORKERS = int(os.getenv("REPORT_WORKERS", "0")) or None  # None = one per core
+
+
+def save_figure(fig, name, output_dir=REPORT_DIR, formats=FORMATS):
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f"{name}.{fmt}")
+        fig.savefig(path, format=fmt, bbox_inches="tight")
+        paths.append(path)
+    plt.close(fig)
+    return paths
+
+
+# Runs in a worker process: build one figure and write it in every format
+def _render_job(name, plot_fn, args, output_dir, formats):
+    fig = plot_fn(*args)
+    if fig is None:
+        return name, []
+    return name, save_figure(fig, name, output_dir, formats)
+
+
+# jobs: list of (name, plot_fn, args); plot_fn returns a Figure or None when there is no data
+def render_figures(jobs, output_dir=REPORT_DIR, formats=FORMATS, max_workers=MAX_WORKERS):
+    written = {}
+    if not jobs:
+        return written
+
+    # A failing chart is reported and skipped either way; the rest of the report is still written
+    if max_workers == 1 or len(jobs) == 1:
+        for name, plot_fn, args in jobs:
+            try:
+                _, paths = _render_job(name, plot_fn, args, output_dir, formats)
+                written[name] = paths
+            except Exception as e:
+                print(f"❌ Chart failed: {name}: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_render_job, name, plot_fn, args, output_dir, formats): name
+                       for name, plot_fn, args in jobs}
+            for future in as_completed(futures):
+                try:
+                    name, paths = future.result()
+                    written[name] = paths
+                except Exception as e:
+                    print(f"❌ Chart failed: {futures[future]}: {e}")
+
+    for name in sorted(written):
+        if written[name]:
+            print(f"🖼️  {name} → {', '.join(written[name])}")
+        else:
+            print(f"ℹ️ {name}: no data, skipped")
+    return written
+
+
+# Every report figure, with the GPT signal file loaded and its dates parsed once
+def collect_report_jobs():
+    import gpt_sentiment_charts
+    import heatmap
+    import visualise_embeddings
+
+    signals = load_signal_frame(GPT_FILE, "gpt_signals")
+    jobs = []
+    jobs += gpt_sentiment_charts.chart_jobs(signals)
+    jobs += heatmap.chart_jobs(signals)
+    jobs += visualise_embeddings.chart_jobs()
+    return jobs
+
+
+def run_report_rendering(output_dir=REPORT_DIR):
+    with metrics.timer("report_prepare"):
+        jobs = collect_report_jobs()
+    print(f"🎨 Rendering {len(jobs)} charts → {output_dir}")
+    with metrics.timer("report_render", items=len(jobs)):
+        written = render_figures(jobs, output_dir)
+    print(f"✅ Report rendering done: {sum(1 for p in written.values() if p)} figures")
+    return written
+
+
+if __name__ == "__main__":
+    run_report_rendering()
@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import importlib.util
+from functools import lru_cache
+
+import run_metrics as metrics
+
+# Startup layer: resources are resolved once into a local cache, verified offline,
+# and heavy libraries/models are only imported when a stage first asks for them.
+
+CACHE_DIR = os.path.abspath(os.getenv("PIPELINE_CACHE_DIR", ".cache"))
+MANIFEST_FILE = os.path.join(CACHE_DIR, "resources.json")
+NLTK_DIR = os.path.join(CACHE_DIR, "nltk_data")
+STOPWORDS_FILE = os.path.join(CACHE_DIR, "stopwords_english.txt")
+OFFLINE = os.getenv("PIPELINE_OFFLINE", "false").lower() == "true"
+
+PROJECT_HF_HOME = os.path.join(CACHE_DIR, "huggingface")
+
+
+def _use_project_hf_cache():
+    # Opt-in: the user's own Hugging Face cache stays in place unless --prepare has filled the project cache,
+    # PIPELINE_CACHE_DIR is set, or PIPELINE_HF_CACHE=true
+    if (os.path.isdir(PROJECT_HF_HOME) or os.getenv("PIPELINE_CACHE_DIR")
+            or os.getenv("PIPELINE_HF_CACHE", "false").lower() == "true"):
+        os.environ.setdefault("HF_HOME", PROJECT_HF_HOME)
+
+
+_use_project_hf_cache()
+
+SPACY_MODEL = "en_core_web_sm"
+SENTENCE_MODEL = "all-MiniLM-L6-v2"
+FINBERT_MODEL = "yiyanghkust/finbert-tone"
+HF_MODELS = {
+    "sentence_transformer": f"sentence-transformers/{SENTENCE_MODEL}",
+    "finbert": FINBERT_MODEL,
+}
+
+STAGE_MODULES = [
+    "data_collection", "preprocessing", "nlp_processing", "triplet_extraction",
+    "embedding_and_clustering", "FinBERT_signals", "GPT4_signals", "compare_saved", "report_rendering",
+]
+
+
+def _load_manifest():
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _use_offline_hub():
+    # Once everything is cached there is no reason to ask the Hub for revisions on every start
+    if OFFLINE or _load_manifest().get("verified"):
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+
+# ------------------ Lazy loaders ------------------
+
+@lru_cache(maxsize=None)
+def stopwords():
+    """English stopwords; read from the cache file so nltk is not imported on the hot path."""
+    if os.path.exists(STOPWORDS_FILE):
+        with open(STOPWORDS_FILE, "r", encoding="utf-8") as f:
+            return frozenset(line.strip() for line in f if line.strip())
+
+    import nltk
+    if NLTK_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DIR)
+    try:
+        nltk.data.find("corpora/stopwords")
+    except LookupError:
+        if OFFLINE:
+            raise RuntimeError("NLTK stopwords missing; run `python resources.py --prepare` first")
+        nltk.download("stopwords", download_dir=NLTK_DIR, quiet=True)
+    from nltk.corpus import stopwords as nltk_stopwords
+    return frozenset(nltk_stopwords.words("english"))
+
+
+@lru_cache(maxsize=None)
+def load_spacy(name=SPACY_MODEL):
+    with metrics.model_load("spacy"):
+        import spacy
+        return spacy.load(name)
+
+
+def load_sentence_transformer(name=SENTENCE_MODEL, backend="torch"):
+    """backend: "torch" (fp32), "quantized" (dynamic int8 Linear layers, CPU) or "onnx" (needs optimum[onnxruntime]).
+    f(name), f(name, "torch") and f() are one cache entry, so the model is loaded once however it is called."""
+    return _load_sentence_transformer(name, backend)
+
+
+@lru_cache(maxsize=None)
+def _load_sentence_transformer(name, backend):
+    _use_offline_hub()
+    with metrics.model_load("sentence_transformer"):
+        from sentence_transformers import SentenceTransformer
+        if backend == "onnx":
+            return SentenceTransformer(name, backend="onnx")
+        model = SentenceTransformer(name, device="cpu" if backend == "quantized" else None)
+        if backend == "quantized":
+            import torch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+
+@lru_cache(maxsize=None)
+def load_finbert(name=FINBERT_MODEL):
+    """FinBERT sentiment pipeline on GPU when available."""
+    _use_offline_hub()
+    with metrics.model_load("finbert"):
+        import torch
+        from transformers import BertTokenizer, BertForSequenceClassification, pipeline
+        tokenizer = BertTokenizer.from_pretrained(name)
+        model = BertForSequenceClassification.from_pretrained(name)
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        model.to(device)
+        print(f"Using device: {device}")
+        return pipeline(
+            "sentiment-analysis",
+            model=model,
+            tokenizer=tokenizer,
+            device=0 if torch.cuda.is_available() else -1
+        )
+
+
+# ------------------ Prepare / verify ------------------
+
+def prepare():
+    """Download everything once into CACHE_DIR (the only step that needs network)."""
+    os.makedirs(PROJECT_HF_HOME, exist_ok=True)
+    os.environ.setdefault("HF_HOME", PROJECT_HF_HOME)
+
+    import nltk
+    nltk.download("stopwords", download_dir=NLTK_DIR, quiet=True)
+    nltk.data.path.insert(0, NLTK_DIR)
+    from nltk.corpus import stopwords as nltk_stopwords
+    with open(STOPWORDS_FILE, "w", encoding="utf-8") as f:
+        f.write("\n".join(sorted(nltk_stopwords.words("english"))))
+
+    if importlib.util.find_spec(SPACY_MODEL) is None:
+        subprocess.run([sys.executable, "-m", "spacy", "download", SPACY_MODEL], check=True)
+
+    from huggingface_hub import snapshot_download
+    for repo_id in HF_MODELS.values():
+        print(f"⬇️  {repo_id}")
+        snapshot_download(repo_id)
+
+    return verify()
+
+
+def verify():
+    """Check every resource is present locally, without touching the network."""
+    checks = {
+        "stopwords": os.path.exists(STOPWORDS_FILE),
+        SPACY_MODEL: importlib.util.find_spec(SPACY_MODEL) is not None,
+    }
+    try:
+        from huggingface_hub import try_to_load_from_cache
+        for key, repo_id in HF_MODELS.items():
+            checks[key] = isinstance(try_to_load_from_cache(repo_id, "config.json"), str)
+    except ImportError:
+        for key in HF_MODELS:
+            checks[key] = False
+
+    manifest = {
+        "verified": all(checks.values()),
+        "checked_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cache_dir": CACHE_DIR,
+        "resources": checks,
+    }
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    for name, ok in checks.items():
+        print(f"{'✓' if ok else '✘'} {name}")
+    return manifest
+
+
+# ------------------ Import-time report ------------------
+
+def import_cost(module, cwd=None):
+    """(cumulative seconds, [(direct import, seconds)] heaviest first, ok) for a cold `import module`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd or os.path.dirname(os.path.abspath(__file__)),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    total, children, pending = 0.0, [], []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") < 2:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        cumulative, name = cumulative.strip(), name[1:]
+        if not cumulative.isdigit():
+            continue  # header row
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        seconds = int(cumulative) / 1e6
+        # -X importtime prints children before their parent
+        if depth == 1:
+            pending.append((name.strip(), seconds))
+        elif depth == 0:
+            if name.strip() == module:
+                total, children = seconds, pending
+            pending = []
+    children.sort(key=lambda x: x[1], reverse=True)
+    return total, children, proc.returncode == 0
+
+
+def import_report(modules=STAGE_MODULES, top=5):
+    report = {}
+    print(f"{'Stage':<28} {'Import s':>9}  Heaviest imports")
+    for module in modules:
+        total, packages, ok = import_cost(module)
+        report[module] = {"import_s": round(total, 3), "ok": ok,
+                          "top": [(p, round(s, 3)) for p, s in packages[:top]]}
+        heaviest = ", ".join(f"{p} {s:.2f}s" for p, s in packages[:top])
+        print(f"{module:<28} {total:>9.2f}  {heaviest}{'' if ok else '  (import failed)'}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolve, verify and profile pipeline start-up resources")
+    parser.add_argument("--prepare", action="store_true", help="download models and corpora into the cache")
+    parser.add_argument("--verify", action="store_true", help="check the cache offline")
+    parser.add_argument("--import-report", action="store_true", help="show import time per stage")
+    args = parser.parse_args()
+
+    if args.prepare:
+        prepare()
+    if args.verify or not (args.prepare or args.import_report):
+        verify()
+    if args.import_report:
+        import_report()
@@ -1,9 +1,10 @@
 import os
 import json
+import record_io
 
 # Define input directories (adjust paths as needed)
 ENRICHED_DIR = "enriched_data"
-CLUSTERED_FILE = "data_output/clustered_triplets.json"
+CLUSTERED_FILE = "data_output/clustered_triplets"
 GPT_SIGNALS_FILE = "data_output/gpt_signals_combined.json"
 
 # Initialise counters
@@ -13,20 +14,14 @@ num_clustered_triplets = 0
 num_gpt_signals = 0
 
 # Count enriched articles and triplets
-for filename in os.listdir(ENRICHED_DIR):
-    if filename.endswith(".json"):
-        with open(os.path.join(ENRICHED_DIR, filename), "r", encoding="utf-8") as f:
-            articles = json.load(f)
-            num_enriched_articles += len(articles)
-            for article in articles:
-                if all(k in article and article[k] for k in ["subject", "verb", "object"]):
-                    total_triplets_extracted += 1
+for stem in record_io.list_stems(ENRICHED_DIR):
+    for article in record_io.iter_records(os.path.join(ENRICHED_DIR, stem)):
+        num_enriched_articles += 1
+        if all(k in article and article[k] for k in ["subject", "verb", "object"]):
+            total_triplets_extracted += 1
 
 # Count clustered triplets
-if os.path.exists(CLUSTERED_FILE):
-    with open(CLUSTERED_FILE, "r", encoding="utf-8") as f:
-        clustered_triplets = json.load(f)
-        num_clustered_triplets = len(clustered_triplets)
+num_clustered_triplets = sum(1 for _ in record_io.iter_records(CLUSTERED_FILE))
 
 # Count GPT-generated signals
 if os.path.exists(GPT_SIGNALS_FILE):
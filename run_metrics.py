@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import bisect
+from contextlib import contextmanager
+from datetime import datetime
+
+# Config
+RUN_METRICS_FILE = os.getenv("RUN_METRICS_FILE", "data_output/run_metrics.json")
+RUN_ID_ENV = "PIPELINE_RUN_ID"
+LOCK_STALE_S = 30  # a lock file older than this was left by a killed process
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+BUCKETS_MS = [1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+BUCKET_LABELS = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+
+PROCESS_NAME = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "interactive"
+_PROCESS_START = time.perf_counter()
+
+_latencies = {}      # stage -> [seconds per item]
+_items = {}          # stage -> items processed (a batch call can cover many items)
+_model_loads = {}    # model -> seconds
+_gpt_usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+_counters = {}
+
+
+# ------------------ Recording ------------------
+
+def record(stage, seconds, items=1):
+    _latencies.setdefault(stage, []).append(seconds)
+    _items[stage] = _items.get(stage, 0) + items
+
+
+@contextmanager
+def timer(stage, items=1):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, items)
+
+
+def timed(stage):
+    def decorator(fn):
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def model_load(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _model_loads[name] = round(_model_loads.get(name, 0.0) + time.perf_counter() - start, 3)
+
+
+def record_tokens(usage):
+    """Add an OpenAI `resp.usage` object (or dict) to the GPT token totals."""
+    if usage is None:
+        return
+    _gpt_usage["calls"] += 1
+    for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+        _gpt_usage[field] += int(value or 0)
+
+
+def reset():
+    """Forget everything recorded so far (a pool worker reused for the next task)."""
+    _latencies.clear()
+    _items.clear()
+    _model_loads.clear()
+    _counters.clear()
+    for field in _gpt_usage:
+        _gpt_usage[field] = 0
+
+
+def increment(name, amount=1):
+    _counters[name] = _counters.get(name, 0) + amount
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        mem = psutil.Process().memory_info()
+        return round(getattr(mem, "peak_wset", mem.rss) / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+# ------------------ Summaries ------------------
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def histogram(latencies):
+    counts = [0] * len(BUCKET_LABELS)
+    for seconds in latencies:
+        counts[bisect.bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+    return dict(zip(BUCKET_LABELS, counts))
+
+
+def summarise_stage(stage):
+    values = sorted(_latencies.get(stage, []))
+    total = sum(values)
+    items = _items.get(stage, 0)
+    return {
+        "calls": len(values),
+        "items": items,
+        "total_s": round(total, 3),
+        "items_per_sec": round(items / total, 2) if total > 0 else None,
+        "mean_ms": round(1000 * total / len(values), 2) if values else 0.0,
+        "p50_ms": round(1000 * _percentile(values, 0.50), 2),
+        "p95_ms": round(1000 * _percentile(values, 0.95), 2),
+        "max_ms": round(1000 * values[-1], 2) if values else 0.0,
+        "histogram": histogram(values),
+    }
+
+
+def process_summary():
+    return {
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "wall_s": round(time.perf_counter() - _PROCESS_START, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "model_load_s": dict(_model_loads),
+        "gpt_usage": dict(_gpt_usage),
+        "counters": dict(_counters),
+        "stages": {stage: summarise_stage(stage) for stage in sorted(_latencies)},
+    }
+
+
+# Cross-process totals; percentiles do not merge, so only sums and histograms are combined
+def _aggregate(processes):
+    stages = {}
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    peak = None
+    for proc in processes.values():
+        for stage, s in proc.get("stages", {}).items():
+            agg = stages.setdefault(stage, {"calls": 0, "items": 0, "total_s": 0.0,
+                                            "histogram": dict.fromkeys(BUCKET_LABELS, 0)})
+            agg["calls"] += s.get("calls", 0)
+            agg["items"] += s.get("items", 0)
+            agg["total_s"] = round(agg["total_s"] + s.get("total_s", 0.0), 3)
+            for label, n in s.get("histogram", {}).items():
+                agg["histogram"][label] = agg["histogram"].get(label, 0) + n
+        for field in usage:
+            usage[field] += proc.get("gpt_usage", {}).get(field, 0)
+        rss = proc.get("peak_rss_mb")
+        if rss is not None:
+            peak = rss if peak is None else max(peak, rss)
+
+    for agg in stages.values():
+        agg["items_per_sec"] = round(agg["items"] / agg["total_s"], 2) if agg["total_s"] > 0 else None
+    return {"stages": stages, "gpt_usage": usage, "peak_rss_mb": peak}
+
+
+# ------------------ Persistence ------------------
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _write(path, doc):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _locked(path):
+    """Exclusive lock file around a load-modify-write of the shared metrics file, so concurrent processes
+    (pipeline scripts, scoring service, streaming) do not overwrite each other's entries."""
+    lock = path + ".lock"
+    os.makedirs(os.path.dirname(lock) or ".", exist_ok=True)
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > LOCK_STALE_S:
+                    os.remove(lock)  # left behind by a killed process
+                    continue
+            except OSError:
+                continue  # released in between
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock)
+
+
+def start_run(path=RUN_METRICS_FILE):
+    """Begin a pipeline run; child processes inherit the run id and merge into one file."""
+    run_id = uuid.uuid4().hex[:12]
+    os.environ[RUN_ID_ENV] = run_id
+    with _locked(path):
+        _write(path, {"run_id": run_id, "started": datetime.now().isoformat(timespec="seconds"),
+                      "processes": {}, "scripts": {}})
+    return run_id
+
+
+def record_script(name, seconds, ok, path=RUN_METRICS_FILE):
+    with _locked(path):
+        doc = _load(path) or {"processes": {}, "scripts": {}}
+        doc.setdefault("scripts", {})[name] = {"wall_s": round(seconds, 3), "ok": ok}
+        _write(path, doc)
+
+
+def flush(path=RUN_METRICS_FILE, process=None):
+    """Merge this process's summary into the run file under `process` (default: the script name)."""
+    if not (_latencies or _model_loads or _gpt_usage["calls"] or _counters):
+        return
+
+    summary = process_summary()
+    run_id = os.getenv(RUN_ID_ENV)
+    with _locked(path):
+        doc = _load(path) if run_id else None
+        if not doc or doc.get("run_id") != run_id:
+            # Standalone script run: it is its own run
+            doc = {"run_id": run_id or uuid.uuid4().hex[:12],
+                   "started": datetime.now().isoformat(timespec="seconds"),
+                   "processes": {}, "scripts": {}}
+
+        doc.setdefault("processes", {})[process or PROCESS_NAME] = summary
+        doc["totals"] = _aggregate(doc["processes"])
+        _write(path, doc)
+
+
+atexit.register(flush)
@@ -1,9 +1,19 @@
+import os
 import subprocess
 import sys
+import time
+import run_metrics
+
+# --cascade: FinBERT scores everything and only uncertain articles go to GPT (cascade_signals.py)
+CASCADE = "--cascade" in sys.argv[1:]
+# PIPELINE_SHARDS=N: preprocessing, NLP and triplet extraction run as N shards in a process pool (sharding.py)
+SHARDED = int(os.getenv("PIPELINE_SHARDS", "1")) > 1
 
 scripts = ["save_sp500_ticker_mapping.py",
     "data_collection.py",
     "preprocessing.py",
+    "near_duplicates.py",
+    "relevance_filter.py",
     "nlp_processing.py",
     "triplet_extraction.py",
     "embedding_and_clustering.py",
@@ -12,20 +22,40 @@ scripts = ["save_sp500_ticker_mapping.py",
     "convert_finbert_to_grouped.py",
     "results_stats.py",
     "compare_saved.py",
-    "gpt_sentiment_charts.py",
-    "heatmap.py",
-    "visualise_embeddings.py"
+    "event_study.py",
+    "report_rendering.py"
     ]
+if CASCADE:
+    scripts.remove("GPT4_signals.py")
+    scripts.insert(scripts.index("FinBERT_signals.py") + 1, "cascade_signals.py")
+if SHARDED:
+    for script, stage in [("preprocessing.py", "preprocessing"), ("nlp_processing.py", "nlp"),
+                          ("triplet_extraction.py", "triplets")]:
+        scripts[scripts.index(script)] = f"sharding.py {stage}"
+
+FEED_CONSUMERS = {"preprocessing.py", "sharding.py preprocessing"}
 
 print("🔁 Starting full dissertation pipeline...\n")
+run_metrics.start_run()
 
 for script in scripts:
     print(f"🚀 Running: {script}")
+    start = time.perf_counter()
+    ok = True
     try:
-        result = subprocess.run([sys.executable, script], check=True)
+        result = subprocess.run([sys.executable, *script.split()], check=True)
     except subprocess.CalledProcessError as e:
+        ok = False
         print(f"❌ Error in {script}")
         print(e)
+    run_metrics.record_script(script, time.perf_counter() - start, ok)
+    # Feed entries stay pending until preprocessing has consumed them; from then on they live in processed_data
+    if script in FEED_CONSUMERS:
+        if ok:
+            subprocess.run([sys.executable, "data_collection.py", "--ack"], check=False)
+        else:
+            print("⚠️ Preprocessing failed; pending feed entries are kept for the next run")
     print()
 
 print("🏁 Pipeline finished.")
+print(f"📊 Run metrics → {run_metrics.RUN_METRICS_FILE}")
@@ -1,11 +1,164 @@
-import shutil
 import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+# Incremental snapshots of the output folders.
+# Each file is stored once in a content-addressed blob directory (snapshots/blobs/<hash>), and each snapshot is
+# a manifest mapping paths to hashes. Files whose size and mtime match the previous snapshot are not re-read,
+# so a snapshot costs time and disk in proportion to what changed since the last one.
+
+SNAPSHOT_DIR = "snapshots"
+BLOB_DIR = os.path.join(SNAPSHOT_DIR, "blobs")
+MANIFEST_DIR = os.path.join(SNAPSHOT_DIR, "manifests")
+FOLDERS_TO_BACKUP = ['data_output', 'enriched_data', 'processed_data', 'results', 'triplets_data']
+CHUNK_SIZE = 1 << 20
+
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def blob_path(digest):
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+
+# ------------------ Manifests ------------------
+
+def list_snapshots():
+    """Snapshot ids, oldest first (ids are timestamps, so name order is time order)."""
+    if not os.path.isdir(MANIFEST_DIR):
+        return []
+    return sorted(name[:-len(".json")] for name in os.listdir(MANIFEST_DIR) if name.endswith(".json"))
+
+
+def load_manifest(snapshot_id):
+    with open(os.path.join(MANIFEST_DIR, f"{snapshot_id}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ------------------ Snapshot ------------------
+
+def snapshot(folders=FOLDERS_TO_BACKUP, label=""):
+    """Stores new or changed files as blobs and writes a manifest; returns the snapshot id."""
+    previous = list_snapshots()
+    known = load_manifest(previous[-1])["files"] if previous else {}
+
+    files = {}
+    new_blobs = new_bytes = 0
+    for folder in folders:
+        if not os.path.isdir(folder):
+            print(f"⚠️ Skipping missing folder: {folder}")
+            continue
+        for root, _, names in os.walk(folder):
+            for name in names:
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, ".").replace(os.sep, "/")
+                st = os.stat(path)
+                entry = known.get(rel)
+                # Same size and mtime as last time: reuse the hash instead of reading the file
+                if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                    digest = entry["hash"]
+                else:
+                    digest = file_hash(path)
+                target = blob_path(digest)
+                if not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copy2(path, target + ".tmp")
+                    os.replace(target + ".tmp", target)
+                    new_blobs += 1
+                    new_bytes += st.st_size
+                files[rel] = {"hash": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    snapshot_id = time.strftime("%Y%m%d_%H%M%S") + (f"_{label}" if label else "")
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    with open(os.path.join(MANIFEST_DIR, f"{snapshot_id}.json"), "w", encoding="utf-8") as f:
+        json.dump({"id": snapshot_id, "created": time.strftime("%Y-%m-%d %H:%M:%S"), "folders": list(folders),
+                   "files": files}, f, indent=1, sort_keys=True)
+
+    total = sum(e["size"] for e in files.values())
+    print(f"✅ Snapshot {snapshot_id}: {len(files)} files ({total / 1e6:.1f} MB), "
+          f"{new_blobs} new blobs ({new_bytes / 1e6:.1f} MB stored)")
+    return snapshot_id
+
+
+# ------------------ Restore ------------------
+
+def restore(snapshot_id, target="."):
+    """Recreates the snapshot's files under `target`. Files that already match are skipped.
+    Files are always copied: the stages rewrite their outputs in place, which would corrupt a hardlinked blob."""
+    manifest = load_manifest(snapshot_id)
+    restored = skipped = 0
+    for rel, entry in manifest["files"].items():
+        dest = os.path.join(target, *rel.split("/"))
+        if os.path.exists(dest):
+            st = os.stat(dest)
+            if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]:
+                skipped += 1
+                continue
+            os.remove(dest)
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        source = blob_path(entry["hash"])
+        shutil.copy2(source, dest)
+        os.utime(dest, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+        restored += 1
+    print(f"✅ Restored {snapshot_id} into {os.path.abspath(target)}: {restored} files written, {skipped} unchanged")
+
+
+# ------------------ Listing and pruning ------------------
+
+def print_snapshots():
+    seen = set()
+    print(f"{'snapshot':<28} {'files':>7} {'size MB':>9} {'new MB':>8}")
+    for snapshot_id in list_snapshots():
+        files = load_manifest(snapshot_id)["files"]
+        size = sum(e["size"] for e in files.values())
+        new = sum(e["size"] for e in {e["hash"]: e for e in files.values() if e["hash"] not in seen}.values())
+        seen.update(e["hash"] for e in files.values())
+        print(f"{snapshot_id:<28} {len(files):>7} {size / 1e6:>9.1f} {new / 1e6:>8.1f}")
+
+
+def prune(keep):
+    """Keeps the newest `keep` snapshots and deletes blobs no remaining snapshot refers to."""
+    snapshots = list_snapshots()
+    for snapshot_id in snapshots[:max(len(snapshots) - keep, 0)]:
+        os.remove(os.path.join(MANIFEST_DIR, f"{snapshot_id}.json"))
+
+    referenced = set()
+    for snapshot_id in list_snapshots():
+        referenced.update(e["hash"] for e in load_manifest(snapshot_id)["files"].values())
+    removed = freed = 0
+    if os.path.isdir(BLOB_DIR):
+        for root, _, names in os.walk(BLOB_DIR):
+            for name in names:
+                if name not in referenced:
+                    path = os.path.join(root, name)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed += 1
+    print(f"🧹 Kept {min(keep, len(snapshots))} snapshots; removed {removed} blobs ({freed / 1e6:.1f} MB)")
 
-backup_dir = 'outputs_2025_08_02'
-os.makedirs(backup_dir, exist_ok=True)
 
-folders_to_backup = ['data_output', 'enriched_data', 'processed_data', 'results', 'triplets_data']
-for folder in folders_to_backup:
-    shutil.copytree(folder, os.path.join(backup_dir, folder), dirs_exist_ok=True)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental, deduplicated snapshots of the output folders")
+    parser.add_argument("--label", default="", help="suffix for the snapshot id")
+    parser.add_argument("--list", action="store_true", help="list snapshots")
+    parser.add_argument("--restore", default=None, metavar="ID", help="restore a snapshot ('latest' for the newest)")
+    parser.add_argument("--target", default=".", help="directory to restore into")
+    parser.add_argument("--prune", type=int, default=None, metavar="N", help="keep only the newest N snapshots")
+    args = parser.parse_args()
 
-print("Backup complete.")
+    if args.list:
+        print_snapshots()
+    elif args.restore:
+        restore(list_snapshots()[-1] if args.restore == "latest" else args.restore, args.target)
+    elif args.prune is not None:
+        prune(args.prune)
+    else:
+        snapshot(label=args.label)
@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+import socketserver
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import run_metrics as metrics
+import record_io
+from resources import load_spacy, load_sentence_transformer, load_finbert
+import nlp_processing
+import triplet_extraction
+import embedding_and_clustering
+
+# Long-running scoring daemon: models stay warm, concurrent requests are micro-batched
+
+HOST = os.getenv("SCORER_HOST", "127.0.0.1")
+PORT = int(os.getenv("SCORER_PORT", "8765"))
+MAX_BATCH = int(os.getenv("SCORER_MAX_BATCH", "16"))
+MAX_WAIT_MS = float(os.getenv("SCORER_MAX_WAIT_MS", "10"))
+CLUSTER_MIN_SIMILARITY = 0.5  # below this a triplet is reported as noise (-1)
+CLUSTERED_FILE = embedding_and_clustering.OUTPUT_CLUSTERED_FILE
+LABELS_FILE = embedding_and_clustering.OUTPUT_LABELS_FILE
+CENTROIDS_FILE = embedding_and_clustering.OUTPUT_CENTROIDS_FILE
+
+
+class MicroBatcher:
+    """Collects items from many threads and hands them to `process_batch` in groups."""
+
+    def __init__(self, process_batch, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, item):
+        future = Future()
+        self.queue.put((item, future))
+        return future
+
+    def _loop(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            items = [item for item, _ in batch]
+            try:
+                with metrics.timer("service_batch", items=len(items)):
+                    results = self.process_batch(items)
+            except Exception:
+                # Retry one by one, so a bad item only fails its own request
+                self._run_singly(batch)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _run_singly(self, batch):
+        for item, future in batch:
+            try:
+                future.set_result(self.process_batch([item])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+
+def article_error(article):
+    """Why `article` cannot be scored, or None."""
+    if not isinstance(article, dict):
+        return "each article must be a JSON object"
+    for field in ("text", "article_text", "title", "published"):
+        if article.get(field) is not None and not isinstance(article[field], str):
+            return f'"{field}" must be a string'
+    return None
+
+
+class ArticleScorer:
+    """Holds the spaCy, SentenceTransformer and FinBERT models plus cluster centroids in memory."""
+
+    def __init__(self):
+        print("🔥 Warming models...")
+        self.nlp = load_spacy()
+        self.encoder = load_sentence_transformer(embedding_and_clustering.MODEL_NAME)
+        self.finbert = load_finbert()
+        nlp_processing.load_ticker_patterns()
+        self.ner_ticker_map = triplet_extraction.load_ticker_map()
+        self.cluster_ids, self.centroids = self._load_centroids()
+        self.cluster_names = self._load_cluster_names()
+        self.score_batch([{"title": "warm-up", "text": "Apple shares rose after earnings beat estimates."}])
+        print(f"✅ Scorer ready ({len(self.cluster_ids)} clusters)")
+
+    def _load_centroids(self):
+        import numpy as np
+        if os.path.exists(CENTROIDS_FILE):
+            data = np.load(CENTROIDS_FILE)
+            return data["labels"], data["centroids"]
+        if not record_io.exists(CLUSTERED_FILE):
+            return np.zeros(0, dtype=np.int32), np.zeros((0, 1), dtype=np.float32)
+
+        # Older runs did not save centroids: rebuild them once from the clustered triplets
+        rows = [r for r in record_io.iter_records(CLUSTERED_FILE) if r.get("cluster_label", -1) != -1]
+        embeddings = self.encoder.encode([r["triplet"] for r in rows], batch_size=64)
+        labels, centroids = embedding_and_clustering.compute_cluster_centroids(
+            embeddings, [r["cluster_label"] for r in rows])
+        embedding_and_clustering.save_centroids(labels, centroids, CENTROIDS_FILE)
+        return labels, centroids
+
+    def _load_cluster_names(self):
+        if not os.path.exists(LABELS_FILE):
+            return {}
+        with open(LABELS_FILE, "r", encoding="utf-8") as f:
+            return {int(k): v.get("label", "") for k, v in json.load(f).items()}
+
+    def _assign_clusters(self, triplet_texts):
+        import numpy as np
+        if not triplet_texts:
+            return []
+        if len(self.cluster_ids) == 0:
+            return [(-1, 0.0)] * len(triplet_texts)
+        vectors = self.encoder.encode(triplet_texts, batch_size=64, normalize_embeddings=True)
+        sims = np.asarray(vectors, dtype=np.float32) @ self.centroids.T
+        best = sims.argmax(axis=1)
+        out = []
+        for row, col in enumerate(best):
+            score = float(sims[row, col])
+            out.append((int(self.cluster_ids[col]) if score >= CLUSTER_MIN_SIMILARITY else -1, round(score, 4)))
+        return out
+
+    def score_batch(self, articles):
+        texts = [(a.get("text") or a.get("article_text") or "").strip() for a in articles]
+
+        with metrics.timer("spacy", items=len(texts)):
+            docs = list(self.nlp.pipe(texts))
+
+        per_article = []
+        all_triplet_texts = []
+        contexts = []  # (article text[:512], {ticker: mention sentences}) per article
+        for article, text, doc in zip(articles, texts, docs):
+            spans = nlp_processing.match_ticker_spans(text)
+            for ticker, ner_spans in triplet_extraction.ticker_spans_from_doc(doc, self.ner_ticker_map).items():
+                spans.setdefault(ticker, []).extend(ner_spans)
+            bounds = nlp_processing.sentence_bounds(doc)
+            mentions = nlp_processing.ticker_mentions(spans, bounds)
+            triplets = triplet_extraction.triplets_from_doc(doc)
+            for t in triplets:
+                all_triplet_texts.append(f"{t['subject']} {t['verb']} {t['object']}")
+            per_article.append({
+                "title": article.get("title", ""),
+                "published": article.get("published", ""),
+                "entities": nlp_processing.entities_from_doc(doc),
+                "tickers": sorted(spans),
+                "ticker_mentions": mentions,
+                "triplets": triplets,
+            })
+            scoped = {"article_text": text, "sentence_spans": bounds, "ticker_mentions": mentions}
+            contexts.append((text[:512] or " ",
+                             {ticker: nlp_processing.ticker_sentences(scoped, ticker) for ticker in spans}))
+
+        with metrics.timer("embedding", items=len(all_triplet_texts)):
+            assignments = iter(self._assign_clusters(all_triplet_texts))
+
+        # Article-level and per-ticker inputs in one batch; tickers sharing sentences share a pass
+        unique = list(dict.fromkeys(c for lead, by_ticker in contexts for c in [lead, *by_ticker.values()]))
+        with metrics.timer("finbert", items=len(unique)):
+            finbert_results = dict(zip(unique, self.finbert(unique, batch_size=min(len(unique), 64))))
+
+        def label(context):
+            fin = finbert_results[context]
+            return {"sentiment": fin["label"].lower(), "confidence": round(float(fin["score"]), 4)}
+
+        for result, (lead, by_ticker) in zip(per_article, contexts):
+            for t in result["triplets"]:
+                t["cluster_label"], t["cluster_similarity"] = next(assignments)
+                t["cluster_name"] = self.cluster_names.get(t["cluster_label"], "")
+            result["finbert"] = label(lead)
+            result["finbert_signals"] = [{"ticker": ticker, **label(context)}
+                                         for ticker, context in sorted(by_ticker.items())]
+        return per_article
+
+
+def make_handler(batcher):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/score":
+                self._send(404, {"error": "not found"})
+                return
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                self._send(400, {"error": "invalid Content-Length"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                self._send(400, {"error": f"invalid JSON: {e}"})
+                return
+            articles = payload if isinstance(payload, list) else [payload]
+            # Checked before anything is batched with other clients' articles
+            for i, article in enumerate(articles):
+                error = article_error(article)
+                if error:
+                    self._send(400, {"error": f"article {i}: {error}"})
+                    return
+            try:
+                futures = [batcher.submit(a) for a in articles]
+                results = [f.result() for f in futures]
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+                return
+            elapsed_ms = round(1000 * (time.perf_counter() - start), 1)
+            metrics.record("service_request", elapsed_ms / 1000, items=len(articles))
+            self._send(200, {"results": results if isinstance(payload, list) else results[0],
+                             "latency_ms": elapsed_ms})
+
+        def log_message(self, *args):
+            pass
+
+    return ScoringHandler
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(host=HOST, port=PORT, unix_socket=None):
+    scorer = ArticleScorer()
+    handler = make_handler(MicroBatcher(scorer.score_batch))
+
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = UnixHTTPServer(unix_socket, handler)
+        print(f"🟢 Scoring service on unix:{unix_socket}")
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        print(f"🟢 Scoring service on http://{host}:{port}  (POST /score, GET /health)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        metrics.flush()
+        print("🛑 Scoring service stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm-model article scoring service")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix-socket", default=None, help="listen on a Unix socket instead of TCP")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.unix_socket)
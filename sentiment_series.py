@@ -0,0 +1,256 @@
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+
+import run_metrics as metrics
+
+# Incremental sentiment time series per ticker and per sector.
+# Signals are folded into daily buckets (one row per entity x day) plus an exponentially decayed score per
+# entity, all kept as flat NumPy arrays. An update touches only the signals not seen before,
+# so its cost grows with the new signals rather than with the history.
+
+STORE_FILE = "data_output/sentiment_series.npz"
+SECTOR_FILE = "data_output/sector_map.json"
+HALF_LIFE_DAYS = 3.0
+ROLLING_DAYS = 7
+SCORES = {"positive": 1.0, "neutral": 0.0, "mixed": 0.0, "negative": -1.0}
+MODELS = ("gpt", "finbert")
+SECTOR_PREFIX = "sector:"
+
+# Daily bucket columns: counts and confidence-weighted sums
+BUCKET_COLUMNS = ["count", "positive", "neutral", "negative", "score_sum", "weight_sum",
+                  "gpt_sum", "gpt_weight", "finbert_sum", "finbert_weight"]
+
+
+# ------------------ Sectors ------------------
+
+def sector_map(tickers, path=SECTOR_FILE):
+    """Sector per ticker, cached on disk so yfinance is only asked about tickers never seen before."""
+    cached = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    missing = [t for t in tickers if t not in cached]
+    if missing:
+        import yfinance as yf
+        for ticker in missing:
+            try:
+                cached[ticker] = yf.Ticker(ticker).info.get("sector", "Unknown") or "Unknown"
+            except Exception:
+                cached[ticker] = "Unknown"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cached, f, indent=2, sort_keys=True)
+    return {t: cached[t] for t in tickers}
+
+
+# ------------------ Store ------------------
+
+def _signal_hash(model, title, published, ticker):
+    key = f"{model}|{title}|{published}|{ticker}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class SentimentSeries:
+    def __init__(self, path=STORE_FILE, half_life_days=HALF_LIFE_DAYS):
+        self.path = path
+        self.half_life = half_life_days
+        self.entities = []                 # entity name per index ("AAPL", "sector:Technology")
+        self.entity_index = {}
+        self.keys = np.zeros(0, dtype=np.int64)           # entity << 32 | day, one per bucket row
+        self.buckets = np.zeros((0, len(BUCKET_COLUMNS)))  # rows aligned with keys
+        self.row_of = {}
+        self.decayed = np.zeros((0, 2))                    # per entity: decayed score sum, decayed weight
+        self.last_day = np.zeros(0, dtype=np.int32)        # per entity: day the decayed state refers to
+        self.seen = set()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        data = np.load(self.path, allow_pickle=False)
+        self.entities = data["entities"].tolist()
+        self.entity_index = {e: i for i, e in enumerate(self.entities)}
+        self.keys = data["keys"]
+        self.buckets = data["buckets"]
+        self.row_of = {int(k): i for i, k in enumerate(self.keys)}
+        self.decayed = data["decayed"]
+        self.last_day = data["last_day"]
+        self.seen = set(data["seen"].tolist())
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez_compressed(tmp, entities=np.array(self.entities, dtype=str), keys=self.keys,
+                            buckets=self.buckets, decayed=self.decayed, last_day=self.last_day,
+                            seen=np.fromiter(self.seen, dtype=np.uint64, count=len(self.seen)))
+        os.replace(tmp, self.path)
+
+    def _entity(self, name):
+        idx = self.entity_index.get(name)
+        if idx is None:
+            idx = self.entity_index[name] = len(self.entities)
+            self.entities.append(name)
+            self.decayed = np.vstack([self.decayed, np.zeros((1, 2))])
+            self.last_day = np.append(self.last_day, np.int32(0))
+        return idx
+
+    # ------------------ Updates ------------------
+
+    def update(self, signals, sectors=None):
+        """Folds new rows of a signal frame (signal_frames columns) into the series; returns how many were new."""
+        if signals.empty:
+            return 0
+        df = signals.dropna(subset=["published_at"])
+        df = df[(df["ticker"] != "") & df["sentiment"].isin(list(SCORES))]
+        hashes = np.fromiter((_signal_hash(m, t, p, k) for m, t, p, k in
+                              zip(df["model"], df["title"], df["published"], df["ticker"])), dtype=np.uint64, count=len(df))
+        # One row per hash (first occurrence), so repeats in a batch count once, as they would on a later run
+        _, first = np.unique(hashes, return_index=True)
+        first = np.sort(first)
+        fresh = np.array([h not in self.seen for h in hashes[first].tolist()], dtype=bool)
+        df, hashes = df.iloc[first[fresh]], hashes[first[fresh]]
+        if df.empty:
+            return 0
+
+        with metrics.timer("sentiment_series_update", items=len(df)):
+            sectors = sectors if sectors is not None else sector_map(sorted(df["ticker"].unique()))
+            days = (df["published_at"].dt.tz_convert(None).to_numpy().astype("datetime64[D]")
+                    .astype(np.int64)).astype(np.int32)
+            score = df["sentiment"].map(SCORES).to_numpy(dtype=float)
+            weight = df["confidence"].clip(0, 1).to_numpy(dtype=float)
+            model = df["model"].to_numpy()
+
+            values = np.zeros((len(df), len(BUCKET_COLUMNS)))
+            values[:, 0] = 1
+            values[:, 1] = score > 0
+            values[:, 2] = score == 0
+            values[:, 3] = score < 0
+            values[:, 4] = score * weight
+            values[:, 5] = weight
+            for i, name in enumerate(MODELS):
+                is_model = model == name
+                values[:, 6 + 2 * i] = np.where(is_model, score * weight, 0)
+                values[:, 7 + 2 * i] = np.where(is_model, weight, 0)
+
+            tickers = df["ticker"].to_numpy()
+            # Every signal counts towards its ticker and its ticker's sector
+            for names in (tickers, np.array([SECTOR_PREFIX + sectors.get(t, "Unknown") for t in tickers])):
+                entity = np.array([self._entity(n) for n in names], dtype=np.int64)
+                self._add_buckets(entity, days, values)
+                self._add_decayed(entity, days, score * weight, weight)
+
+        self.seen.update(hashes.tolist())
+        return len(df)
+
+    def _add_buckets(self, entity, days, values):
+        keys = (entity << 32) | days.astype(np.int64)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        sums = np.zeros((len(unique), values.shape[1]))
+        np.add.at(sums, inverse, values)
+
+        rows = np.array([self.row_of.get(int(k), -1) for k in unique], dtype=np.int64)
+        known = rows >= 0
+        self.buckets[rows[known]] += sums[known]
+        if (~known).any():
+            start = len(self.keys)
+            self.keys = np.concatenate([self.keys, unique[~known]])
+            self.buckets = np.vstack([self.buckets, sums[~known]])
+            for offset, k in enumerate(unique[~known].tolist()):
+                self.row_of[k] = start + offset
+
+    def _add_decayed(self, entity, days, weighted_score, weight):
+        # Bring each touched entity's state forward to its newest day, then add the new signals decayed to that day
+        decay = np.log(2) / self.half_life
+        for e in np.unique(entity):
+            mine = entity == e
+            newest = max(int(days[mine].max()), int(self.last_day[e]))
+            self.decayed[e] *= np.exp(-decay * (newest - self.last_day[e]))
+            factors = np.exp(-decay * (newest - days[mine]))
+            self.decayed[e, 0] += float((weighted_score[mine] * factors).sum())
+            self.decayed[e, 1] += float((weight[mine] * factors).sum())
+            self.last_day[e] = newest
+
+    def update_from_files(self):
+        from signal_frames import load_signal_frame, GPT_FILE, FINBERT_FILE
+        added = self.update(load_signal_frame(GPT_FILE, "gpt_signals", "gpt"))
+        added += self.update(load_signal_frame(FINBERT_FILE, "finbert_signals", "finbert"))
+        self.save()
+        print(f"✅ Sentiment series: {added} new signals, {len(self.entities)} tickers/sectors → {self.path}")
+        return added
+
+    # ------------------ Queries ------------------
+
+    def series(self, entity, start=None, end=None, window=ROLLING_DAYS):
+        """Daily series for a ticker (or "sector:<name>") between two dates (inclusive), as a DataFrame."""
+        import pandas as pd
+        idx = self.entity_index.get(entity)
+        if idx is None:
+            return pd.DataFrame(columns=["date", *BUCKET_COLUMNS])
+        mine = (self.keys >> 32) == idx
+        days = (self.keys[mine] & 0xFFFFFFFF).astype("datetime64[D]")
+        df = pd.DataFrame(self.buckets[mine], columns=BUCKET_COLUMNS, index=pd.DatetimeIndex(days, name="date"))
+        df = df.sort_index().asfreq("D", fill_value=0.0)
+
+        rolled = df[["score_sum", "weight_sum"]].rolling(window, min_periods=1).sum()
+        df["score"] = df["score_sum"] / df["weight_sum"].where(df["weight_sum"] > 0)
+        df["rolling_score"] = rolled["score_sum"] / rolled["weight_sum"].where(rolled["weight_sum"] > 0)
+        halflife = pd.Timedelta(days=self.half_life)
+        df["decayed_score"] = (df["score_sum"].ewm(halflife=halflife, times=df.index).mean()
+                               / df["weight_sum"].ewm(halflife=halflife, times=df.index).mean())
+        gpt = df["gpt_sum"] / df["gpt_weight"].where(df["gpt_weight"] > 0)
+        finbert = df["finbert_sum"] / df["finbert_weight"].where(df["finbert_weight"] > 0)
+        df["disagreement"] = (gpt - finbert).abs()
+        df["count"] = df["count"].astype(int)
+
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df.index <= pd.Timestamp(end)]
+        return df
+
+    def latest(self, sectors=False):
+        """{entity: decayed score as of its last signal}, for tickers or for sectors."""
+        out = {}
+        for i, name in enumerate(self.entities):
+            if name.startswith(SECTOR_PREFIX) != sectors or self.decayed[i, 1] == 0:
+                continue
+            out[name] = round(float(self.decayed[i, 0] / self.decayed[i, 1]), 4)
+        return out
+
+    def range(self, start=None, end=None, sectors=False):
+        """Per-entity totals over a date range: {entity: {count, positive, neutral, negative, score}}."""
+        days = (self.keys & 0xFFFFFFFF).astype("datetime64[D]")
+        mask = np.ones(len(self.keys), dtype=bool)
+        if start is not None:
+            mask &= days >= np.datetime64(start, "D")
+        if end is not None:
+            mask &= days <= np.datetime64(end, "D")
+        entity = (self.keys[mask] >> 32).astype(np.int64)
+        totals = np.zeros((len(self.entities), len(BUCKET_COLUMNS)))
+        np.add.at(totals, entity, self.buckets[mask])
+
+        out = {}
+        for i, name in enumerate(self.entities):
+            if name.startswith(SECTOR_PREFIX) != sectors or totals[i, 0] == 0:
+                continue
+            row = dict(zip(BUCKET_COLUMNS, totals[i]))
+            out[name] = {"count": int(row["count"]), "positive": int(row["positive"]),
+                         "neutral": int(row["neutral"]), "negative": int(row["negative"]),
+                         "score": round(row["score_sum"] / row["weight_sum"], 4) if row["weight_sum"] else None}
+        return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental per-ticker / per-sector sentiment series")
+    parser.add_argument("--ticker", default=None, help="print the daily series for a ticker or sector:<name>")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    args = parser.parse_args()
+
+    store = SentimentSeries()
+    store.update_from_files()
+    if args.ticker:
+        print(store.series(args.ticker, args.start, args.end).to_string())
@@ -0,0 +1,164 @@
+import os
+import heapq
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import run_metrics as metrics
+import record_io
+from triplet_extraction import ARTICLE_FIELDS
+
+# Sharded execution of the per-article stages (preprocessing, NLP, triplets).
+# Articles are assigned to one of N shards by a hash of their stable id. Each shard writes its own
+# outputs and text-store file under <output_dir>/_shards/, so shards can run in a local process pool
+# or on separate machines sharing the filesystem. The merge puts records back in input order,
+# so the result does not depend on N or on which shard finished first.
+
+SHARD_DIR = "_shards"
+POSITION_FIELD = "_pos"  # (input file position, output index) while records sit in shard files
+DEFAULT_SHARDS = int(os.getenv("PIPELINE_SHARDS", str(os.cpu_count() or 1)))
+
+
+# ------------------ Stages ------------------
+# Each stage: input/output dirs, which input stems it reads, the output stem for an input stem,
+# and a function (record, text store) -> list of output records.
+
+def _preprocess(entry, store):
+    import preprocessing
+    processed = preprocessing.preprocess_entry(entry)
+    return [store.put(processed)] if processed else []
+
+
+def _enrich(article, store):
+    import nlp_processing
+    return [store.put(nlp_processing.enrich_article(store.hydrate(article)))]
+
+
+def _triplets(article, store):
+    import triplet_extraction
+    return triplet_extraction.article_triplets(store.hydrate(article))
+
+
+STAGES = {
+    "preprocessing": {
+        "input_dir": "data_output", "output_dir": "processed_data",
+        "select": lambda stem: stem.endswith("_news"), "output": "processed_{}",
+        "process": _preprocess, "fields": None,
+    },
+    "nlp": {
+        "input_dir": "processed_data", "output_dir": "enriched_data",
+        "select": lambda stem: True, "output": "enriched_{}",
+        "process": _enrich, "fields": None,
+    },
+    "triplets": {
+        "input_dir": "enriched_data", "output_dir": "triplets_data",
+        "select": lambda stem: True, "output": "triplets_{}",
+        "process": _triplets, "fields": ARTICLE_FIELDS,
+    },
+}
+
+
+def shard_of(record, shards):
+    digest = hashlib.blake2b(record_io.article_id(record).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % shards
+
+
+def _shard_dir(stage, shards):
+    return os.path.join(STAGES[stage]["output_dir"], SHARD_DIR, f"{stage}-{shards}")
+
+
+def _shard_stem(stage, shards, index, stem):
+    return os.path.join(_shard_dir(stage, shards), f"{stem}.shard{index:04d}")
+
+
+def input_stems(stage):
+    spec = STAGES[stage]
+    return [stem for stem in record_io.list_stems(spec["input_dir"]) if spec["select"](stem)]
+
+
+# ------------------ Run one shard ------------------
+
+def run_shard(stage, index, shards):
+    """Processes the articles of shard `index` of `shards` for every input file of `stage`."""
+    spec = STAGES[stage]
+    shard_dir = _shard_dir(stage, shards)
+    os.makedirs(shard_dir, exist_ok=True)
+    # Reads the shared store; new texts go to a per-shard file that the merge folds in
+    store = record_io.TextStore(name=f"texts.shard{index:04d}", write_dir=shard_dir)
+
+    count = 0
+    for stem in input_stems(stage):
+        out = []
+        for pos, record in enumerate(record_io.iter_records(os.path.join(spec["input_dir"], stem))):
+            if shard_of(record, shards) != index:
+                continue
+            for i, result in enumerate(spec["process"](record, store)):
+                out.append({**result, POSITION_FIELD: [pos, i]})
+        out_stem = _shard_stem(stage, shards, index, spec["output"].format(stem))
+        if spec["fields"]:
+            record_io.write_normalized(out_stem, out, fields=spec["fields"])
+        else:
+            record_io.write_records(out_stem, out)
+        count += len(out)
+    store.flush()
+    # Pool workers exit without running atexit handlers, so each shard writes its own timings
+    metrics.flush(process=f"sharding.py {stage} shard{index:04d}")
+    metrics.reset()
+    print(f"✅ [{stage}] shard {index + 1}/{shards}: {count} records")
+    return count
+
+
+# ------------------ Merge ------------------
+
+def merge_shards(stage, shards):
+    """Combines shard outputs in input order and folds the shard texts into the shared store."""
+    spec = STAGES[stage]
+    shard_dir = _shard_dir(stage, shards)
+
+    # Texts first, so merged records never reference a text the store does not have
+    store = record_io.TextStore()
+    for index in range(shards):
+        store.merge(os.path.join(shard_dir, f"texts.shard{index:04d}"))
+
+    read = record_io.iter_joined if spec["fields"] else record_io.iter_records
+    for stem in input_stems(stage):
+        out_stem = spec["output"].format(stem)
+        streams = [read(_shard_stem(stage, shards, index, out_stem)) for index in range(shards)]
+        merged = ({k: v for k, v in r.items() if k != POSITION_FIELD}
+                  for r in heapq.merge(*streams, key=lambda r: r[POSITION_FIELD]))
+        out_path = os.path.join(spec["output_dir"], out_stem)
+        if spec["fields"]:
+            record_io.write_normalized(out_path, list(merged), fields=spec["fields"])
+        else:
+            record_io.write_records(out_path, merged)
+        print(f"✅ [{stage}] merged {shards} shards → {out_path}")
+
+    shutil.rmtree(shard_dir, ignore_errors=True)
+
+
+# ------------------ Local pool ------------------
+
+def run_sharded(stage, shards=DEFAULT_SHARDS, workers=None):
+    """Runs every shard of `stage` in a process pool, then merges."""
+    with metrics.timer(f"sharded_{stage}"):
+        with ProcessPoolExecutor(max_workers=workers or shards) as pool:
+            list(pool.map(run_shard, [stage] * shards, range(shards), [shards] * shards))
+        merge_shards(stage, shards)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run preprocessing / NLP / triplet extraction in shards")
+    parser.add_argument("stage", choices=list(STAGES))
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    parser.add_argument("--workers", type=int, default=None, help="pool size (default: one per shard)")
+    parser.add_argument("--shard", type=int, default=None, help="run only this shard (separate machines)")
+    parser.add_argument("--merge", action="store_true", help="only merge finished shards")
+    args = parser.parse_args()
+
+    if args.shard is not None:
+        run_shard(args.stage, args.shard, args.shards)
+    elif args.merge:
+        merge_shards(args.stage, args.shards)
+    else:
+        run_sharded(args.stage, args.shards, args.workers)
@@ -0,0 +1,80 @@
+import json
+import os
+import pandas as pd
+
+# Paths
+GPT_FILE = "data_output/gpt_signals_combined.json"
+FINBERT_FILE = "data_output/finbert_signals_combined.json"
+
+RFC822_FORMAT = "%a, %d %b %Y %H:%M:%S %z"
+
+# RSS feeds mostly publish RFC 822 dates; a few still use zone names instead of offsets
+TZ_OFFSETS = {
+    "GMT": "+0000", "UTC": "+0000", "UT": "+0000", "Z": "+0000",
+    "EST": "-0500", "EDT": "-0400", "CST": "-0600", "CDT": "-0500",
+    "MST": "-0700", "MDT": "-0600", "PST": "-0800", "PDT": "-0700",
+}
+
+SIGNAL_COLUMNS = ["title", "published", "published_at", "ticker", "sentiment", "confidence", "model"]
+
+
+# Parse a whole column of published strings at once (UTC, NaT on failure)
+def parse_published_dates(published) -> pd.Series:
+    s = pd.Series(published, dtype="string").str.strip()
+
+    zone = s.str.extract(r"\s([A-Z]{1,3})$", expand=False)
+    offset = zone.map(TZ_OFFSETS)
+    named = offset.notna()
+    s = s.where(~named, s.str.replace(r"\s[A-Z]{1,3}$", "", regex=True) + " " + offset)
+
+    parsed = pd.to_datetime(s, format=RFC822_FORMAT, errors="coerce", utc=True)
+
+    # Second pass only for rows that are not RFC 822 (ISO timestamps from other sources)
+    missing = parsed.isna() & s.notna() & (s != "")
+    if missing.any():
+        parsed[missing] = pd.to_datetime(s[missing], format="ISO8601", errors="coerce", utc=True)
+    return parsed
+
+
+def load_json_records(path):
+    if not os.path.exists(path):
+        print(f"⚠️ Missing file: {path}")
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Failed to parse {path}: {e}")
+            return []
+
+
+# Flatten a grouped signal file ({title, published, <key_field>: [...]}) into one row per signal
+def signal_frame_from_records(data, key_field="gpt_signals", model="gpt"):
+    if not data:
+        return pd.DataFrame(columns=SIGNAL_COLUMNS)
+
+    if isinstance(data[0], dict) and key_field not in data[0] and "ticker" in data[0]:
+        df = pd.DataFrame(data)  # flat per-signal format (FinBERT before grouping)
+    else:
+        rows = [{**e, key_field: e.get(key_field) or []} for e in data if isinstance(e, dict)]
+        df = pd.json_normalize(rows, record_path=key_field, meta=["title", "published"], errors="ignore")
+
+    if df.empty:
+        return pd.DataFrame(columns=SIGNAL_COLUMNS)
+
+    for col in ("title", "published", "ticker", "sentiment"):
+        if col not in df:
+            df[col] = ""
+    if "confidence" not in df:
+        df["confidence"] = 0.0
+
+    df["ticker"] = df["ticker"].fillna("").astype(str).str.strip().str.upper()
+    df["sentiment"] = df["sentiment"].fillna("").astype(str).str.strip().str.lower()
+    df["confidence"] = pd.to_numeric(df["confidence"], errors="coerce").fillna(0.0)
+    df["published_at"] = parse_published_dates(df["published"].fillna(""))
+    df["model"] = model
+    return df
+
+
+def load_signal_frame(path=GPT_FILE, key_field="gpt_signals", model="gpt"):
+    return signal_frame_from_records(load_json_records(path), key_field, model)
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+
+import run_metrics as metrics
+import data_collection
+import preprocessing
+import nlp_processing
+import FinBERT_signals
+from near_duplicates import NearDuplicateIndex
+from feed_scheduler import FeedScheduler, load_registry
+from resources import load_finbert, load_spacy
+
+# Streaming mode: each article flows fetch → preprocess → enrich → score as soon as it is fetched.
+# Stages are threads joined by bounded queues, so a slow stage back-pressures the ones before it.
+
+OUTPUT_FILE = "data_output/stream_signals.jsonl"
+QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "32"))
+FETCH_WORKERS = int(os.getenv("STREAM_FETCH_WORKERS", "8"))  # network-bound
+
+_STOP = object()
+
+
+class Stage:
+    """Runs `fn(item)` on `workers` threads; fn returns a result, a list of results, or None to drop."""
+
+    def __init__(self, name, fn, inbox, outbox, workers=1):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        self._alive = workers
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+
+    def start(self):
+        for t in self.threads:
+            t.start()
+        return self
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                self.inbox.put(_STOP)  # let sibling workers see it too
+                break
+            try:
+                with metrics.timer(f"stream_{self.name}"):
+                    out = self.fn(item)
+            except Exception as e:
+                print(f"⚠️ [{self.name}] {e}")
+                continue
+            for result in (out if isinstance(out, list) else [out]):
+                if result is not None:
+                    self.outbox.put(result)  # blocks while downstream is full
+
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last:
+            self.outbox.put(_STOP)
+
+
+# ------------------ Stage functions ------------------
+
+def feed_source(out, feeds, follow=None, max_articles=None):
+    """Puts new RSS entries on `out` feed by feed. With `follow` it keeps polling: each feed at its own adaptive
+    interval (feed_scheduler), waking at most every `follow` seconds."""
+    scheduler = FeedScheduler(path=None)
+    try:
+        while True:
+            for name, url, _ in (scheduler.due(feeds) if follow else feeds):
+                try:
+                    new = scheduler.new_entries(data_collection.fetch_feed_entries(url, max_articles))
+                except Exception as e:
+                    print(f"⚠️ [fetch] {name}: {e}")
+                    new = []
+                scheduler.record_poll(url, len(new))
+                for entry in new:
+                    entry["source"] = name
+                    entry["fetched_at"] = time.time()
+                    out.put(entry)
+            next_poll = scheduler.next_poll(feeds)
+            if not follow or next_poll is None:
+                break
+            time.sleep(max(next_poll - time.time(), follow))
+    finally:
+        # Always reached, so run_stream never waits on a source that has died
+        out.put(_STOP)
+
+
+def make_preprocessor(index):
+    def preprocess(entry):
+        article = preprocessing.preprocess_entry(entry)
+        if not article:
+            return None
+        # Syndicated copies stop here, before any NLP or model cost
+        canonical = index.check(article, entry["source"])
+        if canonical is not None:
+            print(f"🔁 Duplicate of {canonical}: {article['original_title'][:70]}")
+            return None
+        article["source"] = entry["source"]
+        article["fetched_at"] = entry["fetched_at"]
+        return article
+
+    return preprocess
+
+
+def make_scorer(use_gpt=False):
+    finbert = load_finbert()
+    if use_gpt:
+        import GPT4_signals
+
+    def score(article):
+        if not article.get("tickers"):
+            return None
+        record = {
+            "title": article["original_title"],
+            "published": article["published"],
+            "source": article["source"],
+            "url": article["link"],
+            "tickers": article["tickers"],
+            "finbert_signals": [
+                {k: s[k] for k in ("ticker", "sentiment", "confidence", "justification")}
+                for s in FinBERT_signals.score_article(finbert, article, article["source"])
+            ],
+        }
+        if use_gpt:
+            item = {
+                "tickers": article["tickers"],
+                "sentence": article["sentence"],
+                "triplet": {"subject": article["subject"], "verb": article["verb"], "object": article["object"]},
+                "polarity": article["sentiment"]["polarity"],
+            }
+            ctx = {"title": article["original_title"], "published": article["published"],
+                   "source": article["source"], "url": article["link"],
+                   **{k: article.get(k) for k in ("article_text", "sentence_spans", "ticker_mentions")}}
+            record["gpt_signals"] = GPT4_signals.score_item(item, ctx)["gpt_signals"]
+        record["latency_s"] = round(time.time() - article["fetched_at"], 3)
+        return record
+
+    return score
+
+
+# ------------------ Runner ------------------
+
+def run_stream(feeds=None, use_gpt=False, follow=None, output_file=OUTPUT_FILE, max_articles=None):
+    feeds = feeds or load_registry()
+    # Load models before the clock starts
+    load_spacy()
+    nlp_processing.load_ticker_patterns()
+    score = make_scorer(use_gpt)
+
+    index = NearDuplicateIndex()
+
+    entries, articles, enriched, scored = (queue.Queue(maxsize=QUEUE_SIZE) for _ in range(4))
+    stages = [
+        Stage("preprocess", make_preprocessor(index), entries, articles, workers=FETCH_WORKERS).start(),
+        Stage("enrich", nlp_processing.enrich_article, articles, enriched).start(),
+        Stage("score", score, enriched, scored).start(),
+    ]
+
+    start = time.perf_counter()
+    threading.Thread(target=feed_source, args=(entries, feeds, follow, max_articles), daemon=True).start()
+
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    count = 0
+    first_signal_s = None
+    with open(output_file, "a", encoding="utf-8") as f:
+        while True:
+            record = scored.get()
+            if record is _STOP:
+                break
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            count += 1
+            if first_signal_s is None:
+                first_signal_s = time.perf_counter() - start
+                metrics.record("time_to_first_signal", first_signal_s)
+                print(f"⚡ First signal after {first_signal_s:.2f}s: {record['title']}")
+            print(f"📡 {', '.join(record['tickers'])} ← {record['title'][:80]} ({record['latency_s']}s)")
+
+    for stage in stages:
+        for t in stage.threads:
+            t.join()
+    index.save()
+    print(f"✅ Stream finished: {count} signal records → {output_file} "
+          f"in {time.perf_counter() - start:.1f}s")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-article streaming pipeline: RSS → signals")
+    parser.add_argument("--gpt", action="store_true", help="also score each article with GPT")
+    parser.add_argument("--follow", type=float, default=None, help="keep polling feeds (each at its adaptive interval), waking at most every N seconds")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+    run_stream(use_gpt=args.gpt, follow=args.follow, output_file=args.output)
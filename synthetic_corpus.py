@@ -0,0 +1,296 @@
+import os
+import json
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Deterministic synthetic news corpus (RSS XML, article HTML, feed/processed/enriched JSON) for offline benchmarks
+
+TICKER_FILE = "sp500_ticker_mapping.json"
+
+SOURCES = [
+    ("Yahoo Finance", "yahoo_finance_news.json"),
+    ("CNBC", "cnbc_news.json"),
+    ("MarketWatch", "marketwatch_news.json"),
+    ("Investopedia", "investopedia_news.json"),
+    ("Motley Fool", "motley_fool_news.json"),
+]
+
+# Used when sp500_ticker_mapping.json has not been generated yet
+FALLBACK_COMPANIES = [
+    ("Apple", "AAPL"), ("Microsoft", "MSFT"), ("Amazon", "AMZN"), ("Nvidia", "NVDA"),
+    ("Alphabet", "GOOGL"), ("Meta Platforms", "META"), ("Tesla", "TSLA"), ("Berkshire Hathaway", "BRK.B"),
+    ("JPMorgan Chase", "JPM"), ("Visa", "V"), ("Exxon Mobil", "XOM"), ("UnitedHealth", "UNH"),
+    ("Johnson & Johnson", "JNJ"), ("Procter & Gamble", "PG"), ("Mastercard", "MA"), ("Home Depot", "HD"),
+    ("Chevron", "CVX"), ("Merck", "MRK"), ("AbbVie", "ABBV"), ("Pfizer", "PFE"),
+    ("Costco", "COST"), ("Walmart", "WMT"), ("Coca-Cola", "KO"), ("PepsiCo", "PEP"),
+    ("Bank of America", "BAC"), ("Netflix", "NFLX"), ("Intel", "INTC"), ("Boeing", "BA"),
+    ("Goldman Sachs", "GS"), ("Caterpillar", "CAT"), ("Oracle", "ORCL"), ("Salesforce", "CRM"),
+    ("Adobe", "ADBE"), ("Qualcomm", "QCOM"), ("Starbucks", "SBUX"), ("Nike", "NKE"),
+    ("Ford Motor", "F"), ("General Motors", "GM"), ("Delta Air Lines", "DAL"), ("FedEx", "FDX"),
+]
+
+HEADLINES = [
+    "{c} shares {move} after {metric} {beat}",
+    "{c} to acquire rival in ${amount} billion deal",
+    "{c} cuts full-year outlook as demand slows",
+    "Analysts upgrade {c} on strong {metric}",
+    "{c} and {c2} announce strategic partnership",
+    "{c} faces regulatory probe over {topic}",
+    "{c} raises dividend, announces ${amount} billion buyback",
+]
+
+SENTENCES = [
+    "{c} shares {move} {pct} percent in early trading on {day}.",
+    "The company reported quarterly revenue of ${amount} billion, compared with analyst estimates of ${amount2} billion.",
+    "{c} said {metric} {beat} expectations, driven by demand for its {product}.",
+    "Chief executive officers at {c} told investors the outlook for {topic} remains {tone}.",
+    "{c2} also {move} as investors weighed the read-through for the sector.",
+    "Analysts at several brokers raised their price targets on {c} following the results.",
+    "{c} plans to invest ${amount} billion in {product} over the next three years.",
+    "Regulators are reviewing {c}'s practices related to {topic}, according to people familiar with the matter.",
+    "The stock has {move} {pct} percent so far this year, outperforming the broader market.",
+    "Investors will watch {c2}'s earnings next week for further signs of {topic} pressure.",
+    "Bond yields climbed and the dollar strengthened as traders priced in fewer rate cuts.",
+    "The S&P 500 index closed {move} on {day} while the Nasdaq Composite was little changed.",
+]
+
+FILLERS = {
+    "move": ["rose", "fell", "jumped", "slipped", "surged", "declined", "gained", "dropped"],
+    "metric": ["earnings", "revenue", "margins", "guidance", "subscriber growth", "cloud sales"],
+    "beat": ["topped", "missed", "matched", "beat", "fell short of"],
+    "topic": ["pricing", "supply chains", "artificial intelligence", "consumer spending", "data privacy", "tariffs"],
+    "product": ["chips", "cloud services", "electric vehicles", "streaming", "medicines", "software"],
+    "tone": ["strong", "uncertain", "challenging", "resilient", "mixed"],
+    "day": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
+}
+
+
+def load_companies(path=TICKER_FILE):
+    """(display name, ticker) pairs; one name per ticker from the S&P alias mapping when present."""
+    if not os.path.exists(path):
+        return list(FALLBACK_COMPANIES)
+    with open(path, "r", encoding="utf-8") as f:
+        raw_map = json.load(f)
+    best = {}
+    for alias, ticker in raw_map.items():
+        ticker = ticker["ticker"] if isinstance(ticker, dict) else ticker
+        # Prefer the longest multi-word alias: closest to the real company name
+        if ticker not in best or len(alias) > len(best[ticker]):
+            best[ticker] = alias
+    return [(alias.title(), ticker.upper()) for ticker, alias in sorted(best.items())] or list(FALLBACK_COMPANIES)
+
+
+class SyntheticCorpus:
+    """Generates article i of n deterministically, so any slice can be rebuilt without storing it."""
+
+    def __init__(self, n_articles=1000, seed=42, companies=None, base_url="http://127.0.0.1:0"):
+        self.n_articles = n_articles
+        self.seed = seed
+        self.companies = companies or load_companies()
+        self.base_url = base_url
+        self.start = datetime(2025, 8, 1, tzinfo=timezone.utc)
+
+    def _fill(self, template, rng, c, c2):
+        values = {k: rng.choice(v) for k, v in FILLERS.items()}
+        values.update(
+            c=c, c2=c2,
+            pct=f"{rng.uniform(0.5, 12):.1f}",
+            amount=f"{rng.uniform(1, 90):.1f}",
+            amount2=f"{rng.uniform(1, 90):.1f}",
+        )
+        return template.format(**values)
+
+    def source_of(self, i):
+        return SOURCES[i % len(SOURCES)]
+
+    def article(self, i):
+        rng = random.Random(self.seed * 1_000_003 + i)
+        (c, ticker), (c2, ticker2) = rng.sample(self.companies, 2)
+        title = self._fill(rng.choice(HEADLINES), rng, c, c2)
+        sentences = [self._fill(rng.choice(SENTENCES), rng, c, c2) for _ in range(rng.randint(8, 16))]
+        published = self.start + timedelta(minutes=7 * i + rng.randint(0, 6))
+        mentioned = [ticker] + ([ticker2] if any(c2 in s for s in sentences + [title]) else [])
+        return {
+            "id": i,
+            "title": title,
+            "published": format_datetime(published, usegmt=True),
+            "link": f"{self.base_url}/article/{i}",
+            "source": self.source_of(i)[0],
+            "paragraphs": sentences,
+            "tickers": mentioned,
+        }
+
+    def source_articles(self, source_index):
+        return (self.article(i) for i in range(source_index, self.n_articles, len(SOURCES)))
+
+    # ------------------ Renderers ------------------
+
+    def rss_xml(self, source_index):
+        name = SOURCES[source_index][0]
+        items = []
+        for a in self.source_articles(source_index):
+            items.append(
+                "<item>"
+                f"<title>{escape(a['title'])}</title>"
+                f"<link>{escape(a['link'])}</link>"
+                f"<guid>{escape(a['link'])}</guid>"
+                f"<pubDate>{a['published']}</pubDate>"
+                "</item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<rss version="2.0"><channel>'
+            f"<title>{escape(name)} (synthetic)</title><link>{self.base_url}</link>"
+            f"<description>Synthetic benchmark feed</description>{''.join(items)}"
+            "</channel></rss>"
+        )
+
+    def article_html(self, i):
+        a = self.article(i)
+        body = "".join(f"<p>{escape(p)}</p>" for p in a["paragraphs"])
+        return (
+            "<!DOCTYPE html><html><head>"
+            f"<title>{escape(a['title'])}</title>"
+            '<meta name="description" content="Synthetic benchmark article">'
+            "</head><body>"
+            '<nav><a href="/">Home</a> | <a href="/markets">Markets</a></nav>'
+            f"<article><h1>{escape(a['title'])}</h1>"
+            f"<time>{a['published']}</time>{body}</article>"
+            "<footer><p>Copyright Synthetic News. All rights reserved.</p></footer>"
+            "</body></html>"
+        )
+
+    def feed_entry(self, i):
+        a = self.article(i)
+        return {"title": a["title"], "link": a["link"], "published": a["published"], "guid": a["link"]}
+
+    def processed_record(self, i):
+        a = self.article(i)
+        text = " ".join(a["paragraphs"])
+        return {
+            "original_title": a["title"],
+            "cleaned_title": a["title"].lower(),
+            "article_text": text,
+            "cleaned_article_text": text.lower(),
+            "link": a["link"],
+            "published": a["published"],
+        }
+
+    def enriched_record(self, i):
+        a = self.article(i)
+        text = " ".join(a["paragraphs"])
+        return {
+            "original_title": a["title"],
+            "cleaned_title": a["title"].lower(),
+            "article_text": text,
+            "cleaned_article_text": text.lower(),
+            "link": a["link"],
+            "published": a["published"],
+            "sentiment": {"polarity": 0.0, "subjectivity": 0.0},
+            "entities": [],
+            "tickers": a["tickers"],
+            "subject": "shares",
+            "verb": "rose",
+            "object": "percent",
+            "sentence": a["paragraphs"][0],
+        }
+
+    def signal_records(self, key_field, i_range=None):
+        """Grouped signal file rows ({title, published, <key_field>: [...]}) in the pipeline's output format."""
+        records = []
+        for i in i_range or range(self.n_articles):
+            rng = random.Random(self.seed * 7_919 + i + len(key_field))
+            a = self.article(i)
+            records.append({
+                "title": a["title"],
+                "published": a["published"],
+                "source": a["source"],
+                "url": a["link"],
+                key_field: [{
+                    "ticker": t,
+                    "sentiment": rng.choice(["positive", "neutral", "negative"]),
+                    "confidence": round(rng.uniform(0.4, 0.99), 3),
+                    "justification": "synthetic",
+                } for t in a["tickers"]],
+            })
+        return records
+
+    # ------------------ Writers ------------------
+
+    def write_feeds(self, data_dir):
+        """data_output/*_news.json as data_collection writes them (links point at the local server)."""
+        os.makedirs(data_dir, exist_ok=True)
+        for idx, (_, filename) in enumerate(SOURCES):
+            with open(os.path.join(data_dir, filename), "w", encoding="utf-8") as f:
+                json.dump([self.feed_entry(a["id"]) for a in self.source_articles(idx)], f, indent=2)
+
+    def write_processed(self, processed_dir):
+        """processed_data as preprocessing writes it, with the texts inline (legacy records need no text store)."""
+        os.makedirs(processed_dir, exist_ok=True)
+        for idx, (_, filename) in enumerate(SOURCES):
+            records = [self.processed_record(a["id"]) for a in self.source_articles(idx)]
+            with open(os.path.join(processed_dir, f"processed_{filename}"), "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=2)
+
+    def write_enriched(self, enriched_dir):
+        os.makedirs(enriched_dir, exist_ok=True)
+        for idx, (_, filename) in enumerate(SOURCES):
+            records = [self.enriched_record(a["id"]) for a in self.source_articles(idx)]
+            with open(os.path.join(enriched_dir, f"enriched_processed_{filename}"), "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=2)
+
+    def write_signals(self, path, key_field):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.signal_records(key_field), f, indent=2)
+
+    def write_ticker_mapping(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({name.lower(): ticker for name, ticker in self.companies}, f, indent=2)
+
+
+# ------------------ Local stand-in server ------------------
+
+def _make_handler(corpus):
+    class CorpusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            try:
+                if len(parts) == 2 and parts[0] == "rss":
+                    body, ctype = corpus.rss_xml(int(parts[1].split(".")[0])), "application/rss+xml"
+                elif len(parts) == 2 and parts[0] == "article":
+                    body, ctype = corpus.article_html(int(parts[1])), "text/html"
+                else:
+                    raise ValueError(self.path)
+            except (ValueError, IndexError):
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", f"{ctype}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return CorpusHandler
+
+
+def serve_corpus(corpus, host="127.0.0.1", port=0):
+    """Start a background HTTP server for the corpus; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), _make_handler(corpus))
+    server.daemon_threads = True
+    base_url = f"http://{host}:{server.server_address[1]}"
+    corpus.base_url = base_url
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base_url
+
+
+def feed_urls(base_url):
+    return [(name, f"{base_url}/rss/{idx}.xml", filename) for idx, (name, filename) in enumerate(SOURCES)]
@@ -0,0 +1,110 @@
+import numpy as np
+
+# Subject-verb-object triplets from a parsed spaCy Doc, shared by nlp_processing, triplet_extraction and the
+# scoring service.
+# Verb/subject/object candidates come from compiled DependencyMatcher patterns. Token attributes are read once
+# with doc.to_array and processed as arrays; compound modifiers are folded into the subject and object
+# ("apple shares", "cloud revenue"). Every triplet in the document is returned, in text order.
+
+SUBJECT_DEPS = ["nsubj", "nsubjpass", "csubj"]
+OBJECT_DEPS = ["dobj", "obj", "attr", "oprd", "dative"]
+PREPOSITIONAL_OBJECTS = True  # "shares fell by 5 percent" when the verb has no direct object
+
+# Words to exclude as subjects or objects
+BAD_SUBJECT_OBJECTS = {"inc", "co", "ltd", "corp", "corporation", "company", "group"}
+
+_matchers = {}  # id(vocab) -> DependencyMatcher
+
+
+def _patterns():
+    verb = {"RIGHT_ID": "verb", "RIGHT_ATTRS": {"POS": "VERB"}}
+    subject = {"LEFT_ID": "verb", "REL_OP": ">", "RIGHT_ID": "subject", "RIGHT_ATTRS": {"DEP": {"IN": SUBJECT_DEPS}}}
+    patterns = {
+        # token order in a match: verb, subject, object
+        "direct": [verb, subject,
+                   {"LEFT_ID": "verb", "REL_OP": ">", "RIGHT_ID": "object", "RIGHT_ATTRS": {"DEP": {"IN": OBJECT_DEPS}}}],
+    }
+    if PREPOSITIONAL_OBJECTS:
+        # token order: verb, subject, preposition, object
+        patterns["prepositional"] = [verb, subject,
+                                     {"LEFT_ID": "verb", "REL_OP": ">", "RIGHT_ID": "prep", "RIGHT_ATTRS": {"DEP": "prep"}},
+                                     {"LEFT_ID": "prep", "REL_OP": ">", "RIGHT_ID": "object", "RIGHT_ATTRS": {"DEP": "pobj"}}]
+    return patterns
+
+
+def dependency_matcher(vocab):
+    """DependencyMatcher with the triplet patterns, compiled once per vocabulary."""
+    matcher = _matchers.get(id(vocab))
+    if matcher is None:
+        from spacy.matcher import DependencyMatcher
+        matcher = DependencyMatcher(vocab)
+        for name, pattern in _patterns().items():
+            matcher.add(name, [pattern])
+        _matchers[id(vocab)] = matcher
+    return matcher
+
+
+def compound_starts(heads, is_compound):
+    """Index of the first token of each token's compound phrase (the token itself when it has no compounds)."""
+    start = np.arange(len(heads))
+    children = np.flatnonzero(is_compound)
+    # Chains ("new york stock exchange") settle after a few passes
+    while True:
+        updated = start.copy()
+        np.minimum.at(updated, heads[children], start[children])
+        if (updated == start).all():
+            return start
+        start = updated
+
+
+def triplets_from_doc(doc):
+    """[{subject, verb, object, subject_chunk, object_chunk, sentence, sentence_index}, ...] for every match."""
+    if len(doc) == 0:
+        return []
+    from spacy.attrs import HEAD, DEP, LEMMA
+
+    strings = doc.vocab.strings
+    matches = dependency_matcher(doc.vocab)(doc)
+    if not matches:
+        return []
+
+    attrs = doc.to_array([HEAD, DEP, LEMMA])
+    index = np.arange(len(doc))
+    heads = index + attrs[:, 0].astype(np.int64)  # HEAD is stored as an offset from the token
+    is_compound = attrs[:, 1] == strings["compound"]
+    starts = compound_starts(heads, is_compound)
+
+    sentences = list(doc.sents)
+    sentence_of = np.searchsorted(np.array([s.start for s in sentences]), index, side="right") - 1
+    chunk_of = {chunk.root.i: chunk for chunk in doc.noun_chunks} if doc.has_annotation("DEP") else {}
+    lower = [t.lower_ for t in doc]
+
+    def phrase(i):
+        return " ".join(lower[j] for j in range(starts[i], i + 1) if j == i or is_compound[j])
+
+    def chunk(i):
+        c = chunk_of.get(i)
+        return c.text.lower() if c is not None else lower[i]
+
+    # (verb, subject, object) token triples; the prepositional pattern only counts for verbs without a direct object
+    direct_id = strings["direct"]
+    found = {(tokens[0], tokens[1], tokens[2]) for match_id, tokens in matches if match_id == direct_id}
+    with_object = {verb for verb, _, _ in found}
+    found.update((tokens[0], tokens[1], tokens[3]) for match_id, tokens in matches
+                 if match_id != direct_id and tokens[0] not in with_object)
+
+    triplets = []
+    for verb, subject, obj in sorted(found):
+        if lower[subject] in BAD_SUBJECT_OBJECTS or lower[obj] in BAD_SUBJECT_OBJECTS:
+            continue
+        sent = int(sentence_of[verb])
+        triplets.append({
+            "subject": phrase(subject),
+            "verb": strings[int(attrs[verb, 2])] or lower[verb],
+            "object": phrase(obj),
+            "subject_chunk": chunk(subject),
+            "object_chunk": chunk(obj),
+            "sentence": sentences[sent].text,
+            "sentence_index": sent,
+        })
+    return triplets
@@ -1,20 +1,20 @@
 import os
 import json
-import spacy
 import re
+from functools import lru_cache
+import run_metrics as metrics
+from resources import load_spacy
+from triplet_engine import triplets_from_doc
+import record_io
 
 # Config
 INPUT_DIR = "enriched_data"
 OUTPUT_DIR = "triplets_data"
 TICKER_MAP_FILE = "sp500_ticker_mapping.json"
+ARTICLE_FIELDS = ["published", "sentiment", "source_title", "tickers"]  # stored once per article
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Words to exclude as subjects or objects
-BAD_SUBJECT_OBJECTS = {"inc", "co", "ltd", "corp", "corporation", "company", "group"}
-
 # Normalize company names and entities
 def clean_entity(text):
     text = text.lower()
@@ -23,91 +23,91 @@ def clean_entity(text):
     return text.strip()
 
 # Load and normalize ticker map
-with open(TICKER_MAP_FILE, "r", encoding="utf-8") as f:
-    raw_map = json.load(f)
-
-ticker_map = {}
-for k, v in raw_map.items():
-    norm_k = clean_entity(k)
-    if isinstance(v, dict) and "ticker" in v:
-        ticker_map[norm_k] = v["ticker"].upper()
-    elif isinstance(v, str):
-        ticker_map[norm_k] = v.upper()
-
-# Detect tickers using NER
-def find_tickers_in_text(text, ticker_dict):
-    doc = nlp(text)
-    found_tickers = set()
+@lru_cache(maxsize=None)
+def load_ticker_map(path=TICKER_MAP_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        raw_map = json.load(f)
+
+    ticker_map = {}
+    for k, v in raw_map.items():
+        norm_k = clean_entity(k)
+        if isinstance(v, dict) and "ticker" in v:
+            ticker_map[norm_k] = v["ticker"].upper()
+        elif isinstance(v, str):
+            ticker_map[norm_k] = v.upper()
+    return ticker_map
+
+# Detect tickers using NER; {ticker: [(start, end), ...]} character spans of the matching entities
+def ticker_spans_from_doc(doc, ticker_dict):
+    spans = {}
 
     for ent in doc.ents:
         if ent.label_ in ["ORG", "GPE", "PRODUCT"]:
             ent_clean = clean_entity(ent.text)
             if ent_clean in ticker_dict:
-                found_tickers.add(ticker_dict[ent_clean])
-
-    return list(found_tickers)
+                spans.setdefault(ticker_dict[ent_clean], []).append((ent.start_char, ent.end_char))
 
-# Extract meaningful triplets
-def extract_triplets(text):
-    triplets = []
-    doc = nlp(text)
-    for sent in doc.sents:
-        for token in sent:
-            if token.pos_ == "VERB":
-                subject = ""
-                obj = ""
-
-                for child in token.children:
-                    if "subj" in child.dep_:
-                        subject = child.text.lower()
-                    if "obj" in child.dep_:
-                        obj = child.text.lower()
-
-                if subject and obj and subject not in BAD_SUBJECT_OBJECTS and obj not in BAD_SUBJECT_OBJECTS:
-                    triplets.append({
-                        "subject": subject,
-                        "verb": token.lemma_,
-                        "object": obj,
-                        "sentence": sent.text
-                    })
-    return triplets
+    return spans
 
-# Process one article file
-def process_file(filename):
-    with open(os.path.join(INPUT_DIR, filename), "r", encoding="utf-8") as f:
-        articles = json.load(f)
+def tickers_from_doc(doc, ticker_dict):
+    return list(ticker_spans_from_doc(doc, ticker_dict))
 
-    all_triplets = []
+@metrics.timed("spacy_ner")
+def find_tickers_in_text(text, ticker_dict):
+    return tickers_from_doc(load_spacy()(text), ticker_dict)
 
-    for article in articles:
-        full_text = article.get("cleaned_article_text", "")
-        published = article.get("published")
-        sentiment = article.get("sentiment")
-        title = article.get("original_title")
+# Triplets come from the shared engine (triplet_engine.triplets_from_doc)
+@metrics.timed("spacy_triplets")
+def extract_triplets(text):
+    return triplets_from_doc(load_spacy()(text))
 
-        tickers = find_tickers_in_text(full_text, ticker_map)
-        sentences = [sent.text for sent in nlp(full_text).sents]
+# Triplets of one (hydrated) enriched article
+def article_triplets(article):
+    all_triplets = []
+    full_text = article.get("cleaned_article_text", "")
+    published = article.get("published")
+    sentiment = article.get("sentiment")
+    title = article.get("original_title")
+
+    # One parse gives the NER tickers, the sentence boundaries and every triplet
+    with metrics.timer("spacy_sentences"):
+        doc = load_spacy()(full_text)
+    spans = ticker_spans_from_doc(doc, load_ticker_map())
+    tickers = list(spans)
+
+    # Tickers with an entity mention inside each sentence
+    mentioned = [[ticker for ticker, ticker_spans in spans.items()
+                  if any(sent.start_char <= start < sent.end_char for start, _ in ticker_spans)]
+                 for sent in doc.sents]
+    with metrics.timer("spacy_triplets"):
+        triplets = triplets_from_doc(doc)
+    for t in triplets:
+        t["mentioned_tickers"] = mentioned[t["sentence_index"]]
+        t["published"] = published
+        t["sentiment"] = sentiment
+        t["source_title"] = title
+        t["tickers"] = tickers
+        t["article_id"] = record_io.article_id(article)
+        all_triplets.append(t)
+    return all_triplets
 
-        for sent in sentences:
-            triplets = extract_triplets(sent)
-            for t in triplets:
-                t["published"] = published
-                t["sentiment"] = sentiment
-                t["source_title"] = title
-                t["tickers"] = tickers
-                all_triplets.append(t)
+# Process one article file
+def process_file(stem, store=None):
+    store = store or record_io.TextStore()
+    all_triplets = []
+    for article in record_io.iter_records(os.path.join(INPUT_DIR, stem)):
+        all_triplets.extend(article_triplets(store.hydrate(article)))
 
-    out_path = os.path.join(OUTPUT_DIR, f"triplets_{filename}")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(all_triplets, f, indent=2)
+    # Article-level fields are stored once per article, not on every triplet
+    record_io.write_normalized(os.path.join(OUTPUT_DIR, f"triplets_{stem}"), all_triplets, fields=ARTICLE_FIELDS)
 
-    print(f"✅ Extracted {len(all_triplets)} triplets from: {filename}")
+    print(f"✅ Extracted {len(all_triplets)} triplets from: {stem}")
 
 # Run all files
 def run_triplet_extraction():
-    for file in os.listdir(INPUT_DIR):
-        if file.endswith(".json"):
-            process_file(file)
+    store = record_io.TextStore()
+    for stem in record_io.list_stems(INPUT_DIR):
+        process_file(stem, store)
 
 if __name__ == "__main__":
     run_triplet_extraction()
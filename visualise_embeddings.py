@@ -1,33 +1,122 @@
+import os
 import json
+from array import array
+import numpy as np
+import record_io
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
-# Load clustered triplets
-with open("data_output/clustered_triplets.json", "r", encoding="utf-8") as f:
-    triplets = json.load(f)
-
-# Filter triplets that have 2D coordinates
-x = []
-y = []
-labels = []
-
-for t in triplets:
-    if "embedding_2d" in t and "cluster_label" in t:
-        x_val, y_val = t["embedding_2d"]
-        x.append(x_val)
-        y.append(y_val)
-        labels.append(t["cluster_label"])
-
-# Check if we have valid data
-if not x:
-    print("⚠️ No 2D embeddings found in triplets. Did you forget to save them during dimensionality reduction?")
-else:
-    # Plot
-    plt.figure(figsize=(10, 6))
-    scatter = plt.scatter(x, y, c=labels, cmap="tab10", s=50, edgecolor='k')
-    plt.colorbar(scatter, label="Cluster ID")
-    plt.xlabel("UMAP Dimension 1")
-    plt.ylabel("UMAP Dimension 2")
-    plt.title("2D UMAP Embeddings Colored by Cluster")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+CLUSTERED_FILE = "data_output/clustered_triplets"  # record_io stem
+POINTS_FILE = "data_output/cluster_points.npz"     # same coordinates as arrays, written by embedding_and_clustering
+LABELS_FILE = "data_output/cluster_labels.json"
+
+SCATTER_MAX_POINTS = 20_000   # above this the map is drawn as binned density instead of one marker per point
+GRID = (800, 500)             # density bins (x, y)
+HIGHLIGHT_POINTS = 2_000      # sampled points drawn on top of the density
+ANNOTATE_CLUSTERS = 15        # largest clusters labelled on the map
+NOISE_RGB = (0.6, 0.6, 0.6)
+
+# Load the 2D coordinates and cluster labels as arrays (x, y, labels)
+def load_cluster_points(path=CLUSTERED_FILE, points_file=POINTS_FILE):
+    source = record_io.resolve(path)
+    if os.path.exists(points_file) and (source is None or os.path.getmtime(points_file) >= os.path.getmtime(source)):
+        data = np.load(points_file)
+        return data["xy"][:, 0], data["xy"][:, 1], data["labels"]
+
+    # Stream the records into typed buffers; no per-point Python objects are kept
+    xs, ys, labels = array("f"), array("f"), array("i")
+    for t in record_io.iter_records(path):
+        if "embedding_2d" in t and "cluster_label" in t:
+            x_val, y_val = t["embedding_2d"]
+            xs.append(x_val)
+            ys.append(y_val)
+            labels.append(t["cluster_label"])
+    return (np.frombuffer(xs, dtype=np.float32), np.frombuffer(ys, dtype=np.float32),
+            np.frombuffer(labels, dtype=np.int32))
+
+def load_cluster_names(path=LABELS_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {int(k): v.get("label", "") for k, v in json.load(f).items()}
+
+def cluster_colours(labels):
+    """RGB per cluster id; noise (-1) is grey."""
+    cmap = plt.get_cmap("tab20")
+    clusters = [int(c) for c in np.unique(labels) if c != -1]
+    colours = {c: cmap(i % cmap.N)[:3] for i, c in enumerate(clusters)}
+    colours[-1] = NOISE_RGB
+    return colours
+
+def density_image(x, y, labels, grid=GRID):
+    """RGBA image: each bin takes the colour of its most frequent cluster, opacity from its log point count."""
+    width, height = grid
+    x0, x1, y0, y1 = float(x.min()), float(x.max()), float(y.min()), float(y.max())
+    ix = np.clip(((x - x0) / max(x1 - x0, 1e-9) * width).astype(np.int64), 0, width - 1)
+    iy = np.clip(((y - y0) / max(y1 - y0, 1e-9) * height).astype(np.int64), 0, height - 1)
+    bins = iy * width + ix
+
+    ids, codes = np.unique(labels, return_inverse=True)
+    keys, counts = np.unique(bins * len(ids) + codes, return_counts=True)
+    key_bins, key_codes = keys // len(ids), keys % len(ids)
+
+    # Dominant cluster per bin: last entry of each bin after sorting by (bin, count)
+    order = np.lexsort((counts, key_bins))
+    key_bins, key_codes = key_bins[order], key_codes[order]
+    last = np.r_[key_bins[1:] != key_bins[:-1], True]
+    dominant_bins, dominant_codes = key_bins[last], key_codes[last]
+
+    palette = cluster_colours(labels)
+    code_rgb = np.array([palette[int(c)] for c in ids], dtype=np.float32)
+    density = np.log1p(np.bincount(bins, minlength=width * height)[dominant_bins])
+    image = np.zeros((width * height, 4), dtype=np.float32)
+    image[dominant_bins, :3] = code_rgb[dominant_codes]
+    image[dominant_bins, 3] = 0.25 + 0.75 * density / density.max()
+    return image.reshape(height, width, 4), (x0, x1, y0, y1)
+
+def plot_cluster_map(path=CLUSTERED_FILE, seed=42):
+    x, y, labels = load_cluster_points(path)
+
+    # Check if we have valid data
+    if len(x) == 0:
+        print("⚠️ No 2D embeddings found in triplets. Did you forget to save them during dimensionality reduction?")
+        return None
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    if len(x) <= SCATTER_MAX_POINTS:
+        scatter = ax.scatter(x, y, c=labels, cmap="tab10", s=12, linewidths=0, rasterized=True)
+        fig.colorbar(scatter, ax=ax, label="Cluster ID")
+    else:
+        image, extent = density_image(x, y, labels)
+        ax.imshow(image, origin="lower", extent=extent, aspect="auto", interpolation="nearest")
+
+        # A small random sample shows individual points without drawing all of them
+        clustered = np.flatnonzero(labels != -1)
+        if len(clustered):
+            sample = np.random.default_rng(seed).choice(clustered, size=min(HIGHLIGHT_POINTS, len(clustered)),
+                                                        replace=False)
+            palette = cluster_colours(labels)
+            ax.scatter(x[sample], y[sample], c=[palette[int(c)] for c in labels[sample]],
+                       s=6, edgecolor="k", linewidths=0.2, rasterized=True)
+
+        # Label the largest clusters at their median position
+        names = load_cluster_names()
+        ids, counts = np.unique(labels[clustered], return_counts=True)
+        for cid in ids[np.argsort(counts)[::-1][:ANNOTATE_CLUSTERS]]:
+            members = labels == cid
+            ax.annotate(names.get(int(cid)) or str(cid), (np.median(x[members]), np.median(y[members])),
+                        fontsize=7, ha="center", bbox=dict(boxstyle="round,pad=0.2", fc="white", alpha=0.7))
+    ax.set_xlabel("UMAP Dimension 1")
+    ax.set_ylabel("UMAP Dimension 2")
+    ax.set_title(f"2D UMAP Embeddings Colored by Cluster ({len(x):,} triplets)")
+    ax.grid(True)
+    fig.tight_layout()
+    return fig
+
+def chart_jobs(path=CLUSTERED_FILE):
+    return [("umap_cluster_map", plot_cluster_map, (path,))]
+
+if __name__ == "__main__":
+    from report_rendering import render_figures
+    render_figures(chart_jobs())